@@ -6,17 +6,23 @@
 # ignore too few public methods, pylint: disable=R0903
 # ignore too many public methods, pylint: disable=R0904
 
+import datetime
+
 from django import forms
 from django.db.models import Q
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.core.urlresolvers import reverse
 from django.http import HttpResponseRedirect
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from reversion.admin import VersionAdmin
 
+from inhouse.forms import InvoiceRunForm, ProjectDefaultStepForm
 from inhouse.templatetags.utils import format_minutes_to_time
-from inhouse import models
+from inhouse.views.utils import render
+from inhouse import invoicing, locking, models, steptemplates
 
 
 # Custom actions
@@ -30,6 +36,70 @@ def edit_bookings(modeladmin, request, queryset):
 edit_bookings.short_description = _(u'Edit selected bookings')
 
 
+def create_invoices(modeladmin, request, queryset):
+    """Creates invoices for the selected projects and a chosen period."""
+    form = None
+    if 'apply' in request.POST:
+        form = InvoiceRunForm(request.POST)
+        if form.is_valid():
+            count = 0
+            for project in queryset:
+                invoice, _result = invoicing.create_invoice(
+                    project, form.cleaned_data['valid_from'],
+                    form.cleaned_data['valid_until'])
+                if invoice is not None:
+                    count += 1
+            messages.success(request, _(u'%d invoices have been created.')
+                             % count)
+            return None
+    if form is None:
+        last = datetime.date.today().replace(day=1) - datetime.timedelta(1)
+        form = InvoiceRunForm(initial={'valid_from': last.replace(day=1),
+                                       'valid_until': last})
+    return render(request, 'admin/inhouse/project/create_invoices.html', {
+        'form': form, 'projects': queryset,
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME})
+create_invoices.short_description = _(u'Create invoices')
+
+
+def assign_step_templates(modeladmin, request, queryset):
+    """Adds steps for chosen templates to the selected projects."""
+    form = None
+    if 'apply' in request.POST:
+        form = ProjectDefaultStepForm(request.POST)
+        form.set_step_choices()
+        if form.is_valid():
+            counts = steptemplates.assign_step_templates(
+                queryset.values_list('id', flat=True),
+                form.cleaned_data['steps'])
+            messages.success(request, _(u'%(steps)d steps have been added to'
+                                        u' %(projects)d projects.') % {
+                    'steps': sum(counts.itervalues()),
+                    'projects': len(counts)})
+            return None
+    if form is None:
+        form = ProjectDefaultStepForm()
+        form.set_step_choices()
+    return render(request, 'admin/inhouse/project/assign_step_templates.html',
+                  {'form': form, 'projects': queryset,
+                   'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME})
+assign_step_templates.short_description = _(u'Add default steps')
+
+
+def lock_days(modeladmin, request, queryset):
+    """Locks the selected days."""
+    count = locking.set_locked(queryset, True, request.user.id)
+    messages.success(request, _(u'%d days have been locked.') % count)
+lock_days.short_description = _(u'Lock selected days')
+
+
+def unlock_days(modeladmin, request, queryset):
+    """Unlocks the selected days."""
+    count = locking.set_locked(queryset, False, request.user.id)
+    messages.success(request, _(u'%d days have been unlocked.') % count)
+unlock_days.short_description = _(u'Unlock selected days')
+
+
 class ModelAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
@@ -166,6 +236,43 @@ class BookingAdmin(VersionAdmin):
             obj.save()
 
 
+class BookingRollupAdmin(ModelAdmin):
+    """Read-only admin for the booking sums.
+
+    The sums are maintained by the bookings and can't be edited.
+    """
+
+    actions = None
+    list_select_related = True
+
+    def get_duration(self, rollup): # pylint: disable=R0201
+        return format_minutes_to_time(rollup.duration)
+    get_duration.admin_order_field = 'duration'
+    get_duration.short_description = _(u'Duration')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_readonly_fields(self, request, obj=None):
+        # accessing restricted _meta is intended: pylint:disable=W0212
+        return [field.name for field in self.model._meta.fields]
+
+
+class BookingMonthRollupAdmin(BookingRollupAdmin):
+
+    list_display = ('user', 'project', 'year', 'month', 'get_duration')
+    list_filter = ('year', 'month', 'user', 'project')
+    ordering = ('-year', '-month', 'user', 'project')
+
+
+class BookingWeekRollupAdmin(BookingRollupAdmin):
+
+    list_display = ('user', 'project', 'step', 'year', 'week',
+                    'get_duration')
+    list_filter = ('year', 'week', 'user', 'project')
+    ordering = ('-year', '-week', 'user', 'project', 'step')
+
+
 class CommissionStatusAdmin(ModelAdmin):
 
     list_display = ('id', 'name', 'description')
@@ -319,12 +426,16 @@ class DayBookinsInline(admin.TabularInline):
 
 class DayAdmin(ModelAdmin):
 
+    actions = [lock_days, unlock_days]
     date_hierarchy = 'date'
     fieldsets = (
         (None, {
             'fields': ('user',
                        'date',
-                       'locked'
+                       'locked',
+                       'locked_by',
+                       'locked_at',
+                       'booking_sum',
                        )}),
         (_(u'Timestamp'), {
             'classes': ('collapse',),
@@ -338,7 +449,8 @@ class DayAdmin(ModelAdmin):
     list_display = ('id', 'user', 'date', 'locked', 'get_booking_sum',
                     'created', 'modified')
     list_filter = ('user', 'locked')
-    readonly_fields = ('created', 'created_by', 'modified', 'modified_by')
+    readonly_fields = ('locked_by', 'locked_at', 'booking_sum', 'created',
+                       'created_by', 'modified', 'modified_by')
 
     def get_booking_sum(self, day): # pylint: disable=R0201
         """Display the booking time per day.
@@ -348,8 +460,7 @@ class DayAdmin(ModelAdmin):
         backend jobs that created more than 24 hours per day.
         """
         duration = day.get_booking_sum()
-        # TODO: Use constant variable
-        if duration > 1440:
+        if duration > models.MAX_MINUTES_PER_DAY:
             color = 'red'
         else:
             color = 'black'
@@ -357,6 +468,16 @@ class DayAdmin(ModelAdmin):
         return '<span style="color: %s;">%s</span>' % (color, value)
     get_booking_sum.short_description = _(u'Duration')
     get_booking_sum.allow_tags = True
+    get_booking_sum.admin_order_field = 'booking_sum'
+
+    def save_model(self, request, obj, form, change):
+        if 'locked' in form.changed_data:
+            if obj.locked:
+                obj.locked_by = request.user.id
+                obj.locked_at = timezone.now()
+            else:
+                obj.locked_by = obj.locked_at = None
+        obj.save()
 
 
 class DepartmentUserInline(admin.TabularInline):
@@ -510,8 +631,7 @@ class ProjectForm(forms.ModelForm):
 
 class ProjectAdmin(ModelAdmin):
 
-    # No deletion allowed. Projects can only be set inactive.
-    actions = None
+    actions = [assign_step_templates, create_invoices]
     date_hierarchy = 'created'
     fieldsets = (
         (None, {
@@ -557,6 +677,12 @@ class ProjectAdmin(ModelAdmin):
     readonly_fields = ('created', 'created_by', 'modified', 'modified_by')
     search_fields = ['name', 'description']
 
+    def get_actions(self, request):
+        # No deletion allowed. Projects can only be set inactive.
+        actions = super(ProjectAdmin, self).get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
     def colored_status(self, project): # pylint: disable=R0201
         if project.status in models.PROJECT_INACTIVE_STATUS:
             color = 'red'
@@ -893,6 +1019,8 @@ admin.site.register(models.Address, AddressAdmin)
 admin.site.register(models.AddressGroup, AddressGroupAdmin)
 admin.site.register(models.BillingType, BillingTypeAdmin)
 admin.site.register(models.Booking, BookingAdmin)
+admin.site.register(models.BookingMonthRollup, BookingMonthRollupAdmin)
+admin.site.register(models.BookingWeekRollup, BookingWeekRollupAdmin)
 admin.site.register(models.Communication, CommunicationAdmin)
 admin.site.register(models.CommissionStatus, CommissionStatusAdmin)
 admin.site.register(models.Company, CompanyAdmin)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Model backend with cached users and permissions.
+
+Users are cached by id until they are saved or deleted. The permission
+sets are cached per user and share one version, which is replaced when
+groups or permissions or their assignments change, so a group change
+invalidates the permissions of all members at once. The receivers are
+connected in :mod:`inhouse.models`.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+from inhouse.utils import new_version
+
+# Seconds users and permission sets are cached
+CACHE_TIMEOUT = 60 * 60
+
+_USER_KEY = 'inhouse.auth.user.%d'
+_PERMISSIONS_KEY = 'inhouse.auth.permissions.%d.%d.%s'
+_VERSION_KEY = 'inhouse.auth.permissions_version'
+
+
+def _get_version():
+    """Returns the current version of all cached permission sets."""
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = new_version()
+        cache.set(_VERSION_KEY, version, CACHE_TIMEOUT * 2)
+    return version
+
+
+def _get_names(query):
+    """Returns the names of the permissions in a query."""
+    return set(u'%s.%s' % row for row in query.values_list(
+        'content_type__app_label', 'codename').order_by())
+
+
+def invalidate_user(user_id):
+    """Removes a user from the cache."""
+    cache.delete(_USER_KEY % user_id)
+
+
+def invalidate_permissions():
+    """Invalidates the cached permission sets of all users."""
+    cache.delete(_VERSION_KEY)
+
+
+class CachedModelBackend(ModelBackend):
+    """Authenticates like :class:`ModelBackend`, but reads users and
+    permissions from the cache.
+
+    Superusers have all permissions like with :class:`ModelBackend`,
+    the flag is part of the cache key.
+    """
+
+    def get_user(self, user_id):
+        """Returns the user with the id or ``None``."""
+        key = _USER_KEY % int(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super(CachedModelBackend, self).get_user(user_id)
+            if user is not None:
+                cache.set(key, user, CACHE_TIMEOUT)
+        return user
+
+    def _load_permissions(self, user_obj):
+        """Sets the permission caches of a user from the cache."""
+        # setting ModelBackend's caches is intended, pylint:disable=W0212
+        if hasattr(user_obj, '_perm_cache'):
+            return
+        key = _PERMISSIONS_KEY % (user_obj.id, user_obj.is_superuser,
+                                  _get_version())
+        perms = cache.get(key)
+        if perms is None:
+            if user_obj.is_superuser:
+                group_perms = _get_names(Permission.objects.all())
+            else:
+                group_perms = _get_names(
+                    Permission.objects.filter(group__user=user_obj))
+            all_perms = _get_names(
+                Permission.objects.filter(user=user_obj)) | group_perms
+            perms = (all_perms, group_perms)
+            cache.set(key, perms, CACHE_TIMEOUT)
+        user_obj._perm_cache, user_obj._group_perm_cache = perms
+
+    def get_group_permissions(self, user_obj, obj=None):
+        """Returns the permissions a user has through groups."""
+        if user_obj.is_anonymous() or obj is not None:
+            return set()
+        self._load_permissions(user_obj)
+        return user_obj._group_perm_cache # pylint:disable=W0212
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """Returns all permissions of a user."""
+        if user_obj.is_anonymous() or obj is not None:
+            return set()
+        self._load_permissions(user_obj)
+        return user_obj._perm_cache # pylint:disable=W0212
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""Prices many bookings at once.
+
+:meth:`Booking.get_amount` needs several queries per booking. The
+functions in this module load the rate timelines of all involved
+projects once and resolve the rate and coefficient of each booking in
+memory, so pricing a queryset costs a fixed number of queries::
+
+  result = price_bookings(models.Booking.objects.filter(invoice=None))
+  for price in result.bookings:
+      ...
+  total = result.projects[project.id].amount
+"""
+
+import bisect
+import calendar
+import collections
+import decimal
+
+from django.conf import settings
+
+from inhouse import models
+
+# Price of a single booking
+BookingPrice = collections.namedtuple('BookingPrice', (
+    'booking_id', 'project_id', 'hours', 'hourly_rate', 'coefficient',
+    'amount'))
+
+# Sum of all priced bookings of a project
+ProjectTotal = collections.namedtuple('ProjectTotal', (
+    'project_id', 'hours', 'amount'))
+
+
+class RateTimeline(object):
+    """Interval index over the validity windows of rates.
+
+    Windows are sorted by their start, the rate of a date is found by
+    bisection. If windows overlap, the latest started window wins.
+    """
+
+    def __init__(self, rates=()):
+        """Initializes the timeline.
+
+        :param rates: Iterable of (valid_from, valid_until, rate)
+        """
+        rates = sorted(rates, key=lambda x: x[0])
+        self._starts = [x[0] for x in rates]
+        self._ends = [x[1] for x in rates]
+        self._rates = [x[2] for x in rates]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def get(self, date, default=None):
+        """Returns the rate valid at a date.
+
+        :param date: A :class:`datetime.date`
+        :param default: Returned if no rate is valid
+        :returns: Rate or default
+        """
+        idx = bisect.bisect_right(self._starts, date) - 1
+        while idx >= 0:
+            if self._ends[idx] >= date:
+                return self._rates[idx]
+            idx -= 1
+        return default
+
+
+class BillingResult(object):
+    """Prices of bookings and totals per project."""
+
+    def __init__(self):
+        self.bookings = []
+        self.projects = {}
+        # Ids of bookings without a valid rate
+        self.unpriced = []
+
+    @property
+    def amount(self):
+        """Total amount of all priced bookings."""
+        return sum((x.amount for x in self.projects.itervalues()),
+                   decimal.Decimal(0))
+
+    def add(self, price):
+        """Adds the price of a booking to the result."""
+        self.bookings.append(price)
+        total = self.projects.get(price.project_id)
+        if total is None:
+            total = ProjectTotal(price.project_id, decimal.Decimal(0),
+                                 decimal.Decimal(0))
+        self.projects[price.project_id] = ProjectTotal(
+            price.project_id, total.hours + price.hours,
+            total.amount + price.amount)
+
+
+def load_rate_timelines(project_ids):
+    """Loads the rate timelines of projects.
+
+    :param project_ids: Ids of :class:`Project`
+    :returns: Tuple of dicts ``{project_id: RateTimeline}`` and
+      ``{(project_id, user_id): RateTimeline}``
+    """
+    project_rates = collections.defaultdict(list)
+    query = models.ProjectRate.objects.filter(project__in=project_ids)
+    for project_id, valid_from, valid_until, rate in query.values_list(
+        'project', 'valid_from', 'valid_until', 'hourly_rate'):
+        project_rates[project_id].append((valid_from, valid_until, rate))
+    user_rates = collections.defaultdict(list)
+    query = models.ProjectUserRate.objects.filter(
+        project_user__project__in=project_ids, hourly_rate__isnull=False)
+    for project_id, user_id, valid_from, valid_until, rate in \
+        query.values_list('project_user__project', 'project_user__user',
+                          'valid_from', 'valid_until', 'hourly_rate'):
+        user_rates[(project_id, user_id)].append(
+            (valid_from, valid_until, rate))
+    return (dict((k, RateTimeline(v)) for k, v in project_rates.iteritems()),
+            dict((k, RateTimeline(v)) for k, v in user_rates.iteritems()))
+
+
+def load_weekend_coefficients(project_ids):
+    """Loads saturday and sunday coefficients of projects.
+
+    Like :meth:`Project.get_coefficient`, the defaults from the
+    settings are used if a project has no coefficient.
+
+    :param project_ids: Ids of :class:`Project`
+    :returns: Dict ``{project_id: {weekday: coefficient}}``
+    """
+    coefficients = {}
+    query = models.Project.objects.filter(id__in=project_ids)
+    for project_id, saturday, sunday in query.values_list(
+        'id', 'coefficient_saturday', 'coefficient_sunday'):
+        coefficients[project_id] = {
+            calendar.SATURDAY: (saturday
+                                or settings.DEFAULT_COEFFICIENT_SATURDAY),
+            calendar.SUNDAY: sunday or settings.DEFAULT_COEFFICIENT_SUNDAY}
+    return coefficients
+
+
+def price_bookings(queryset):
+    """Prices all bookings of a query.
+
+    The bookings, rates and coefficients are loaded with four queries,
+    independent of the number of bookings.
+
+    :param queryset: Query of :class:`Booking`
+    :returns: :class:`BillingResult`
+    """
+    rows = list(queryset.values_list('id', 'project', 'day__user',
+                                     'day__date', 'duration',
+                                     'step__coefficient'))
+    result = BillingResult()
+    if not rows:
+        return result
+    distinct_projects = set(row[1] for row in rows)
+    project_rates, user_rates = load_rate_timelines(distinct_projects)
+    weekend = load_weekend_coefficients(distinct_projects)
+    default_step = settings.DEFAULT_COEFFICIENT_PROJECT_STEP
+    empty = RateTimeline()
+    for booking_id, project_id, user_id, date, duration, step_co in rows:
+        rate = user_rates.get((project_id, user_id), empty).get(date)
+        if rate is None:
+            rate = project_rates.get(project_id, empty).get(date)
+        if rate is None:
+            result.unpriced.append(booking_id)
+            continue
+        coefficient = (weekend[project_id].get(date.weekday(), 1)
+                       * (step_co or default_step))
+        result.add(BookingPrice(
+            booking_id, project_id, decimal.Decimal(duration) / 60, rate,
+            coefficient,
+            models.calculate_amount(duration, rate, coefficient)))
+    return result
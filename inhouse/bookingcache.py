@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""Versions for cached data derived from a user's days and bookings.
+
+Cached calendars and booking summaries include the version of the
+user's month in their cache keys. Invalidating a month replaces its
+version, so all entries of the month become stale at once without
+knowing their keys. Months can be invalidated for single users or for
+all users. Within a transaction the versions are replaced again after
+it has ended, see :func:`inhouse.utils.delete_after_commit`.
+"""
+
+from django.core.cache import cache
+
+from inhouse.utils import delete_after_commit, new_version
+
+_USER_KEY = 'inhouse.booking_data.%d.%04d-%02d'
+_ALL_KEY = 'inhouse.booking_data.all.%04d-%02d'
+
+# Versions live longer than the entries, that depend on them
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def get_months(date_from, date_until):
+    """Returns the months touched by a period.
+
+    :returns: List of tuples (year, month)
+    """
+    months = []
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_until.year, date_until.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def get_version(user_id, year, month):
+    """Returns the current version of a user's month.
+
+    :param user_id: Id of the user
+    :returns: Version string
+    """
+    keys = [_ALL_KEY % (year, month), _USER_KEY % (user_id, year, month)]
+    versions = cache.get_many(keys)
+    missing = dict((key, new_version()) for key in keys
+                   if key not in versions)
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return '%s.%s' % (versions[keys[0]], versions[keys[1]])
+
+
+def invalidate(user_ids, date_from, date_until=None):
+    """Invalidates the cached data of users for a period.
+
+    :param user_ids: List of user ids or ``None`` for all users
+    :param date_from: First day of the period
+    :param date_until: Last day of the period, defaults to date_from
+    """
+    months = get_months(date_from, date_until or date_from)
+    if user_ids is None:
+        keys = [_ALL_KEY % month for month in months]
+    else:
+        keys = [_USER_KEY % ((user_id,) + month)
+                for user_id in set(user_ids) for month in months]
+    delete_after_commit(keys)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+"""Month calendars of a user.
+
+A month is rendered as HTML table with markers for the booked minutes
+and the locked state of each day and for today. The markers are read
+with one query, the result is cached per user, month and language
+until the user's days or bookings of the month change (see
+:mod:`inhouse.bookingcache`).
+"""
+
+from calendar import HTMLCalendar, month_name
+import calendar
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.utils import dateformat, timezone, translation
+from django.utils.formats import get_format
+from django.utils.translation import ugettext as _
+
+from inhouse import bookingcache, models
+from inhouse.templatetags.utils import format_minutes_to_time
+
+# Seconds a rendered month is cached
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Session keys of the month shown by the calendar widget
+SESSION_MONTH = 'calendar_month'
+SESSION_YEAR = 'calendar_year'
+
+
+class Calendar(HTMLCalendar):
+    """A HTML calendar with small adjustments.
+
+    :param days: Optional dict mapping day numbers to dicts with the
+      booked ``minutes`` and the ``locked`` state
+    :param today: Date, that is highlighted
+    """
+
+    def __init__(self, days=None, today=None, firstweekday=0):
+        HTMLCalendar.__init__(self, firstweekday)
+        self.days = days or {}
+        self.today = today or datetime.date.today()
+
+    def formatday(self, day, weekday):
+        """Return a day as a table cell."""
+        if day != 0:
+            date = datetime.date(self.year, self.month, day)
+            cssclass = self.cssclasses[weekday]
+            title = dateformat.format(date, self.date_format)
+            if self.today == date:
+                cssclass += ' today'
+            marker = self.days.get(day)
+            if marker is not None:
+                if marker['locked']:
+                    cssclass += ' locked'
+                if marker['minutes']:
+                    cssclass += ' booked'
+                    title = u'%s: %s' % (
+                        title, format_minutes_to_time(marker['minutes']))
+            return ('<td class="%s"><a href="#" title="%s">%d</a></td>'
+                    % (cssclass, title, day))
+        else:
+            return '<td class="noday">&nbsp;</td>' # day outside month
+
+    def formatmonthname(self, theyear, themonth, withyear=True):
+        """Return a month name as a table row.
+
+        The arrows link to the adjacent months. Their ``data-url``
+        attribute points to the JSON representation of the month.
+        """
+        v = []
+        if withyear:
+            s = '%s %s' % (month_name[themonth], theyear)
+        else:
+            s = '%s' % month_name[themonth]
+        v.append('<tr><th colspan="7" class="month">%s' % s)
+        v.append('<div class="btn-group" style="float:right;">')
+        previous, next_ = get_adjacent_months(theyear, themonth)
+        for (year, month), title, icon in (
+            (previous, _(u'Show previous month'), 'icon-arrow-left'),
+            (next_, _(u'Show next month'), 'icon-arrow-right')):
+            v.append(('<a class="btn btn-mini calendar-nav" title="%s"'
+                      ' href="?calendar_month=%d&amp;calendar_year=%d"'
+                      ' data-url="%s"><i class="%s"></i></a>')
+                     % (title, month, year, get_url(year, month), icon))
+        v.append('</div>')
+        v.append('</th>')
+        v.append('</tr>')
+        return ''.join(v)
+
+    def formatmonth(self, year, month):
+        self.year, self.month = year, month
+        self.date_format = get_format('SHORT_DATE_FORMAT')
+        return super(Calendar, self).formatmonth(year, month)
+
+
+def get_adjacent_months(year, month):
+    """Returns the months before and after a month.
+
+    :returns: Tuple of two tuples (year, month)
+    """
+    previous = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_ = (year + 1, 1) if month == 12 else (year, month + 1)
+    return previous, next_
+
+
+def get_url(year, month):
+    """Returns the URL of a month's JSON representation."""
+    return reverse('inhouse:calendar_month',
+                   kwargs={'year': '%04d' % year, 'month': '%02d' % month})
+
+
+def get_day_markers(user_id, year, month):
+    """Returns the booked minutes and locked state of a user's days.
+
+    :param user_id: Id of the user
+    :returns: Dict mapping day numbers to dicts with the keys
+      ``minutes`` and ``locked``, days without :class:`Day` are missing
+    """
+    last = calendar.monthrange(year, month)[1]
+    query = models.Day.objects.filter(
+        user=user_id, date__gte=datetime.date(year, month, 1),
+        date__lte=datetime.date(year, month, last))
+    return dict((date.day, {'minutes': minutes, 'locked': locked})
+                for date, minutes, locked in query.values_list(
+                    'date', 'booking_sum', 'locked'))
+
+
+def get_cache_key(user_id, year, month, language, today):
+    """Returns the cache key of a rendered month.
+
+    Today's date is part of the key for the current month only, so past
+    and future months stay cached across days.
+    """
+    key = 'inhouse.calendar.%d.%04d-%02d.%s.%s' % (
+        user_id, year, month, language,
+        bookingcache.get_version(user_id, year, month))
+    if (today.year, today.month) == (year, month):
+        key += '.%d' % today.day
+    return key
+
+
+def get_month(user_id, year, month, language=None, today=None):
+    """Returns the rendered month of a user.
+
+    :param user_id: Id of the user
+    :param language: Language of the HTML, defaults to the active one
+    :param today: Highlighted date, defaults to today
+    :returns: Dict with the keys ``year``, ``month``, ``weeks`` (lists
+      of day numbers, 0 for days outside the month), ``days`` (see
+      :func:`get_day_markers`), ``today`` (day number or ``None``),
+      ``html`` and ``modified`` (time of rendering)
+    """
+    language = language or translation.get_language()
+    today = today or datetime.date.today()
+    key = get_cache_key(user_id, year, month, language, today)
+    entry = cache.get(key)
+    if entry is None:
+        days = get_day_markers(user_id, year, month)
+        cal = Calendar(days, today)
+        with translation.override(language):
+            html = cal.formatmonth(year, month)
+        entry = {
+            'year': year,
+            'month': month,
+            'weeks': cal.monthdayscalendar(year, month),
+            'days': days,
+            'today': (today.day if (today.year, today.month) == (year, month)
+                      else None),
+            'html': html,
+            'modified': timezone.now(),
+        }
+        cache.set(key, entry, CACHE_TIMEOUT)
+    return entry
+
+
+def get_etag(user_id, year, month, language=None, today=None):
+    """Returns an entity tag for the month of a user.
+
+    The tag is derived from the cache key, so it is known without
+    reading or rendering the month and changes whenever the month is
+    invalidated.
+    """
+    language = language or translation.get_language()
+    today = today or datetime.date.today()
+    key = get_cache_key(user_id, year, month, language, today)
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def prefetch_adjacent_months(user_id, year, month, language=None,
+                             today=None):
+    """Renders the months before and after a month into the cache.
+
+    Months, that are already cached, don't cause queries.
+    """
+    for adjacent in get_adjacent_months(year, month):
+        get_month(user_id, adjacent[0], adjacent[1], language, today)
+
+
+def get_session_month(session, today=None):
+    """Returns the month the calendar widget shows.
+
+    :param session: The request's session
+    :param today: Fallback date, defaults to today
+    :returns: Tuple (year, month) from the session or of today if the
+      session doesn't contain a valid month
+    """
+    today = today or datetime.date.today()
+    try:
+        year = int(session.get(SESSION_YEAR) or today.year)
+        month = int(session.get(SESSION_MONTH) or today.month)
+    except (TypeError, ValueError):
+        return today.year, today.month
+    if not (1 <= month <= 12
+            and datetime.MINYEAR <= year <= datetime.MAXYEAR):
+        return today.year, today.month
+    return year, month
+
+
+def set_session_month(session, year, month):
+    """Stores the month the calendar widget shows.
+
+    The session is only modified, if the month differs from the one
+    returned by :func:`get_session_month`, so unchanged sessions are
+    not saved again.
+
+    :returns: ``True`` if the session was modified
+    """
+    if get_session_month(session) == (year, month):
+        return False
+    session[SESSION_YEAR] = year
+    session[SESSION_MONTH] = month
+    return True
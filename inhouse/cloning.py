@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""Cloning of projects.
+
+A project is copied together with its steps, members, issue trackers
+and optionally its rates. The child objects are read with one query
+and written with one bulk insert per model, so the number of queries
+doesn't depend on the size of the project.
+"""
+
+from django.db import transaction
+
+from inhouse import dashboardcache, models
+from inhouse.utils import current_user
+
+
+def _bulk_create(model, objs):
+    """Inserts the new objects with one query."""
+    model.objects.bulk_create(current_user.stamp(objs))
+
+
+def clone_project(project, name=None, steps=True, members=True,
+                  trackers=True, rates=False):
+    """Creates a copy of a project and optionally of its child objects.
+
+    The copy is its own master project. Copied steps are opened and keep
+    their order. The default steps of copied members are mapped to the
+    copied steps by name, members without matching step get no default
+    step.
+
+    :param project: The :class:`Project` to copy
+    :param name: Name of the copy, defaults to "Copy of '<name>'"
+    :param steps: Copy the project steps
+    :param members: Copy the project members
+    :param trackers: Copy the issue tracker assignments
+    :param rates: Copy the project rates and the rates of copied members
+    :returns: The new :class:`Project` instance
+    :raises ValidationError: If the copy is invalid, e.g. the name is
+      already used
+    """
+    with transaction.commit_on_success():
+        new = models.Project.copy(project)
+        if name:
+            new.name = name
+        new.save()
+        new.master = new
+        models.Project.objects.filter(pk=new.pk).update(master=new)
+        step_ids = {}
+        if steps:
+            query = project.projectstep_set.order_by('position', 'id')
+            _bulk_create(models.ProjectStep, [
+                models.ProjectStep(project=new, name=step_name,
+                                   description=description,
+                                   status=models.STEP_STATUS_OPEN,
+                                   position=position)
+                for position, (step_name, description) in enumerate(
+                    query.values_list('name', 'description'), 1)])
+            step_ids = dict(new.projectstep_set.values_list('name', 'id'))
+        if members:
+            query = project.projectuser_set.order_by('id')
+            _bulk_create(models.ProjectUser, [
+                models.ProjectUser(project=new, user_id=user_id,
+                                   default_step_id=step_ids.get(step_name))
+                for user_id, step_name in query.values_list(
+                    'user', 'default_step__name')])
+        if trackers:
+            query = project.projecttracker_set.order_by('id')
+            _bulk_create(models.ProjectTracker, [
+                models.ProjectTracker(project=new, tracker_id=tracker_id)
+                for tracker_id in query.values_list('tracker', flat=True)])
+        if rates:
+            _clone_rates(project, new, members)
+    # the bulk inserts bypass the receivers
+    dashboardcache.invalidate(dashboardcache.WIDGET_STEPS)
+    return new
+
+
+def _clone_rates(project, new, members):
+    """Copies the project rates and the rates of the copied members."""
+    _bulk_create(models.ProjectRate, [
+        models.ProjectRate(project=new, valid_from=valid_from,
+                           valid_until=valid_until, hourly_rate=hourly_rate)
+        for valid_from, valid_until, hourly_rate in
+        project.projectrate_set.order_by('id').values_list(
+            'valid_from', 'valid_until', 'hourly_rate')])
+    if not members:
+        return
+    member_ids = dict(new.projectuser_set.values_list('user', 'id'))
+    query = models.ProjectUserRate.objects.filter(
+        project_user__project=project).order_by('id')
+    fields = ('purchase_rate', 'sale_rate', 'hours', 'hourly_rate',
+              'valid_from', 'valid_until')
+    _bulk_create(models.ProjectUserRate, [
+        models.ProjectUserRate(project_user_id=member_ids[row[0]],
+                               **dict(zip(fields, row[1:])))
+        for row in query.values_list('project_user__user', *fields)])
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""Data shown on the user's dashboard.
+
+Each widget is read with a fixed number of queries and cached per user
+(see :mod:`inhouse.dashboardcache`), the news per group set, so a warm
+dashboard runs no queries at all.
+"""
+
+import collections
+import datetime
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.urlresolvers import NoReverseMatch, reverse
+
+from inhouse import bookingcache, dashboardcache, models
+
+# Maximum number of starred items shown on the dashboard
+STARRED_ITEMS_LIMIT = 20
+
+# Maximum number of open project steps shown on the dashboard
+OPEN_STEPS_LIMIT = 20
+
+# Maximum number of news shown on the dashboard
+NEWS_LIMIT = 10
+
+StarredEntry = collections.namedtuple('StarredEntry',
+                                      'star_id content_type object url')
+
+
+def _get_admin_url(obj):
+    """Returns the admin change page of an object or ``None``."""
+    # accessing restricted _meta is intended: pylint:disable=W0212
+    opts = obj._meta
+    try:
+        return reverse('admin:%s_%s_change' % (opts.app_label,
+                                               opts.module_name),
+                       args=(obj.pk,))
+    except NoReverseMatch:
+        return None
+
+
+def get_starred_items(user, limit=STARRED_ITEMS_LIMIT):
+    """Returns the objects starred by a user, most recent star first.
+
+    The stars are grouped by content type and the objects of each type
+    are fetched with one query. The number of queries depends only on
+    the number of starred types, not on the number of stars. Stars of
+    deleted objects are skipped.
+
+    :param user: A :class:`User` instance
+    :param limit: Maximum number of stars or ``None`` for all
+    :returns: List of :class:`StarredEntry`
+    """
+    query = models.StarredItem.objects.filter(user=user).order_by('-id')
+    if limit is not None:
+        query = query[:limit]
+    stars = list(query.values_list('id', 'content_type', 'object_id'))
+    ids = collections.defaultdict(set)
+    for _star_id, content_type_id, object_id in stars:
+        ids[content_type_id].add(object_id)
+    objects = {}
+    for content_type_id, object_ids in ids.iteritems():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        # accessing restricted _default_manager is intended
+        # pylint:disable=W0212
+        for obj in model._default_manager.filter(pk__in=object_ids):
+            objects[(content_type_id, obj.pk)] = obj
+    entries = []
+    for star_id, content_type_id, object_id in stars:
+        obj = objects.get((content_type_id, object_id))
+        if obj is not None:
+            entries.append(StarredEntry(
+                star_id, ContentType.objects.get_for_id(content_type_id),
+                obj, _get_admin_url(obj)))
+    return entries
+
+
+def get_week(user, today=None):
+    """Returns the booked minutes of the user's days in a week.
+
+    :param user: A :class:`User` instance
+    :param today: A day of the week, defaults to today
+    :returns: Dict with the keys ``days`` (list of tuples (date,
+      minutes) from Monday to Sunday) and ``total`` (minutes)
+    """
+    today = today or datetime.date.today()
+    monday = today - datetime.timedelta(today.weekday())
+    sunday = monday + datetime.timedelta(6)
+    minutes = dict(models.Day.objects.filter(
+        user=user, date__gte=monday, date__lte=sunday).values_list(
+        'date', 'booking_sum'))
+    days = [(date, minutes.get(date) or 0) for date in
+            (monday + datetime.timedelta(i) for i in range(7))]
+    return {'days': days, 'total': sum(x[1] for x in days)}
+
+
+def get_running_timers(user):
+    """Returns the user's active timers, the oldest first.
+
+    :param user: A :class:`User` instance
+    :returns: List of :class:`Timer`
+    """
+    return list(models.Timer.objects.filter(
+        created_by=user.id, active=True).order_by('start_time', 'id'))
+
+
+def get_open_steps(user, limit=OPEN_STEPS_LIMIT):
+    """Returns the open steps of active projects, the user is member of.
+
+    :param user: A :class:`User` instance
+    :param limit: Maximum number of steps
+    :returns: List of :class:`ProjectStep` with their projects
+    """
+    return list(models.ProjectStep.objects.filter(
+        status=models.STEP_STATUS_OPEN,
+        project__status__in=models.PROJECT_ACTIVE_STATUS,
+        project__projectuser__user=user).select_related('project').distinct()
+        .order_by('project__name', 'position', 'id')[:limit])
+
+
+def get_news(user, today=None, limit=NEWS_LIMIT):
+    """Returns the valid news of the user's groups.
+
+    The news are cached per group set (see :meth:`News.get_for_groups`).
+
+    :param user: A :class:`User` instance
+    :param today: Date the news must be valid on, defaults to today
+    :param limit: Maximum number of news
+    :returns: List of :class:`News`, the most important first
+    """
+    return models.News.get_for_user(user.id, today)[:limit]
+
+
+def get_dashboard(user, today=None):
+    """Returns the data of all dashboard widgets from the cache.
+
+    A cold cache costs one query per widget, one per starred content
+    type and one more for the user's groups. The starred items are
+    invalidated only when stars change; renamed or deleted objects show
+    up after :data:`inhouse.dashboardcache.CACHE_TIMEOUT` at the latest.
+
+    :param user: A :class:`User` instance
+    :param today: Current date, defaults to today
+    :returns: Dict with the keys ``week``, ``running_timers``,
+      ``starred_items``, ``open_steps`` and ``news``
+    """
+    today = today or datetime.date.today()
+    monday = today - datetime.timedelta(today.weekday())
+    sunday = monday + datetime.timedelta(6)
+    week_version = '.'.join(
+        [monday.isoformat()] + [bookingcache.get_version(user.id, *month)
+                               for month in bookingcache.get_months(monday,
+                                                                    sunday)])
+    cached = dashboardcache.get
+    return {
+        'week': cached(dashboardcache.WIDGET_WEEK, user.id,
+                       lambda: get_week(user, today), week_version),
+        'running_timers': cached(dashboardcache.WIDGET_TIMERS, user.id,
+                                 lambda: get_running_timers(user)),
+        'starred_items': cached(dashboardcache.WIDGET_STARRED, user.id,
+                                lambda: get_starred_items(user)),
+        'open_steps': cached(dashboardcache.WIDGET_STEPS, user.id,
+                             lambda: get_open_steps(user)),
+        'news': get_news(user, today),
+    }
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""Versions of the cached dashboard widgets.
+
+Each widget is cached per user. The cache key includes a version of the
+widget for all users and one for the user, so a widget can be
+invalidated for single users or for all users without knowing the keys.
+The receivers invalidating the widgets are connected in
+:mod:`inhouse.models`.
+"""
+
+from django.core.cache import cache
+
+from inhouse.utils import new_version
+
+# Widgets cached by the dashboard
+WIDGET_WEEK = 'week'
+WIDGET_TIMERS = 'timers'
+WIDGET_STARRED = 'starred'
+WIDGET_STEPS = 'steps'
+
+# Seconds a widget is cached, also bounds the age of data, that isn't
+# invalidated explicitly
+CACHE_TIMEOUT = 60 * 10
+
+_KEY = 'inhouse.dashboard.%s.%d.%s'
+_USER_VERSION_KEY = 'inhouse.dashboard.%s.%d.version'
+_ALL_VERSION_KEY = 'inhouse.dashboard.%s.all.version'
+
+
+def get_version(widget, user_id):
+    """Returns the current version of a user's widget."""
+    keys = [_ALL_VERSION_KEY % widget, _USER_VERSION_KEY % (widget, user_id)]
+    versions = cache.get_many(keys)
+    missing = dict((key, new_version()) for key in keys
+                   if key not in versions)
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT * 2)
+        versions.update(missing)
+    return '%s.%s' % (versions[keys[0]], versions[keys[1]])
+
+
+def get(widget, user_id, func, version=''):
+    """Returns a user's widget data from the cache.
+
+    :param widget: Name of the widget
+    :param user_id: Id of the user
+    :param func: Callable without arguments, that returns the data on a
+      cache miss
+    :param version: Additional version, e.g. derived from the date
+    :returns: The data
+    """
+    key = _KEY % (widget, user_id,
+                  '%s.%s' % (get_version(widget, user_id), version))
+    data = cache.get(key)
+    if data is None:
+        data = func()
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(widget, user_ids=None):
+    """Invalidates a widget.
+
+    :param widget: Name of the widget
+    :param user_ids: List of user ids or ``None`` for all users
+    """
+    if user_ids is None:
+        cache.delete(_ALL_VERSION_KEY % widget)
+    else:
+        cache.delete_many([_USER_VERSION_KEY % (widget, user_id)
+                           for user_id in set(user_ids)])
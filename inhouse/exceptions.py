@@ -2,6 +2,8 @@
 
 """Inhouse exception classes."""
 
+from django.core.exceptions import ValidationError
+
 
 class InhouseError(StandardError):
     """Base error class."""
@@ -11,3 +13,23 @@ class InhouseError(StandardError):
 class InhouseModelError(InhouseError):
     """Class for model errors."""
     pass
+
+
+class InhouseBulkValidationError(ValidationError):
+    """Validation errors of several model instances.
+
+    The messages are prefixed with the position of the invalid instance.
+
+    :attr errors: Dict mapping positions to the message dict of the
+      instance at that position
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        message_dict = {}
+        for index, messages in sorted(errors.iteritems()):
+            for field, field_messages in messages.iteritems():
+                message_dict.setdefault(field, []).extend(
+                    u'#%d: %s' % (index, message)
+                    for message in field_messages)
+        super(InhouseBulkValidationError, self).__init__(message_dict)
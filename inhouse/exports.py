@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming export of bookings.
+
+Bookings are read in chunks ordered by primary key, each chunk is
+fetched with one query that joins the related day, user, project,
+step, issue and tracker and only selects the exported columns. The
+output is generated incrementally, so memory usage doesn't depend on
+the number of exported bookings.
+"""
+
+import cStringIO
+import csv
+
+from inhouse import models
+from inhouse.utils import json_ext as json
+
+FORMATS = ('csv', 'json')
+
+# Number of bookings fetched per query
+CHUNK_SIZE = 1000
+
+# Pairs of column name and lookup
+COLUMNS = (
+    ('id', 'id'),
+    ('date', 'day__date'),
+    ('user', 'day__user__username'),
+    ('project', 'project__name'),
+    ('step', 'step__name'),
+    ('tracker', 'issue__tracker__name'),
+    ('issue', 'issue__no'),
+    ('title', 'title'),
+    ('from', 'from_time'),
+    ('to', 'to_time'),
+    ('duration', 'duration'),
+    ('invoice', 'invoice'),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+def get_bookings(project=None, user=None, tracker=None, invoice=None,
+                 date_from=None, date_until=None):
+    """Returns the bookings matching the filters.
+
+    The filters correspond to the ``list_filter`` of the booking admin.
+    Filters that are ``None`` are ignored.
+
+    :param project: Project id
+    :param user: User id
+    :param tracker: Issue tracker id
+    :param invoice: Invoice id or ``False`` for uninvoiced bookings
+    :param date_from: First day of the period
+    :param date_until: Last day of the period
+    :returns: Query of :class:`Booking`
+    """
+    query = models.Booking.objects.all()
+    if project is not None:
+        query = query.filter(project=project)
+    if user is not None:
+        query = query.filter(day__user=user)
+    if tracker is not None:
+        query = query.filter(issue__tracker=tracker)
+    if invoice is False:
+        query = query.filter(invoice__isnull=True)
+    elif invoice is not None:
+        query = query.filter(invoice=invoice)
+    if date_from is not None:
+        query = query.filter(day__date__gte=date_from)
+    if date_until is not None:
+        query = query.filter(day__date__lte=date_until)
+    return query
+
+
+def iter_rows(query, chunk_size=CHUNK_SIZE):
+    """Yields the export columns of all bookings in a query.
+
+    Instead of an offset, each chunk continues after the last primary
+    key of the previous one, so every chunk is a cheap index range scan.
+
+    :param query: Query of :class:`Booking`
+    :param chunk_size: Number of bookings fetched per query
+    :returns: Generator of tuples with the values of :data:`COLUMNS`
+    """
+    lookups = [lookup for _name, lookup in COLUMNS]
+    query = query.order_by('id').values_list(*lookups)
+    last_id = 0
+    while True:
+        rows = list(query.filter(id__gt=last_id)[:chunk_size])
+        for row in rows:
+            yield row
+        if len(rows) < chunk_size:
+            break
+        last_id = rows[-1][0]
+
+
+def iter_csv(rows):
+    """Yields the rows as CSV lines encoded in UTF-8, with header line."""
+    buf = cStringIO.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _lookup in COLUMNS])
+    for row in rows:
+        writer.writerow([u'' if x is None else unicode(x).encode('utf-8')
+                         for x in row])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_json(rows):
+    """Yields the rows as JSON list of objects."""
+    names = [name for name, _lookup in COLUMNS]
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(dict(zip(names, row)))
+        separator = ',\n'
+    yield ']\n'
+
+
+def export(query, fmt, chunk_size=CHUNK_SIZE):
+    """Returns a generator for the export of the bookings.
+
+    :param query: Query of :class:`Booking`
+    :param fmt: One of :data:`FORMATS`
+    :param chunk_size: Number of bookings fetched per query
+    """
+    rows = iter_rows(query, chunk_size)
+    if fmt == 'csv':
+        return iter_csv(rows)
+    elif fmt == 'json':
+        return iter_json(rows)
+    raise ValueError('Unknown export format %r' % fmt)
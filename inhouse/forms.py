@@ -418,10 +418,60 @@ class Communication(ModelForm):
         model = models.Communication
 
 
+class BookingExportForm(Form):
+    """Filters of a booking export, matching the booking admin filters."""
+
+    project = forms.IntegerField(required=False)
+    user = forms.IntegerField(required=False)
+    tracker = forms.IntegerField(required=False)
+    invoice = forms.IntegerField(required=False)
+    uninvoiced = forms.BooleanField(required=False)
+    date_from = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+    date_until = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+
+    def clean(self):
+        data = self.cleaned_data
+        if data.get('invoice') is not None and data.get('uninvoiced'):
+            raise ValidationError(_(u'"invoice" and "uninvoiced" are'
+                                    u' mutually exclusive.'))
+        return data
+
+    def get_filters(self):
+        """Returns the keyword arguments for
+        :func:`inhouse.exports.get_bookings`."""
+        data = self.cleaned_data.copy()
+        if data.pop('uninvoiced'):
+            data['invoice'] = False
+        return data
+
+
+class InvoiceRunForm(Form):
+    """Form to choose the period of an invoice run."""
+
+    valid_from = DatePickerField(label=_(u'From'))
+    valid_until = DatePickerField(label=_(u'To'))
+
+    def clean(self):
+        data = self.cleaned_data
+        valid_from = data.get('valid_from')
+        valid_until = data.get('valid_until')
+        if valid_from and valid_until and valid_from > valid_until:
+            raise ValidationError(_(u'"From" must be smaller than "To".'))
+        return data
+
+
 class LoginForm(InhouseMixin, BaseAuthenticationForm):
     """Form used to login a user."""
 
 
+class ThrottledLoginForm(LoginForm):
+    """Login form, that rejects every login without checking it."""
+
+    def clean(self):
+        raise ValidationError(_(u'Too many failed logins. Please try again'
+                                u' later.'))
+
+
 class ProjectCopyForm(Form):
     """Form to create a project copy."""
 
@@ -435,6 +485,9 @@ class ProjectCopyForm(Form):
     tracker = forms.BooleanField(label=_(u'Tracker'), required=False,
                                  help_text=_(u'Copies all issue tracker'
                                              u' assignments.'))
+    rates = forms.BooleanField(label=_(u'Rates'), required=False,
+                               help_text=_(u'Copies the project rates and'
+                                           u' the rates of copied members.'))
 
 
 class ProjectDefaultStepForm(Form):
@@ -449,6 +502,44 @@ class ProjectDefaultStepForm(Form):
         bound_field.field.choices = choices
 
 
+class TimerBookingForm(Form):
+    """Form to book the stopped timers of a period on a project.
+
+    :param user: The booking user, only the active projects, the user is
+      member of, can be chosen
+    """
+
+    project = forms.ModelChoiceField(
+        queryset=models.Project.objects.filter(
+            status__in=models.PROJECT_ACTIVE_STATUS),
+        label=_(u'Project'))
+    step = forms.ModelChoiceField(
+        queryset=models.ProjectStep.objects.filter(
+            status=models.STEP_STATUS_OPEN),
+        required=False, label=_(u'Step'))
+    date_from = forms.DateField(label=_(u'From'), input_formats=['%Y-%m-%d'])
+    date_until = forms.DateField(label=_(u'To'), input_formats=['%Y-%m-%d'])
+
+    def __init__(self, user, *args, **kwargs):
+        super(TimerBookingForm, self).__init__(*args, **kwargs)
+        self.set_queryset('project', models.Project.objects.filter(
+            status__in=models.PROJECT_ACTIVE_STATUS,
+            projectuser__user=user).distinct())
+
+    def clean(self):
+        data = self.cleaned_data
+        date_from = data.get('date_from')
+        date_until = data.get('date_until')
+        if date_from and date_until and date_from > date_until:
+            raise ValidationError(_(u'"From" must be smaller than "To".'))
+        step = data.get('step')
+        project = data.get('project')
+        if step and project and step.project_id != project.id:
+            raise ValidationError(_(u'The step doesn\'t belong to the'
+                                    u' project.'))
+        return data
+
+
 class UserProfileAddressForm(Address):
     """Minimal address form used in the user profile."""
 
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""Invoice generation.
+
+An invoice run attaches all uninvoiced bookings of a project and
+period to a new :class:`Invoice`. The bookings are updated in chunks
+of set-based UPDATE statements instead of saving each booking.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from inhouse import billing, models
+from inhouse.utils import chunked, current_user
+
+# Number of bookings assigned per UPDATE statement
+CHUNK_SIZE = 500
+
+
+def get_invoiceable_bookings(project, valid_from, valid_until):
+    """Returns the bookings, that can be invoiced for a period.
+
+    These are all bookings of the project without invoice on unlocked
+    days within the period.
+
+    :param project: A :class:`Project` instance
+    :param valid_from: First day of the period
+    :param valid_until: Last day of the period
+    :returns: Query of :class:`Booking`
+    """
+    return models.Booking.objects.filter(
+        project=project, invoice__isnull=True, day__locked=False,
+        day__date__gte=valid_from, day__date__lte=valid_until)
+
+
+def create_invoice(project, valid_from, valid_until, chunk_size=CHUNK_SIZE,
+                   progress=None):
+    """Creates an invoice for all invoiceable bookings of a period.
+
+    Everything happens in one transaction. The project row is locked,
+    so concurrent runs for the same project are serialized while runs
+    for different projects don't block each other.
+
+    :param project: A :class:`Project` instance
+    :param valid_from: First day of the period
+    :param valid_until: Last day of the period
+    :param chunk_size: Number of bookings per UPDATE statement
+    :param progress: Optional callable, called with the number of
+      assigned and the total number of bookings after each chunk
+    :returns: Tuple of the new :class:`Invoice` and its
+      :class:`inhouse.billing.BillingResult` or ``(None, None)`` if
+      there is nothing to invoice
+    """
+    with transaction.commit_on_success():
+        # Lock the project row until the transaction ends
+        list(models.Project.objects.select_for_update().filter(
+            pk=project.pk).values_list('pk', flat=True))
+        ids = list(get_invoiceable_bookings(project, valid_from, valid_until)
+                   .order_by('id').values_list('id', flat=True))
+        if not ids:
+            return None, None
+        invoice = models.Invoice.new(project=project, valid_from=valid_from,
+                                     valid_until=valid_until)
+        values = {'invoice': invoice, 'modified': timezone.now()}
+        if current_user.is_set():
+            values['modified_by'] = current_user.get_user_id()
+        done = 0
+        for chunk in chunked(ids, chunk_size):
+            # Days may have been locked since the ids were read
+            done += models.Booking.objects.filter(
+                id__in=chunk, invoice__isnull=True,
+                day__locked=False).update(**values)
+            if progress is not None:
+                progress(done, len(ids))
+        result = billing.price_bookings(
+            models.Booking.objects.filter(invoice=invoice))
+    return invoice, result
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""Locking and unlocking of days in bulk.
+
+Bookings on locked days can't be changed anymore. Days are locked at
+the end of a month for a period and a scope of users with one UPDATE
+statement.
+"""
+
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from inhouse import bookingcache, models
+from inhouse.utils import current_user
+
+
+def get_days(date_from, date_until, users=None, department=None):
+    """Returns the days of a period and scope.
+
+    Without users and department the days of all users are returned.
+
+    :param date_from: First day of the period
+    :param date_until: Last day of the period
+    :param users: Optional list of :class:`User` instances or ids
+    :param department: Optional :class:`Department`, its members' days
+      are returned
+    :returns: Query of :class:`Day`
+    """
+    query = models.Day.objects.filter(date__gte=date_from,
+                                      date__lte=date_until)
+    if users is not None:
+        query = query.filter(user__in=users)
+    if department is not None:
+        query = query.filter(user__departmentuser__department=department)
+    return query
+
+
+def set_locked(query, locked=True, user_id=None):
+    """Locks or unlocks days with one UPDATE.
+
+    Only days, whose state changes, are updated. The cached booking data
+    of the affected users and months is invalidated.
+
+    :param query: Query of :class:`Day`
+    :param locked: Lock (``True``) or unlock (``False``) the days
+    :param user_id: Id of the locking user, defaults to the current user
+    :returns: Number of changed days
+    """
+    if user_id is None:
+        user_id = current_user.get_user_id()
+    query = query.filter(locked=not locked)
+    period = query.aggregate(first=Min('date'), last=Max('date'))
+    if period['first'] is None:
+        return 0
+    user_ids = list(query.order_by().values_list('user', flat=True)
+                    .distinct())
+    now = timezone.now()
+    values = {'locked': locked, 'modified': now, 'modified_by': user_id,
+              'locked_by': None, 'locked_at': None}
+    if locked:
+        values.update(locked_by=user_id, locked_at=now)
+    count = query.update(**values)
+    bookingcache.invalidate(user_ids, period['first'], period['last'])
+    return count
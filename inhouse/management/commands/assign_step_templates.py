@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""Command to add steps for project step templates to many projects."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import models, steptemplates
+
+
+class Command(BaseCommand):
+
+    args = '<template id> [<template id> ...]'
+    help = _(u'Add steps for project step templates to projects, that'
+             u' lack them')
+    option_list = BaseCommand.option_list + (
+        make_option('--project', action='append', dest='projects',
+                    default=[],
+                    help='Project id or key, may be given more than once'),
+        make_option('--active', action='store_true', dest='active',
+                    default=False, help='All active projects'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            template_ids = [int(x) for x in args]
+        except ValueError:
+            raise CommandError('Usage: %s' % self.args)
+        if not template_ids:
+            raise CommandError('Usage: %s' % self.args)
+        found = set(models.ProjectStepTemplate.objects.filter(
+            id__in=template_ids).values_list('id', flat=True))
+        missing = set(template_ids) - found
+        if missing:
+            raise CommandError('Unknown templates: %s' % ', '.join(
+                str(x) for x in sorted(missing)))
+        if options['active']:
+            query = models.Project.objects.filter(
+                status__in=models.PROJECT_ACTIVE_STATUS)
+        elif options['projects']:
+            lookup = Q()
+            for value in options['projects']:
+                lookup |= Q(key=value)
+                if value.isdigit():
+                    lookup |= Q(pk=int(value))
+            query = models.Project.objects.filter(lookup)
+        else:
+            raise CommandError('Use --project or --active to choose'
+                               ' projects.')
+        counts = steptemplates.assign_step_templates(
+            query.values_list('id', flat=True), template_ids)
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('%d steps added to %d projects.\n'
+                              % (sum(counts.itervalues()), len(counts)))
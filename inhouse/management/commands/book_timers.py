@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Command to book the stopped timers of a user."""
+
+from optparse import make_option
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import models, timers
+from inhouse.forms import TimerBookingForm
+
+
+class Command(BaseCommand):
+
+    args = '<username> <project id or key> <from> <until>'
+    help = _(u'Book the stopped timers of a user and period on a project')
+    option_list = BaseCommand.option_list + (
+        make_option('--step', dest='step', help='Project step id'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 4:
+            raise CommandError('Usage: %s' % self.args)
+        username, project, date_from, date_until = args
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError('User "%s" does not exist.' % username)
+        query = Q(key=project)
+        if project.isdigit():
+            query |= Q(pk=int(project))
+        project_ids = models.Project.objects.filter(query).values_list(
+            'id', flat=True)
+        if not project_ids:
+            raise CommandError('Project "%s" does not exist.' % project)
+        form = TimerBookingForm({'project': project_ids[0],
+                                 'step': options['step'],
+                                 'date_from': date_from,
+                                 'date_until': date_until})
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        bookings, skipped = timers.book_timers(user, **form.cleaned_data)
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('%d timers booked, %d minutes.\n' % (
+                len(bookings), sum(x.duration for x in bookings)))
+        if skipped:
+            self.stderr.write('%d timers on locked days skipped: %s\n' % (
+                len(skipped), ', '.join(str(x.id) for x in skipped)))
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+"""Command to verify the booking rollups."""
+
+from optparse import make_option
+
+from django.core.management.base import CommandError, NoArgsCommand
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import rollups
+
+
+class Command(NoArgsCommand):
+
+    help = _(u'Compare the booking sums per week and month with the'
+             u' bookings')
+    option_list = NoArgsCommand.option_list + (
+        make_option('--fix', action='store_true', dest='fix', default=False,
+                    help='Rebuild the rollups if they are inconsistent'),
+    )
+
+    def handle_noargs(self, **options):
+        differences = rollups.check()
+        if not differences:
+            if int(options.get('verbosity', 1)) > 0:
+                self.stdout.write('The booking rollups are consistent.\n')
+            return
+        for model, key, stored, expected in differences:
+            self.stdout.write('%s %s: stored %s, expected %s\n'
+                              % (model.__name__, key, stored, expected))
+        if options['fix']:
+            rollups.rebuild()
+            self.stdout.write('Rebuilt the booking rollups.\n')
+        else:
+            raise CommandError('%d inconsistent rows, use --fix to rebuild'
+                               ' the rollups.' % len(differences))
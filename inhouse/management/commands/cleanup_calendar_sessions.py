@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""Command to delete sessions, that only store the calendar's month."""
+
+from optparse import make_option
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import calendars
+
+# Sessions are read and deleted in chunks of this size
+CHUNK_SIZE = 1000
+
+# Sessions with no other keys are orphaned
+ORPHANED_KEYS = frozenset([calendars.SESSION_MONTH, calendars.SESSION_YEAR])
+
+
+def get_orphaned_session_keys(chunk_size=CHUNK_SIZE):
+    """Returns the keys of sessions, that only store the calendar's month.
+
+    Such sessions were created for anonymous requests by earlier
+    versions of :class:`inhouse.middleware.CalendarSessionMiddleware`.
+
+    :returns: Generator of lists of session keys, one list per chunk
+    """
+    store = SessionStore()
+    last = ''
+    while True:
+        rows = list(Session.objects.filter(session_key__gt=last)
+                    .order_by('session_key')
+                    .values_list('session_key', 'session_data')[:chunk_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [key for key, data in rows
+               if set(store.decode(data)) <= ORPHANED_KEYS]
+
+
+class Command(BaseCommand):
+
+    help = _(u'Delete sessions, that only store the calendar\'s month')
+    option_list = BaseCommand.option_list + (
+        make_option('--dry-run', action='store_true', dest='dry_run',
+                    default=False,
+                    help='Count the sessions without deleting them'),
+    )
+
+    def handle(self, *args, **options):
+        if args:
+            raise CommandError('This command takes no arguments.')
+        if settings.SESSION_ENGINE != 'django.contrib.sessions.backends.db':
+            raise CommandError('Only database sessions can be cleaned up.')
+        count = 0
+        for keys in get_orphaned_session_keys():
+            if keys and not options['dry_run']:
+                Session.objects.filter(session_key__in=keys).delete()
+            count += len(keys)
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('%d sessions %s.\n' % (
+                count, 'found' if options['dry_run'] else 'deleted'))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""Command to create an invoice for a project and period."""
+
+from optparse import make_option
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import invoicing, models
+
+
+def parse_date(value):
+    """Parses a date in ISO format (YYYY-MM-DD)."""
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError('Invalid date "%s", use YYYY-MM-DD.' % value)
+
+
+class Command(BaseCommand):
+
+    args = '<project id or key> <from> <until>'
+    help = _(u'Create an invoice for all uninvoiced bookings of a period')
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size', type='int', dest='chunk_size',
+                    default=invoicing.CHUNK_SIZE,
+                    help='Number of bookings updated per statement'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 3:
+            raise CommandError('Usage: %s' % self.args)
+        query = Q(key=args[0])
+        if args[0].isdigit():
+            query |= Q(pk=int(args[0]))
+        try:
+            project = models.Project.objects.get(query)
+        except models.Project.DoesNotExist:
+            raise CommandError('Project "%s" does not exist.' % args[0])
+        valid_from = parse_date(args[1])
+        valid_until = parse_date(args[2])
+        if valid_from > valid_until:
+            raise CommandError('The period must not end before it starts.')
+        verbosity = int(options.get('verbosity', 1))
+
+        def progress(done, total):
+            if verbosity > 0:
+                self.stdout.write('%d/%d bookings assigned\n' % (done, total))
+                self.stdout.flush()
+
+        invoice, result = invoicing.create_invoice(
+            project, valid_from, valid_until,
+            chunk_size=options['chunk_size'], progress=progress)
+        if invoice is None:
+            self.stdout.write('Nothing to invoice.\n')
+            return
+        self.stdout.write('Created invoice %d: %s hours, amount %s\n'
+                          % (invoice.id, sum(x.hours for x in result.bookings),
+                             result.amount))
+        if result.unpriced:
+            self.stderr.write('%d bookings without hourly rate: %s\n' % (
+                len(result.unpriced),
+                ', '.join(str(x) for x in result.unpriced)))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""Command to export bookings as CSV or JSON."""
+
+from optparse import make_option
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import exports
+from inhouse.forms import BookingExportForm
+
+
+class Command(BaseCommand):
+
+    help = _(u'Export bookings as CSV or JSON')
+    option_list = BaseCommand.option_list + (
+        make_option('--format', dest='format', default='csv',
+                    choices=exports.FORMATS, help='Output format'),
+        make_option('--output', dest='output', default=None,
+                    help='Output file, defaults to stdout'),
+        make_option('--chunk-size', type='int', dest='chunk_size',
+                    default=exports.CHUNK_SIZE,
+                    help='Number of bookings fetched per query'),
+        make_option('--project', dest='project', help='Project id'),
+        make_option('--user', dest='user', help='User id'),
+        make_option('--tracker', dest='tracker', help='Issue tracker id'),
+        make_option('--invoice', dest='invoice', help='Invoice id'),
+        make_option('--uninvoiced', action='store_true', dest='uninvoiced',
+                    default=False, help='Only bookings without invoice'),
+        make_option('--from', dest='date_from',
+                    help='First day (YYYY-MM-DD)'),
+        make_option('--until', dest='date_until',
+                    help='Last day (YYYY-MM-DD)'),
+    )
+
+    def handle(self, *args, **options):
+        form = BookingExportForm(dict(
+            (name, options[name]) for name in ('project', 'user', 'tracker',
+                                               'invoice', 'uninvoiced',
+                                               'date_from', 'date_until')
+            if options[name]))
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        query = exports.get_bookings(**form.get_filters())
+        output = options['output']
+        fileobj = sys.stdout if output is None else open(output, 'wb')
+        try:
+            for data in exports.export(query, options['format'],
+                                       options['chunk_size']):
+                fileobj.write(data)
+        finally:
+            if output is not None:
+                fileobj.close()
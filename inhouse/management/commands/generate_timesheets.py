@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""Command to generate the monthly timesheets of all users."""
+
+from optparse import make_option
+import collections
+import multiprocessing
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import timesheets
+
+
+class Command(BaseCommand):
+
+    args = '<year> <month>'
+    help = _(u'Generate the monthly timesheets of all active users')
+    option_list = BaseCommand.option_list + (
+        make_option('--output-dir', dest='output_dir', default='timesheets',
+                    help='Directory for the timesheet files'),
+        make_option('--processes', type='int', dest='processes',
+                    default=multiprocessing.cpu_count(),
+                    help='Number of worker processes'),
+        make_option('--format', action='append', dest='formats',
+                    choices=timesheets.FORMATS,
+                    help='Output format, may be given more than once'),
+        make_option('--force', action='store_true', dest='force',
+                    default=False,
+                    help='Overwrite existing timesheets instead of resuming'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            year, month = [int(x) for x in args]
+            timesheets.get_period(year, month)
+        except ValueError:
+            raise CommandError('Usage: %s' % self.args)
+        output_dir = options['output_dir']
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        formats = tuple(options['formats'] or timesheets.FORMATS)
+        users = User.objects.filter(is_active=True).order_by('id')
+        tasks = [(user, year, month, output_dir, formats, options['force'])
+                 for user in users]
+        # Forked workers must not share the parent's connection.
+        connection.close()
+        start_time = time.time()
+        stats = collections.defaultdict(lambda: [0, 0.0])
+        failed = []
+        skipped = 0
+        pool = multiprocessing.Pool(options['processes'])
+        try:
+            for pid, user_id, count, elapsed, error in pool.imap_unordered(
+                timesheets.worker, tasks):
+                stats[pid][0] += 1
+                stats[pid][1] += elapsed
+                if error is not None:
+                    failed.append(user_id)
+                    self.stderr.write('User %d failed: %s\n'
+                                      % (user_id, error))
+                elif count is None:
+                    skipped += 1
+        except BaseException:
+            # Also stops the workers on interrupts, join() would wait
+            # for the remaining tasks otherwise.
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
+        end_time = time.time()
+        if int(options.get('verbosity', 1)) > 0:
+            for pid, (users, elapsed) in sorted(stats.iteritems()):
+                self.stdout.write('Worker %d: %d users in %.2fs (%.1f/s)\n'
+                                  % (pid, users, elapsed,
+                                     users / elapsed if elapsed else 0))
+            self.stdout.write('%d timesheets, %d skipped, %d failed in %.2f'
+                              ' seconds.\n' % (len(tasks), skipped,
+                                               len(failed),
+                                               end_time - start_time))
+        if failed:
+            raise CommandError('Timesheets failed for %d users, run the'
+                               ' command again to resume.' % len(failed))
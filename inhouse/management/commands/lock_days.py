@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""Command to lock or unlock the days of a period."""
+
+from optparse import make_option
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import locking, models
+from inhouse.management.commands.create_invoice import parse_date
+
+
+class Command(BaseCommand):
+
+    args = '<from> <until>'
+    help = _(u'Lock or unlock the days of a period')
+    option_list = BaseCommand.option_list + (
+        make_option('--user', action='append', dest='users', default=[],
+                    help='Username, may be given more than once'),
+        make_option('--department', dest='department',
+                    help='Department id or name'),
+        make_option('--all', action='store_true', dest='all',
+                    default=False, help='Days of all users'),
+        make_option('--unlock', action='store_false', dest='locked',
+                    default=True, help='Unlock instead of lock the days'),
+        make_option('--locked-by', dest='locked_by',
+                    help='Username recorded as locking user'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 2:
+            raise CommandError('Usage: %s' % self.args)
+        date_from = parse_date(args[0])
+        date_until = parse_date(args[1])
+        if date_from > date_until:
+            raise CommandError('The period must not end before it starts.')
+        scopes = [bool(options['users']), bool(options['department']),
+                  options['all']]
+        if scopes.count(True) != 1:
+            raise CommandError('Use exactly one of --user, --department and'
+                               ' --all.')
+        users = department = None
+        if options['users']:
+            users = list(User.objects.filter(
+                username__in=options['users']).values_list('id', flat=True))
+            if len(users) != len(set(options['users'])):
+                raise CommandError('Unknown users.')
+        elif options['department']:
+            query = Q(name=options['department'])
+            if options['department'].isdigit():
+                query |= Q(pk=int(options['department']))
+            try:
+                department = models.Department.objects.get(query)
+            except models.Department.DoesNotExist:
+                raise CommandError('Department "%s" does not exist.'
+                                   % options['department'])
+        locked_by = None
+        if options['locked_by']:
+            try:
+                locked_by = User.objects.get(
+                    username=options['locked_by']).id
+            except User.DoesNotExist:
+                raise CommandError('User "%s" does not exist.'
+                                   % options['locked_by'])
+        query = locking.get_days(date_from, date_until, users=users,
+                                 department=department)
+        count = locking.set_locked(query, options['locked'], locked_by)
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('%d days %s.\n' % (
+                count, 'locked' if options['locked'] else 'unlocked'))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+"""Command to recalculate the booking rollups."""
+
+import time
+
+from django.core.management.base import NoArgsCommand
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import rollups
+
+
+class Command(NoArgsCommand):
+
+    help = _(u'Recalculate the booking sums per week and month')
+
+    def handle_noargs(self, **options):
+        start_time = time.time()
+        weeks, months = rollups.rebuild()
+        end_time = time.time()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Created %d week and %d month rows in %.2f'
+                              ' seconds.\n' % (weeks, months,
+                                               end_time - start_time))
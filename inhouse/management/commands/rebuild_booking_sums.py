@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+"""Command to recalculate the booking sums of all days."""
+
+import time
+
+from django.core.management.base import NoArgsCommand
+from django.utils.translation import ugettext_lazy as _
+
+from inhouse import models
+
+
+class Command(NoArgsCommand):
+
+    help = _(u'Recalculate the booking sum of all days')
+
+    def handle_noargs(self, **options):
+        start_time = time.time()
+        count = models.Day.rebuild_booking_sums()
+        end_time = time.time()
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Updated %d days in %.2f seconds.\n'
+                              % (count, end_time - start_time))
@@ -9,11 +9,11 @@ import logging
 import traceback
 
 from django.conf import settings
-from django.db.models import loading
 from django.db.models.signals import pre_save
 from django.http import HttpResponse, Http404
 
-from inhouse import models
+from inhouse import calendars, models
+from inhouse.utils import current_user
 
 log = logging.getLogger('django')
 
@@ -28,99 +28,122 @@ class AjaxDebugMiddleware(object):
                                 mimetype='text/plain', status=500)
 
 
+def _pre_save_current_user(sender, instance, **kwds):
+    """Sets created_by and modified_by to the current request's user.
+
+    This receiver is connected once per process. It only touches
+    instances while a request is processed by
+    :class:`AutoCurrentUserMiddleware`.
+    """
+    # accessing restricted _meta is intended: pylint:disable=W0212
+    if not current_user.is_set():
+        return
+    if sender._meta.app_label != models.DefaultInfo._meta.app_label:
+        return
+    user_id = current_user.get_user_id()
+    if hasattr(instance, 'created_by') and not instance.created_by:
+        instance.created_by = user_id
+    if hasattr(instance, 'modified_by'):
+        instance.modified_by = user_id
+
+pre_save.connect(_pre_save_current_user,
+                 dispatch_uid='inhouse.middleware.current_user')
+
+
 class AutoCurrentUserMiddleware(object):
     """Updates created_by, modified_by attributes.
 
     The attributes created_by and modified_by are only updated for
-    models in dlgicert application.
+    models in the inhouse application.
+
+    The current user is stored in a thread local for the duration of
+    the request and read by a single pre_save receiver, so the
+    receiver list doesn't grow with the number of concurrent requests.
 
     This middleware class must come after AuthenticationMiddleware.
     """
 
-    def __init__(self):
-        # cache relevant models
-        self._app_models = loading.get_models(models)
-        super(AutoCurrentUserMiddleware, self).__init__()
-
     def process_request(self, request):
-        """Attaches a local callback function listening to pre_save signal."""
-        # we intentionally set protected members, pylint:disable=W0212
+        """Stores the current user for the pre_save receiver."""
         if request.user.is_authenticated():
-            user_id = request.user.id
+            current_user.set_user_id(request.user.id)
         else:
-            user_id = None
-
-        def pre_save_cb(*args, **kwds):
-            sender = kwds['sender']
-            instance = kwds['instance']
-            if sender in self._app_models:
-                if hasattr(instance, 'created_by') and not instance.created_by:
-                    instance.created_by = user_id
-                if hasattr(instance, 'modified_by'):
-                    instance.modified_by = user_id
-        # store dispatch_uid as request attribute
-        request._auto_current_user_uid = id(pre_save_cb)
-        # connect callback to pre_save signal
-        pre_save.connect(pre_save_cb, weak=False,
-                         dispatch_uid=request._auto_current_user_uid)
-
-    def _disconnect_callback(self, request):
-        """Actually removes callback attached in process_request."""
-        dispatch_uid = getattr(request, '_auto_current_user_uid', None)
-        if dispatch_uid is not None:
-            pre_save.disconnect(dispatch_uid=dispatch_uid)
+            current_user.set_user_id(None)
 
     def process_response(self, request, response):
-        """Removes callback attached in process_request."""
-        self._disconnect_callback(request)
+        """Removes the current user stored in process_request."""
+        current_user.clear()
         return response
 
     def process_exception(self, request, exception):
-        """Removes callback attached in process_request."""
+        """Removes the current user stored in process_request."""
         # exception unused, pylint: disable=W0613
-        self._disconnect_callback(request)
+        current_user.clear()
+
+
+def _accepts_html(request):
+    """Returns whether a request is a page request of a browser."""
+    if request.is_ajax():
+        return False
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return not accept or 'text/html' in accept or '*/*' in accept
 
 
 class CalendarSessionMiddleware(object):
+    """Stores the month selected for the calendar widget in the session.
+
+    The month is selected with the GET parameters calendar_month and
+    calendar_year. The session is only written for page requests of
+    authenticated users, that select another month than the stored
+    one. Other requests don't touch the session at all, the widget
+    reads the month when it is rendered (see
+    :func:`inhouse.calendars.get_session_month`).
+    """
 
     def process_request(self, request):
-        today = datetime.date.today()
-        if (not 'calendar_month' in request.session
-            or not request.session['calendar_month']):
-            request.session['calendar_month'] = today.month
-        if (not 'calendar_year' in request.session
-            or not request.session['calendar_year']):
-            request.session['calendar_year'] = today.year
-        if request.method == 'GET':
-            if 'calendar_month' in request.GET:
-                request.session['calendar_month'] = request.GET.get(
-                    'calendar_month', None)
-            if 'calendar_year' in request.GET:
-                request.session['calendar_year'] = request.GET.get(
-                    'calendar_year', None)
-
+        """Stores a newly selected month."""
+        if request.method != 'GET':
+            return
+        if (calendars.SESSION_MONTH not in request.GET
+            and calendars.SESSION_YEAR not in request.GET):
+            return
+        if not _accepts_html(request) or not request.user.is_authenticated():
+            return
+        year, month = calendars.get_session_month(request.session)
+        try:
+            year = int(request.GET.get(calendars.SESSION_YEAR, year))
+            month = int(request.GET.get(calendars.SESSION_MONTH, month))
+        except ValueError:
+            return
+        if 1 <= month <= 12 and datetime.MINYEAR <= year <= datetime.MAXYEAR:
+            calendars.set_session_month(request.session, year, month)
 
 
 class UserLanguageMiddleware(object):
     """Loads the profile for a logged in user and sets preferred language.
 
+    The profile is read from the cache (see
+    :meth:`inhouse.models.UserProfile.get_for_user`) and the session is
+    only written, if the preferred language differs from the stored
+    one.
+
     This middleware class must come after AuthenticationMiddleware and
     before LocaleMiddleware.
     """
 
+    languages = frozenset(x[0] for x in settings.LANGUAGES)
+
     def process_request(self, request):
         """Load user profile and activate settings."""
         if not request.user.is_authenticated():
             return
-        try:
-            user_profile = request.user.get_profile()
-        except models.UserProfile.DoesNotExist:
+        user_profile = models.UserProfile.get_for_user(request.user)
+        if user_profile is None:
             return
         lkey = 'django_language'
-        if user_profile.language in [x[0] for x in settings.LANGUAGES]:
-            request.session[lkey] = str(user_profile.language)
-        else:
-            try:
-                del request.session[lkey] # let Django do the rest
-            except KeyError:
-                pass
+        if user_profile.language in self.languages:
+            language = str(user_profile.language)
+            if request.session.get(lkey) != language:
+                request.session[lkey] = language
+        elif lkey in request.session:
+            del request.session[lkey] # let Django do the rest
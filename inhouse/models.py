@@ -11,16 +11,28 @@
 import calendar
 import cgi
 import datetime
+import decimal
+import hashlib
 
 from django.conf import settings
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import Group, Permission, User
 from django.contrib.contenttypes import generic
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.signals import request_finished
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from issues.models import Issue, Tracker
-from inhouse.exceptions import InhouseModelError
+from inhouse import bookingcache, dashboardcache
+from inhouse.auth import backends as auth_backends
+from inhouse.exceptions import InhouseBulkValidationError, InhouseModelError
+from inhouse.utils import (chunked, commit_on_success_unless_managed,
+                           current_user, delete_pending, new_version)
 
 # Languages
 LANGUAGE_CHOICES = [(x[0], _(x[1])) for x in settings.LANGUAGES]
@@ -57,6 +69,21 @@ STEP_STATUS_CHOICES = (
     (STEP_STATUS_CLOSED, _(u'Closed')),
 )
 
+# Maximum booking duration of a day in minutes
+MAX_MINUTES_PER_DAY = 1440
+
+# Precision of billed amounts
+AMOUNT_PRECISION = decimal.Decimal('0.01')
+
+# Seconds the starred items of a user are cached
+STARRED_ITEMS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a user's profile is cached
+USER_PROFILE_CACHE_TIMEOUT = 60 * 60
+
+# Seconds the news of a group set are cached
+NEWS_CACHE_TIMEOUT = 60 * 60 * 24
+
 # Priorities
 PRIORITY_CHOICES = (
     (1, _(u'Low')),
@@ -64,6 +91,40 @@ PRIORITY_CHOICES = (
     (3, _(u'High'))
 )
 
+
+
+def calculate_amount(duration, hourly_rate, coefficient):
+    """Calculates the billed amount of a booking.
+
+    :param duration: Duration in minutes
+    :param hourly_rate: Hourly rate
+    :param coefficient: Billing coefficient
+    :returns: Amount as decimal
+    """
+    amount = (decimal.Decimal(duration) / 60 * hourly_rate
+              * decimal.Decimal(coefficient))
+    return amount.quantize(AMOUNT_PRECISION, rounding=decimal.ROUND_HALF_UP)
+
+
+def round_duration(seconds):
+    """Rounds a timer duration to quarter hours.
+
+    Durations up to 15 minutes count as 15 minutes, longer durations
+    are rounded to the nearest quarter hour.
+
+    :param seconds: Duration in seconds
+    :returns: Duration in minutes
+    """
+    minutes = seconds // 60
+    if minutes <= 15:
+        return 15
+    scrap = minutes % 15
+    minutes -= scrap
+    if scrap >= 7.5:
+        minutes += 15
+    return minutes
+
+
 # Monkey-patch DEFAULT_NAMES for Meta options. Otherwise
 # db_column_prefix would raise an error.
 from django.db.models import options
@@ -167,9 +228,167 @@ class DefaultInfo(models.Model):
         obj.save()
         return obj
 
+    @classmethod
+    def validate_batch(cls, objs):
+        """Validates new instances without a query per instance.
+
+        Field values and :meth:`clean` are checked in memory. Foreign
+        keys are not looked up, the database enforces them. Uniqueness
+        is checked with one query per unique constraint for the whole
+        batch, including duplicates within the batch. The messages are
+        the same as those of :meth:`full_clean`.
+
+        :param objs: List of new instances of this class
+        :raises InhouseBulkValidationError: If any instance is invalid
+        """
+        errors = {}
+
+        def add_errors(index, message_dict):
+            messages = errors.setdefault(index, {})
+            for field, field_messages in message_dict.iteritems():
+                messages.setdefault(field, []).extend(field_messages)
+
+        # accessing restricted _meta is intended: pylint:disable=W0212
+        exclude = [field.name for field in cls._meta.fields
+                   if isinstance(field, models.ForeignKey)]
+        for index, obj in enumerate(objs):
+            try:
+                obj.clean_fields(exclude=exclude)
+                obj.clean()
+            except ValidationError as err:
+                add_errors(index, err.update_error_dict({}))
+        if not objs:
+            return
+        # Django's own unique checks, pylint:disable=W0212
+        unique_checks, date_checks = objs[0]._get_unique_checks()
+        for model_class, unique_check in unique_checks:
+            fields = [model_class._meta.get_field(name)
+                      for name in unique_check]
+            rows = {}
+            for index, obj in enumerate(objs):
+                values = tuple(getattr(obj, field.attname)
+                               for field in fields)
+                if None in values or (
+                    len(fields) == 1 and fields[0].primary_key):
+                    continue
+                rows.setdefault(values, []).append(index)
+            if not rows:
+                continue
+            lookup = dict(
+                ('%s__in' % field.name, set(values[i] for values in rows))
+                for i, field in enumerate(fields))
+            existing = set(model_class._default_manager.filter(
+                **lookup).values_list(*unique_check))
+            if len(fields) == 1:
+                key = unique_check[0]
+            else:
+                key = NON_FIELD_ERRORS
+            for values, indexes in rows.iteritems():
+                if values not in existing:
+                    # The first instance of a duplicate within the batch
+                    # is valid
+                    indexes = indexes[1:]
+                for index in indexes:
+                    message = objs[index].unique_error_message(model_class,
+                                                               unique_check)
+                    add_errors(index, {key: [message]})
+        if date_checks:
+            for index, obj in enumerate(objs):
+                add_errors(index, obj._perform_date_checks(date_checks))
+        errors = dict((index, messages)
+                      for index, messages in errors.iteritems() if messages)
+        if errors:
+            raise InhouseBulkValidationError(errors)
+
+    @classmethod
+    def bulk_insert(cls, objs, batch_size=None):
+        """Validates and inserts new instances with as few queries as
+        possible.
+
+        This is the trusted write path for imports and bulk jobs. The
+        instances are validated by :meth:`validate_batch` instead of
+        :meth:`full_clean`, stamped with the current user and time and
+        inserted by ``bulk_create``. :meth:`save` isn't called and no
+        signals are sent, the instances don't get primary keys.
+
+        :param objs: List of new instances of this class
+        :param batch_size: Maximum number of instances per INSERT,
+          ``None`` inserts all at once
+        :raises InhouseBulkValidationError: If any instance is invalid
+        :returns: The list of instances
+        """
+        objs = list(objs)
+        cls.validate_batch(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.created = obj.modified = now
+        current_user.stamp(objs)
+        with commit_on_success_unless_managed():
+            for chunk in chunked(objs, batch_size or len(objs) or 1):
+                cls.objects.bulk_create(chunk)
+        return objs
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super(DefaultInfo, self).save(*args, **kwargs)
+        """Validates and saves the instance.
+
+        By default the unique constraints aren't checked by queries in
+        advance, the database enforces them. If the database rejects
+        the row, the unique checks of :meth:`validate_unique` are run
+        to report the violation with the usual messages.
+
+        :param validate_unique: Run all checks of :meth:`full_clean`
+          before saving (default: ``False``)
+        :raises ValidationError: If the instance is invalid or violates
+          a unique constraint
+        """
+        if kwargs.pop('validate_unique', False):
+            self.full_clean()
+            super(DefaultInfo, self).save(*args, **kwargs)
+            return
+        unique_checks = self._clean_without_unique_checks()
+        sid = None
+        if transaction.is_managed():
+            sid = transaction.savepoint()
+        try:
+            super(DefaultInfo, self).save(*args, **kwargs)
+        except IntegrityError:
+            if sid is not None:
+                transaction.savepoint_rollback(sid)
+            else:
+                transaction.rollback_unless_managed()
+            # Django's own unique checks, pylint:disable=W0212
+            errors = self._perform_unique_checks(unique_checks)
+            if errors:
+                raise ValidationError(errors)
+            raise
+        if sid is not None:
+            transaction.savepoint_commit(sid)
+
+    def _clean_without_unique_checks(self):
+        """Runs :meth:`full_clean` except for the unique checks, that
+        the database enforces.
+
+        :raises ValidationError: If the instance is invalid
+        :returns: The skipped unique checks
+        """
+        errors = {}
+        try:
+            self.clean_fields()
+        except ValidationError as err:
+            errors = err.update_error_dict(errors)
+        try:
+            self.clean()
+        except ValidationError as err:
+            errors = err.update_error_dict(errors)
+        # Django's own unique checks, pylint:disable=W0212
+        unique_checks, date_checks = self._get_unique_checks(
+            exclude=errors.keys())
+        for field, messages in self._perform_date_checks(
+            date_checks).iteritems():
+            errors.setdefault(field, []).extend(messages)
+        if errors:
+            raise ValidationError(errors)
+        return unique_checks
 
 
 class StarredItemMixin(object):
@@ -187,15 +406,45 @@ class StarredItemMixin(object):
         ids = ct.starreditem_set.filter(user=user).values_list('object_id')
         return cls.objects.filter(id__in=ids)
 
+    @classmethod
+    def with_starred(cls, user, queryset=None):
+        """Annotates the objects of a query with their starred state.
+
+        Every object gets a ``starred`` attribute, that is true if the
+        user starred it. The state is selected by a subquery, so no
+        additional queries are needed.
+
+        :param user: A :class:`User` instance
+        :param queryset: Query of this class, defaults to all objects
+        :returns: The annotated query
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        ct = ContentType.objects.get_for_model(cls)
+        # accessing restricted _meta is intended: pylint:disable=W0212
+        opts = StarredItem._meta
+        qn = connection.ops.quote_name
+        sql = ('EXISTS (SELECT 1 FROM %(table)s WHERE %(content_type)s = %%s'
+               ' AND %(object_id)s = %(pk)s AND %(user)s = %%s)' % {
+                'table': qn(opts.db_table),
+                'content_type': qn(opts.get_field('content_type').column),
+                'object_id': qn(opts.get_field('object_id').column),
+                'user': qn(opts.get_field('user').column),
+                'pk': '%s.%s' % (qn(cls._meta.db_table),
+                                 qn(cls._meta.pk.column))})
+        return queryset.extra(select={'starred': sql},
+                              select_params=(ct.id, user.pk))
+
     def is_starred(self, user):
         """Checks, wheter the object is starred by the user.
 
+        Uses the cached stars of the user, see
+        :meth:`StarredItem.get_keys`.
+
         :returns: ``True`` or ``False``
         """
         ct = ContentType.objects.get_for_model(self)
-        query = StarredItem.objects.filter(content_type__pk=ct.id,
-            object_id=self.id, user=user)
-        return query.count() == 1
+        return (ct.id, self.id) in StarredItem.get_keys(user)
 
     def add_star(self, user):
         """Add an :class:`StarredItem` for an object.
@@ -214,11 +463,11 @@ class StarredItemMixin(object):
 
         :params user: A :class:`User` instance
         """
+        if not self.is_starred(user):
+            return
         ct = ContentType.objects.get_for_model(self)
-        query = StarredItem.objects.filter(content_type__pk=ct.id,
-            object_id=self.id, user=user)
-        if query.count() == 1:
-            query.delete()
+        StarredItem.objects.filter(content_type__pk=ct.id, object_id=self.id,
+                                   user=user).delete()
 
 
 class Address(DefaultInfo):
@@ -360,6 +609,47 @@ class BillingType(models.Model):
         return self.name
 
 
+class BookingQuerySet(models.query.QuerySet):
+    """Query set for :class:`Booking`."""
+
+    _closing_state = False
+
+    def with_closing_state(self):
+        """Resolves open flag and closing reasons within the query.
+
+        Day, project and step are joined into the bookings query, so
+        :attr:`Booking.is_open` and
+        :meth:`Booking.get_closing_reason_tuple` don't need further
+        queries.
+
+        :returns: Query of :class:`Booking`
+        """
+        query = self.select_related('day', 'project', 'step')
+        return query._clone(_closing_state=True)
+
+    def _clone(self, *args, **kwargs):
+        kwargs.setdefault('_closing_state', self._closing_state)
+        return super(BookingQuerySet, self)._clone(*args, **kwargs)
+
+    def iterator(self):
+        # we intentionally set protected members, pylint:disable=W0212
+        for booking in super(BookingQuerySet, self).iterator():
+            if self._closing_state:
+                booking._closing_reasons = booking._get_closing_reasons()
+            yield booking
+
+
+class BookingManager(models.Manager):
+    """Manager for :class:`Booking`."""
+
+    def get_query_set(self):
+        return BookingQuerySet(self.model, using=self._db)
+
+    def with_closing_state(self):
+        """See :meth:`BookingQuerySet.with_closing_state`."""
+        return self.get_query_set().with_closing_state()
+
+
 class Booking(DefaultInfo, StarredItemMixin):
     title = models.CharField(max_length=255, verbose_name=_(u'Title'))
     description = models.TextField(verbose_name=_(u'Description'))
@@ -404,6 +694,7 @@ class Booking(DefaultInfo, StarredItemMixin):
                                                blank=True, null=True,
                                                verbose_name=_(u'Coefficient'))
 
+    objects = BookingManager()
 
     #status = models.ForeignKey('BookingStatus', db_column='st_sts')
 
@@ -413,8 +704,8 @@ class Booking(DefaultInfo, StarredItemMixin):
         verbose_name = _(u'Booking')
         verbose_name_plural = _(u'Bookings')
 
-    #def __unicode__(self):
-        #return self.get_title()
+    def __unicode__(self):
+        return self.title
 
     #@models.permalink
     #def get_absolute_url(self):
@@ -428,26 +719,32 @@ class Booking(DefaultInfo, StarredItemMixin):
 
         :returns: ``True`` or ``False``
         """
-        if (self.project.is_closed or self.day.locked
-            or self.step.is_closed or self.invoice):
-            return False
-        return True
+        return not self.get_closing_reason_tuple()
 
     def get_closing_reason_tuple(self):
         """Return one ore more reasons, why the booking is closed.
 
+        Bookings loaded by :meth:`BookingQuerySet.with_closing_state`
+        already carry their reasons, otherwise the related objects are
+        loaded on demand.
+
         :returns: Tuple with strings
         """
+        reasons = getattr(self, '_closing_reasons', None)
+        if reasons is None:
+            reasons = self._get_closing_reasons()
+        return reasons
+
+    def _get_closing_reasons(self):
+        """Determines the closing reasons from the related objects."""
         reasons = []
-        if self.is_open:
-            return reasons
         if self.day.locked:
             reasons.append(_(u'The day is locked.'))
         if not self.project.is_open:
             reasons.append(_(u'The project is closed or inactive.'))
-        if not self.step.is_open:
+        if self.step_id is not None and not self.step.is_open:
             reasons.append(_(u'The projectstep is closed.'))
-        if self.invoice:
+        if self.invoice_id is not None:
             reasons.append(_(u'The booking has been settled.'))
         return tuple(reasons)
 
@@ -464,12 +761,174 @@ class Booking(DefaultInfo, StarredItemMixin):
             frmt = lambda x: x
         return sep.join(frmt(part) for part in data if part is not None)
 
+    @classmethod
+    def bulk_insert(cls, objs, batch_size=None):
+        """Inserts new bookings like :meth:`DefaultInfo.bulk_insert`.
+
+        The bookings' days must be set. Since no signals are sent, the
+        booking sums of the days and the rollups are updated here, with
+        one update per day, project and step.
+        """
+        with commit_on_success_unless_managed():
+            objs = super(Booking, cls).bulk_insert(objs, batch_size)
+            sums = {}
+            for booking in objs:
+                key = _get_booking_key(booking)
+                sums[key] = sums.get(key, 0) + booking.duration
+            for key, minutes in sums.iteritems():
+                _add_to_booking_sums(key, minutes)
+        return objs
+
     def next_position(self):
         """Set the next available position, depending on the day."""
         bookings = Booking.objects.filter(day=self.day)
         self.position = (bookings.aggregate(models.Max('position'))[
             'position__max'] or 0) + 1
 
+    def get_hourly_rate(self):
+        """Returns the hourly rate valid at the booking's day.
+
+        A :class:`ProjectUserRate` of the booking's user takes
+        precedence over the :class:`ProjectRate`.
+
+        :returns: Hourly rate or ``None``
+        """
+        date = self.day.date
+        rates = ProjectUserRate.objects.filter(
+            project_user__project=self.project_id,
+            project_user__user=self.day.user_id,
+            hourly_rate__isnull=False,
+            valid_from__lte=date, valid_until__gte=date)
+        for rate in rates.order_by('-valid_from')[:1]:
+            return rate.hourly_rate
+        rates = ProjectRate.objects.filter(
+            project=self.project_id,
+            valid_from__lte=date, valid_until__gte=date)
+        for rate in rates.order_by('-valid_from')[:1]:
+            return rate.hourly_rate
+        return None
+
+    def get_amount(self):
+        """Returns the billed amount of the booking.
+
+        See :mod:`inhouse.billing` to price many bookings at once.
+
+        :returns: Amount or ``None``, if no rate is defined
+        """
+        hourly_rate = self.get_hourly_rate()
+        if hourly_rate is None:
+            return None
+        return calculate_amount(self.duration, hourly_rate,
+                                self.project.get_coefficient(self.step,
+                                                             self.day))
+
+    def save(self, *args, **kwargs):
+        # Save the booking and update the day's booking sum at once.
+        with commit_on_success_unless_managed():
+            super(Booking, self).save(*args, **kwargs)
+        # Closing reasons resolved by the query may be outdated now.
+        self._closing_reasons = None
+
+
+class BookingRollup(models.Model):
+    """Base class for booked minutes summed up per period.
+
+    The sums are updated by the :class:`Booking` signal handlers. Bulk
+    updates of bookings bypass them, use the ``rebuild_booking_rollups``
+    and ``check_booking_rollups`` commands in that case.
+    """
+
+    user = models.ForeignKey(User, db_column='uid', verbose_name=_(u'User'))
+    project = models.ForeignKey('Project', db_column='prid',
+                                verbose_name=_(u'Project'))
+    year = models.IntegerField(verbose_name=_(u'Year'))
+    duration = models.DecimalField(max_digits=12, decimal_places=3,
+                                   default=0, verbose_name=_(u'Duration'))
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def add_minutes(cls, minutes, defaults=None, **keys):
+        """Atomically adds minutes to the row identified by keys.
+
+        The row is created if it doesn't exist yet. The keys must match
+        a unique constraint without nullable columns, otherwise
+        concurrent inserts aren't detected. Negative minutes never
+        create a row: a missing row has been deleted together with its
+        user, project or step, before the bookings' signals are sent.
+
+        :param minutes: Minutes to add, may be negative
+        :param defaults: Optional dict of further field values of a new
+          row
+        :param keys: Field names and values of the unique key
+        """
+        # accessing restricted _meta is intended: pylint:disable=W0212
+        if not minutes:
+            return
+        query = cls.objects.filter(**keys)
+        if query.update(duration=models.F('duration') + minutes) or \
+                minutes < 0:
+            return
+        obj = cls(duration=minutes)
+        values = dict(defaults or {})
+        values.update(keys)
+        for name, value in values.iteritems():
+            setattr(obj, cls._meta.get_field(name).attname, value)
+        sid = transaction.savepoint()
+        try:
+            obj.save(force_insert=True)
+            transaction.savepoint_commit(sid)
+        except IntegrityError:
+            # Inserted by a concurrent transaction in the meantime
+            transaction.savepoint_rollback(sid)
+            query.update(duration=models.F('duration') + minutes)
+
+
+class BookingMonthRollup(BookingRollup):
+    """Booked minutes per user, project and month."""
+
+    month = models.IntegerField(verbose_name=_(u'Month'))
+
+    class Meta:
+        db_table = u'booking_month'
+        db_column_prefix = u'bm_'
+        unique_together = ('user', 'project', 'year', 'month')
+        verbose_name = _(u'Booking sum per month')
+        verbose_name_plural = _(u'Booking sums per month')
+
+    @classmethod
+    def add(cls, user_id, project_id, date, minutes):
+        """Adds minutes to the month of a date."""
+        cls.add_minutes(minutes, user=user_id, project=project_id,
+                        year=date.year, month=date.month)
+
+
+class BookingWeekRollup(BookingRollup):
+    """Booked minutes per user, project, step and ISO week."""
+
+    step = models.ForeignKey('ProjectStep', db_column='prsid', blank=True,
+                             null=True, verbose_name=_(u'Project step'))
+    # The step id or 0, NULLs aren't equal in the unique index
+    step_key = models.IntegerField(db_column='stepkey', default=0,
+                                   editable=False)
+    week = models.IntegerField(verbose_name=_(u'Week'))
+
+    class Meta:
+        db_table = u'booking_week'
+        db_column_prefix = u'bw_'
+        unique_together = ('user', 'project', 'step_key', 'year', 'week')
+        verbose_name = _(u'Booking sum per week')
+        verbose_name_plural = _(u'Booking sums per week')
+
+    @classmethod
+    def add(cls, user_id, project_id, step_id, date, minutes):
+        """Adds minutes to the ISO week of a date."""
+        year, week = date.isocalendar()[:2]
+        cls.add_minutes(minutes, defaults={'step': step_id}, user=user_id,
+                        project=project_id, step_key=step_id or 0,
+                        year=year, week=week)
+
 
 class CommissionStatus(models.Model):
     name = models.CharField(max_length=100, unique=True,
@@ -633,7 +1092,7 @@ class Country(models.Model):
         return self.printable_name
 
 
-class Customer(DefaultInfo):
+class Customer(DefaultInfo, StarredItemMixin):
     name1 = models.CharField(max_length=400, verbose_name=_(u'Name'))
     name2 = models.CharField(max_length=200, blank=True, null=True,
                              verbose_name=_(u'Name'))
@@ -690,10 +1149,86 @@ class Customer(DefaultInfo):
     get_join_name_html = lambda me: me.get_join_name('<br />')
 
 
+class DayManager(models.Manager):
+    """Manager for :class:`Day`."""
+
+    # Number of inserts tried, if concurrent inserts conflict
+    insert_attempts = 3
+
+    def get_or_create_dates(self, user, dates):
+        """Returns the days of a user, missing days are created.
+
+        Existing days are read with one query. All missing days are
+        created with one bulk insert and read back with another query.
+        If a concurrent transaction inserts some of the days first, the
+        insert is rolled back to a savepoint, the days created by the
+        other transaction are read and the remaining ones inserted again.
+
+        :param user: A :class:`User` instance or user id
+        :param dates: Iterable of dates
+        :returns: Dict mapping the dates to :class:`Day` instances
+        """
+        user_id = getattr(user, 'pk', user)
+        dates = set(dates)
+        if not dates:
+            return {}
+        days = dict((day.date, day) for day in self.filter(
+            user=user_id, date__in=dates))
+        missing = dates.difference(days)
+        attempt = 0
+        while missing:
+            attempt += 1
+            new = current_user.stamp([self.model(user_id=user_id, date=date)
+                                      for date in sorted(missing)])
+            with commit_on_success_unless_managed():
+                sid = transaction.savepoint()
+                try:
+                    self.bulk_create(new)
+                except IntegrityError:
+                    transaction.savepoint_rollback(sid)
+                    if attempt >= self.insert_attempts:
+                        raise
+                else:
+                    transaction.savepoint_commit(sid)
+            days.update((day.date, day) for day in self.filter(
+                user=user_id, date__in=missing))
+            missing = dates.difference(days)
+        return days
+
+    def get_or_create_range(self, user, date_from, date_until):
+        """Returns all days of a user within a period, missing days are
+        created.
+
+        See :meth:`get_or_create_dates`.
+
+        :param user: A :class:`User` instance or user id
+        :param date_from: First day of the period
+        :param date_until: Last day of the period
+        :returns: Dict mapping the dates to :class:`Day` instances
+        """
+        return self.get_or_create_dates(user, (
+            date_from + datetime.timedelta(i)
+            for i in range((date_until - date_from).days + 1)))
+
+
 class Day(DefaultInfo):
     user = models.ForeignKey(User, db_column='uid', verbose_name=_(u'User'))
     date = models.DateField(verbose_name=_(u'Date'),)
     locked = models.BooleanField(default=False, verbose_name=_(u'Locked?'),)
+    locked_by = models.IntegerField(
+        blank=True, null=True, editable=False, db_column='lockuid',
+        verbose_name=_(u'Locked by'))  # references User
+    locked_at = models.DateTimeField(blank=True, null=True, editable=False,
+                                     db_column='lockdate',
+                                     verbose_name=_(u'Locked at'))
+    # Sum of all booking durations in minutes, maintained by the
+    # Booking signal handlers below.
+    booking_sum = models.DecimalField(max_digits=9, decimal_places=3,
+                                      default=0, editable=False,
+                                      db_column='bookingsum',
+                                      verbose_name=_(u'Duration'))
+
+    objects = DayManager()
 
     class Meta:
         db_table = u'day'
@@ -712,6 +1247,58 @@ class Day(DefaultInfo):
         """
         return self.date.strftime('%Y/%m/%d')
 
+    def save(self, *args, **kwargs):
+        with commit_on_success_unless_managed():
+            if self.pk is not None:
+                # The booking sum is maintained by the bookings, never
+                # write back an outdated value of this instance.
+                query = Day.objects.select_for_update().filter(pk=self.pk)
+                for booking_sum in query.values_list('booking_sum',
+                                                     flat=True):
+                    self.booking_sum = booking_sum
+            super(Day, self).save(*args, **kwargs)
+
+    def get_booking_sum(self):
+        """Returns the duration of all bookings of this day.
+
+        :returns: Duration in minutes
+        """
+        return self.booking_sum
+
+    @classmethod
+    def add_to_booking_sum(cls, day_id, minutes):
+        """Atomically adds minutes to the booking sum of a day.
+
+        :param day_id: Id of the :class:`Day`
+        :param minutes: Minutes to add, may be negative
+        """
+        if not minutes:
+            return
+        cls.objects.filter(pk=day_id).update(
+            booking_sum=models.F('booking_sum') + minutes)
+
+    @classmethod
+    def rebuild_booking_sums(cls):
+        """Recalculates the booking sums of all days from scratch.
+
+        :returns: Number of updated days
+        """
+        # accessing restricted _meta is intended: pylint:disable=W0212
+        qn = connection.ops.quote_name
+        sql = ('UPDATE %(day)s SET %(sum)s = COALESCE('
+               '(SELECT SUM(%(duration)s) FROM %(booking)s'
+               ' WHERE %(booking)s.%(day_fk)s = %(day)s.%(day_pk)s), 0)' % {
+                   'day': qn(cls._meta.db_table),
+                   'sum': qn(cls._meta.get_field('booking_sum').column),
+                   'day_pk': qn(cls._meta.pk.column),
+                   'booking': qn(Booking._meta.db_table),
+                   'duration': qn(Booking._meta.get_field('duration').column),
+                   'day_fk': qn(Booking._meta.get_field('day').column)})
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        transaction.commit_unless_managed()
+        return cursor.rowcount
+
 
 class Department(DefaultInfo):
     name = models.CharField(max_length=100, unique=True,
@@ -783,6 +1370,102 @@ class News(DefaultInfo):
         verbose_name = _(u'News')
         verbose_name_plural = _(u'News')
 
+    # Cache keys of the news and group memberships versions
+    VERSION_KEY = 'inhouse.news.version'
+    GROUPS_VERSION_KEY = 'inhouse.news.groups_version'
+
+    @staticmethod
+    def _get_version(key):
+        """Returns the current version stored under key."""
+        version = cache.get(key)
+        if version is None:
+            version = new_version()
+            cache.set(key, version, NEWS_CACHE_TIMEOUT * 2)
+        return version
+
+    @classmethod
+    def get_group_ids(cls, user_id):
+        """Returns the ids of a user's groups.
+
+        The result is cached until group memberships change.
+
+        :param user_id: Id of the user
+        :returns: Sorted tuple of group ids
+        """
+        cache_key = 'inhouse.news.groups.%d.%s' % (
+            user_id, cls._get_version(cls.GROUPS_VERSION_KEY))
+        group_ids = cache.get(cache_key)
+        if group_ids is None:
+            group_ids = tuple(sorted(User.groups.through.objects.filter(
+                user=user_id).values_list('group', flat=True)))
+            cache.set(cache_key, group_ids, NEWS_CACHE_TIMEOUT)
+        return group_ids
+
+    @classmethod
+    def get_for_groups(cls, group_ids, today=None):
+        """Returns the news valid today for any of the groups.
+
+        The news are ordered by their highest priority for the groups,
+        then the newest first. The result is cached per group set and
+        shared by all users with the same groups, until news or news
+        groups change or the next news becomes valid or expires.
+
+        :param group_ids: List of group ids
+        :param today: Date the news must be valid on, defaults to today
+        :returns: List of :class:`News` with an attribute ``priority``
+        """
+        today = today or datetime.date.today()
+        group_ids = sorted(set(group_ids))
+        if not group_ids:
+            return []
+        cache_key = 'inhouse.news.%s.%s' % (
+            hashlib.md5(','.join(map(str, group_ids))).hexdigest(),
+            cls._get_version(cls.VERSION_KEY))
+        entry = cache.get(cache_key)
+        if (entry is None or entry['since'] > today
+            or (entry['until'] is not None and entry['until'] <= today)):
+            entry = cls._get_entry(group_ids, today)
+            cache.set(cache_key, entry, NEWS_CACHE_TIMEOUT)
+        return entry['news']
+
+    @classmethod
+    def _get_entry(cls, group_ids, today):
+        """Reads the news of a group set valid today.
+
+        :returns: Dict with the news and the period (``since``
+          inclusive, ``until`` exclusive or ``None``) they are valid in
+        """
+        query = cls.objects.filter(
+            models.Q(valid_until__isnull=True)
+            | models.Q(valid_until__gte=today),
+            newsgroup__group__in=group_ids).annotate(
+            priority=models.Max('newsgroup__priority'))
+        news = []
+        boundaries = []
+        for item in query:
+            if item.valid_from is not None and item.valid_from > today:
+                boundaries.append(item.valid_from)
+                continue
+            if item.valid_until is not None:
+                boundaries.append(item.valid_until + datetime.timedelta(1))
+            news.append(item)
+        oldest = datetime.date.min
+        news.sort(key=lambda x: (-x.priority,
+                                 -(x.valid_from or oldest).toordinal(),
+                                 -x.id))
+        return {'news': news, 'since': today,
+                'until': min(boundaries) if boundaries else None}
+
+    @classmethod
+    def get_for_user(cls, user_id, today=None):
+        """Returns the news valid today for the groups of a user.
+
+        :param user_id: Id of the user
+        :param today: Date the news must be valid on, defaults to today
+        :returns: List of :class:`News`, see :meth:`get_for_groups`
+        """
+        return cls.get_for_groups(cls.get_group_ids(user_id), today)
+
 
 class NewsGroup(DefaultInfo):
     news = models.ForeignKey('News', db_column='newid',
@@ -800,7 +1483,7 @@ class NewsGroup(DefaultInfo):
         verbose_name_plural = _(u'News groups')
 
 
-class Project(DefaultInfo):
+class Project(DefaultInfo, StarredItemMixin):
     name = models.CharField(max_length=80, unique=True, verbose_name=_(u'Name'))
     key = models.CharField(max_length=12, unique=True, verbose_name=_(u'Key'))
     image = models.ImageField(blank=True, null=True, upload_to='projects',
@@ -899,7 +1582,6 @@ class Project(DefaultInfo):
         :returns: Coefficient as integer/float
         """
         co_x = 1
-        co_y = 1
         if day:
             if day.date.weekday() == calendar.SATURDAY:
                 if self.coefficient_saturday:
@@ -913,6 +1595,8 @@ class Project(DefaultInfo):
                     co_x = settings.DEFAULT_COEFFICIENT_SUNDAY
         if step and step.coefficient:
             co_y = step.coefficient
+        else:
+            co_y = settings.DEFAULT_COEFFICIENT_PROJECT_STEP
         return co_x * co_y
 
 
@@ -1134,6 +1818,30 @@ class StarredItem(models.Model):
         verbose_name = _(u'Starred item')
         verbose_name_plural = _(u'Starred items')
 
+    @staticmethod
+    def get_cache_key(user_id):
+        """Returns the cache key of a user's stars."""
+        return 'inhouse.starred_items.%d' % user_id
+
+    @classmethod
+    def get_keys(cls, user):
+        """Returns the objects starred by a user.
+
+        The result is cached until the user's stars change.
+
+        :param user: A :class:`User` instance
+        :returns: Frozenset of tuples (content type id, object id)
+        """
+        if user.pk is None:
+            return frozenset()
+        cache_key = cls.get_cache_key(user.pk)
+        keys = cache.get(cache_key)
+        if keys is None:
+            keys = frozenset(cls.objects.filter(user=user).values_list(
+                'content_type', 'object_id'))
+            cache.set(cache_key, keys, STARRED_ITEMS_CACHE_TIMEOUT)
+        return keys
+
 
 class Timer(DefaultInfo):
     start_time = models.DateTimeField(db_column='starttime',
@@ -1178,22 +1886,11 @@ class Timer(DefaultInfo):
     def get_time_tuple(self):
         """Returns a split time information in hours and minutes.
 
+        The duration is rounded by :func:`round_duration`.
+
         :return: Tuple with hours, minutes
         """
-        minutes = self.duration / 60
-        if minutes <= 15:
-            # Less then 15 minutes count as 15 minutes
-            return 0, 15
-        h = minutes // 60
-        minutes -= h * 60
-        scrap = minutes % 15
-        m = (minutes // 15) * 15
-        if scrap >= 7.5:
-            m += 15
-        if m >= 60:
-            h += m // 60
-            m -= m % 60
-        return h, m
+        return divmod(round_duration(self.duration), 60)
 
     def start(self, title=None):
         """Start a timer.
@@ -1280,5 +1977,238 @@ class UserProfile(DefaultInfo):
         profile.save()
         return profile
 
-    def get_news(self):
-        pass
+    @staticmethod
+    def get_cache_key(user_id):
+        """Returns the cache key of a user's profile."""
+        return 'inhouse.user_profile.%d' % user_id
+
+    @classmethod
+    def get_for_user(cls, user):
+        """Returns the profile of a user.
+
+        The result, including a missing profile, is cached until the
+        profile is saved or deleted. The profile is also stored as the
+        user's profile cache, so ``user.get_profile()`` doesn't query
+        again.
+
+        :param user: A :class:`User` instance
+        :returns: A :class:`UserProfile` instance or ``None``
+        """
+        if user.pk is None:
+            return None
+        cache_key = cls.get_cache_key(user.pk)
+        profile = cache.get(cache_key)
+        if profile is None:
+            try:
+                profile = cls.objects.get(user=user.pk)
+            except cls.DoesNotExist:
+                profile = False
+            cache.set(cache_key, profile, USER_PROFILE_CACHE_TIMEOUT)
+        if not profile:
+            return None
+        # setting Django's profile cache is intended, pylint:disable=W0212
+        user._profile_cache = profile
+        return profile
+
+    def get_news(self, today=None):
+        """Returns the news for the user's groups.
+
+        :param today: Date the news must be valid on, defaults to today
+        :returns: List of :class:`News`, see :meth:`News.get_for_groups`
+        """
+        return News.get_for_user(self.user_id, today)
+
+
+# Signal handlers
+
+def _get_booking_key(booking):
+    """Returns the values, that booking sums and rollups depend on."""
+    day = booking.day
+    return (booking.day_id, day.user_id, day.date, booking.project_id,
+            booking.step_id)
+
+
+def _add_to_booking_sums(key, minutes):
+    """Adds minutes to the day's booking sum and the rollups.
+
+    :param key: Tuple as returned by :func:`_get_booking_key`
+    :param minutes: Minutes to add, may be negative
+    """
+    day_id, user_id, date, project_id, step_id = key
+    Day.add_to_booking_sum(day_id, minutes)
+    BookingWeekRollup.add(user_id, project_id, step_id, date, minutes)
+    BookingMonthRollup.add(user_id, project_id, date, minutes)
+    if minutes:
+        bookingcache.invalidate([user_id], date)
+
+
+def _booking_pre_save(sender, instance, **kwds):
+    """Remembers the key and duration a booking had before saving."""
+    # we intentionally set protected members, pylint:disable=W0212
+    instance._booking_old = None
+    if kwds.get('raw'):
+        # Loaded fixtures contain the sums already
+        return
+    if instance.pk is not None:
+        query = Booking.objects.filter(pk=instance.pk)
+        old = query.values_list('day', 'day__user', 'day__date', 'project',
+                                'step', 'duration')
+        if old:
+            instance._booking_old = old[0]
+
+
+def _booking_post_save(sender, instance, **kwds):
+    """Updates the booking sums touched by a booking."""
+    if kwds.get('raw'):
+        return
+    key = _get_booking_key(instance)
+    old = getattr(instance, '_booking_old', None)
+    if old is not None:
+        old_key, old_duration = old[:5], old[5]
+        if old_key == key:
+            _add_to_booking_sums(key, instance.duration - old_duration)
+            return
+        _add_to_booking_sums(old_key, -old_duration)
+    _add_to_booking_sums(key, instance.duration)
+
+
+def _booking_pre_delete(sender, instance, **kwds):
+    """Remembers the key of a booking while its day still exists."""
+    # we intentionally set protected members, pylint:disable=W0212
+    instance._booking_key = _get_booking_key(instance)
+
+
+def _booking_post_delete(sender, instance, **kwds):
+    """Subtracts a deleted booking from its booking sums."""
+    key = getattr(instance, '_booking_key', None)
+    if key is not None:
+        _add_to_booking_sums(key, -instance.duration)
+
+pre_save.connect(_booking_pre_save, sender=Booking,
+                 dispatch_uid='inhouse.models.booking_pre_save')
+post_save.connect(_booking_post_save, sender=Booking,
+                  dispatch_uid='inhouse.models.booking_post_save')
+pre_delete.connect(_booking_pre_delete, sender=Booking,
+                   dispatch_uid='inhouse.models.booking_pre_delete')
+post_delete.connect(_booking_post_delete, sender=Booking,
+                    dispatch_uid='inhouse.models.booking_post_delete')
+
+
+def _day_changed(sender, instance, **kwds):
+    """Invalidates the cached data of the day's month."""
+    if instance.user_id is not None and instance.date is not None:
+        bookingcache.invalidate([instance.user_id], instance.date)
+
+post_save.connect(_day_changed, sender=Day,
+                  dispatch_uid='inhouse.models.day_post_save')
+post_delete.connect(_day_changed, sender=Day,
+                    dispatch_uid='inhouse.models.day_post_delete')
+
+
+def _request_finished(sender, **kwds):
+    """Deletes the cache keys invalidated within the request's
+    transactions again, after they have been committed."""
+    delete_pending()
+
+request_finished.connect(_request_finished,
+                         dispatch_uid='inhouse.models.request_finished')
+
+
+def _starred_item_changed(sender, instance, **kwds):
+    """Invalidates the cached stars of the item's user."""
+    if instance.user_id is not None:
+        cache.delete(StarredItem.get_cache_key(instance.user_id))
+        dashboardcache.invalidate(dashboardcache.WIDGET_STARRED,
+                                  [instance.user_id])
+
+post_save.connect(_starred_item_changed, sender=StarredItem,
+                  dispatch_uid='inhouse.models.starred_item_post_save')
+post_delete.connect(_starred_item_changed, sender=StarredItem,
+                    dispatch_uid='inhouse.models.starred_item_post_delete')
+
+
+def _user_profile_changed(sender, instance, **kwds):
+    """Invalidates the cached profile of the user."""
+    if instance.user_id is not None:
+        cache.delete(UserProfile.get_cache_key(instance.user_id))
+
+post_save.connect(_user_profile_changed, sender=UserProfile,
+                  dispatch_uid='inhouse.models.user_profile_post_save')
+post_delete.connect(_user_profile_changed, sender=UserProfile,
+                    dispatch_uid='inhouse.models.user_profile_post_delete')
+
+
+def _user_changed(sender, instance, **kwds):
+    """Removes a saved or deleted user from the cache."""
+    auth_backends.invalidate_user(instance.pk)
+
+post_save.connect(_user_changed, sender=User,
+                  dispatch_uid='inhouse.models.user_post_save')
+post_delete.connect(_user_changed, sender=User,
+                    dispatch_uid='inhouse.models.user_post_delete')
+
+
+def _permissions_changed(sender, **kwds):
+    """Invalidates the cached permissions of all users."""
+    auth_backends.invalidate_permissions()
+
+for _model in (Group, Permission):
+    post_save.connect(_permissions_changed, sender=_model,
+                      dispatch_uid='inhouse.models.%s_post_save'
+                      % _model.__name__.lower())
+    post_delete.connect(_permissions_changed, sender=_model,
+                        dispatch_uid='inhouse.models.%s_post_delete'
+                        % _model.__name__.lower())
+for _model in (User.groups.through, User.user_permissions.through,
+               Group.permissions.through):
+    m2m_changed.connect(_permissions_changed, sender=_model,
+                        dispatch_uid='inhouse.models.%s_m2m_changed'
+                        % _model.__name__.lower())
+
+
+def _timer_changed(sender, instance, **kwds):
+    """Invalidates the running timers of the timer's user."""
+    if instance.created_by is not None:
+        dashboardcache.invalidate(dashboardcache.WIDGET_TIMERS,
+                                  [instance.created_by])
+
+post_save.connect(_timer_changed, sender=Timer,
+                  dispatch_uid='inhouse.models.timer_post_save')
+post_delete.connect(_timer_changed, sender=Timer,
+                    dispatch_uid='inhouse.models.timer_post_delete')
+
+
+def _steps_changed(sender, **kwds):
+    """Invalidates the open project steps of all users."""
+    dashboardcache.invalidate(dashboardcache.WIDGET_STEPS)
+
+for _model in (Project, ProjectStep, ProjectUser):
+    post_save.connect(_steps_changed, sender=_model,
+                      dispatch_uid='inhouse.models.steps_%s_post_save'
+                      % _model.__name__.lower())
+    post_delete.connect(_steps_changed, sender=_model,
+                        dispatch_uid='inhouse.models.steps_%s_post_delete'
+                        % _model.__name__.lower())
+
+
+def _news_changed(sender, **kwds):
+    """Invalidates the cached news of all group sets."""
+    cache.delete(News.VERSION_KEY)
+
+for _model in (News, NewsGroup):
+    post_save.connect(_news_changed, sender=_model,
+                      dispatch_uid='inhouse.models.%s_post_save'
+                      % _model.__name__.lower())
+    post_delete.connect(_news_changed, sender=_model,
+                        dispatch_uid='inhouse.models.%s_post_delete'
+                        % _model.__name__.lower())
+
+
+def _groups_changed(sender, **kwds):
+    """Invalidates the cached group memberships of all users."""
+    cache.delete(News.GROUPS_VERSION_KEY)
+
+m2m_changed.connect(_groups_changed, sender=User.groups.through,
+                    dispatch_uid='inhouse.models.news_user_groups_changed')
+post_delete.connect(_groups_changed, sender=Group,
+                    dispatch_uid='inhouse.models.news_group_post_delete')
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""Rebuild and verification of the booking rollups.
+
+:class:`BookingWeekRollup` and :class:`BookingMonthRollup` are kept up
+to date by the :class:`Booking` signal handlers. The functions in this
+module recalculate them from the bookings, e.g. after bulk updates.
+"""
+
+import collections
+import decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from inhouse import models
+
+
+def compute_rollups():
+    """Calculates the rollups from the bookings.
+
+    The bookings are grouped per user, project, step and date by the
+    database, weeks and months are summed up from these rows.
+
+    :returns: Tuple of dicts for weeks and months. The week dict is
+      keyed by (user_id, project_id, step_id, year, week), the month
+      dict by (user_id, project_id, year, month).
+    """
+    weeks = collections.defaultdict(decimal.Decimal)
+    months = collections.defaultdict(decimal.Decimal)
+    query = models.Booking.objects.values(
+        'day__user', 'project', 'step', 'day__date').order_by()
+    for row in query.annotate(minutes=Sum('duration')):
+        date = row['day__date']
+        year, week = date.isocalendar()[:2]
+        weeks[(row['day__user'], row['project'], row['step'], year,
+               week)] += row['minutes']
+        months[(row['day__user'], row['project'], date.year,
+                date.month)] += row['minutes']
+    return weeks, months
+
+
+def get_stored_rollups():
+    """Returns the stored rollups in the format of :func:`compute_rollups`."""
+    weeks = dict(
+        ((user, project, step, year, week), duration)
+        for user, project, step, year, week, duration in
+        models.BookingWeekRollup.objects.values_list(
+            'user', 'project', 'step', 'year', 'week', 'duration'))
+    months = dict(
+        ((user, project, year, month), duration)
+        for user, project, year, month, duration in
+        models.BookingMonthRollup.objects.values_list(
+            'user', 'project', 'year', 'month', 'duration'))
+    return weeks, months
+
+
+def rebuild():
+    """Replaces all rollups with values calculated from the bookings.
+
+    :returns: Number of week and month rows
+    """
+    weeks, months = compute_rollups()
+    weeks = dict((k, v) for k, v in weeks.iteritems() if v)
+    months = dict((k, v) for k, v in months.iteritems() if v)
+    with transaction.commit_on_success():
+        models.BookingWeekRollup.objects.all().delete()
+        models.BookingMonthRollup.objects.all().delete()
+        models.BookingWeekRollup.objects.bulk_create([
+            models.BookingWeekRollup(user_id=user, project_id=project,
+                                     step_id=step, step_key=step or 0,
+                                     year=year, week=week, duration=duration)
+            for (user, project, step, year, week), duration
+            in weeks.iteritems()])
+        models.BookingMonthRollup.objects.bulk_create([
+            models.BookingMonthRollup(user_id=user, project_id=project,
+                                      year=year, month=month,
+                                      duration=duration)
+            for (user, project, year, month), duration
+            in months.iteritems()])
+    return len(weeks), len(months)
+
+
+def check():
+    """Compares the stored rollups with the bookings.
+
+    Rows with a duration of zero are treated like missing rows.
+
+    :returns: List of tuples (model, key, stored, expected) for each
+      difference
+    """
+    differences = []
+    for model, expected, stored in zip(
+        (models.BookingWeekRollup, models.BookingMonthRollup),
+        compute_rollups(), get_stored_rollups()):
+        for key in set(expected) | set(stored):
+            expected_value = expected.get(key, 0)
+            stored_value = stored.get(key, 0)
+            if expected_value != stored_value:
+                differences.append((model, key, stored_value,
+                                    expected_value))
+    return sorted(differences, key=lambda x: (x[0].__name__, x[1]))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""Assignment of project step templates to projects.
+
+A template is assigned to a project by adding a step with the
+template's name, unless the project already has a step of that name.
+The missing pairs of project and template are computed by the database
+with one query, the new steps are inserted with one query per project.
+"""
+
+from django.db import connection, transaction
+
+from inhouse import dashboardcache, models
+from inhouse.utils import current_user
+
+_MISSING_STEPS_SQL = '''
+SELECT p.%(project_id)s, t.%(template_name)s, t.%(template_description)s,
+       (SELECT MAX(s2.%(step_position)s) FROM %(step)s s2
+        WHERE s2.%(step_project)s = p.%(project_id)s)
+FROM %(project)s p, %(template)s t
+WHERE p.%(project_id)s IN (%(project_ids)s)
+  AND t.%(template_id)s IN (%(template_ids)s)
+  AND NOT EXISTS (SELECT 1 FROM %(step)s s
+                  WHERE s.%(step_project)s = p.%(project_id)s
+                    AND s.%(step_name)s = t.%(template_name)s)
+ORDER BY p.%(project_id)s, t.%(template_name)s, t.%(template_id)s
+'''
+
+
+def get_missing_steps(project_ids, template_ids):
+    """Returns the templates, that are not yet assigned to the projects.
+
+    :param project_ids: List of project ids
+    :param template_ids: List of template ids
+    :returns: List of tuples (project id, name, description, highest
+      step position of the project or ``None``), ordered by project and
+      name
+    """
+    if not project_ids or not template_ids:
+        return []
+    # accessing restricted _meta is intended: pylint:disable=W0212
+    project = models.Project._meta
+    step = models.ProjectStep._meta
+    template = models.ProjectStepTemplate._meta
+    qn = connection.ops.quote_name
+    sql = _MISSING_STEPS_SQL % {
+        'project': qn(project.db_table),
+        'project_id': qn(project.pk.column),
+        'step': qn(step.db_table),
+        'step_project': qn(step.get_field('project').column),
+        'step_name': qn(step.get_field('name').column),
+        'step_position': qn(step.get_field('position').column),
+        'template': qn(template.db_table),
+        'template_id': qn(template.pk.column),
+        'template_name': qn(template.get_field('name').column),
+        'template_description': qn(template.get_field('description').column),
+        'project_ids': ', '.join(['%s'] * len(project_ids)),
+        'template_ids': ', '.join(['%s'] * len(template_ids)),
+        }
+    cursor = connection.cursor()
+    cursor.execute(sql, [int(x) for x in project_ids]
+                   + [int(x) for x in template_ids])
+    return cursor.fetchall()
+
+
+def assign_step_templates(project_ids, template_ids):
+    """Adds steps for the templates to all projects, that lack them.
+
+    The projects are locked for the duration of the transaction, so
+    concurrent assignments to the same projects are serialized.
+
+    :param project_ids: List of project ids
+    :param template_ids: List of template ids
+    :returns: Dict mapping project ids to the number of added steps
+    """
+    counts = {}
+    with transaction.commit_on_success():
+        project_ids = list(models.Project.objects.select_for_update().filter(
+            id__in=list(project_ids)).values_list('id', flat=True))
+        steps = {}
+        names = set()
+        for project_id, name, description, position in get_missing_steps(
+            project_ids, list(template_ids)):
+            # Templates may share a name, the first one wins.
+            if (project_id, name) in names:
+                continue
+            names.add((project_id, name))
+            new = steps.setdefault(project_id, [])
+            new.append(models.ProjectStep(
+                project_id=project_id, name=name, description=description,
+                status=models.STEP_STATUS_OPEN,
+                position=(position or 0) + len(new) + 1))
+        for project_id, new in sorted(steps.iteritems()):
+            models.ProjectStep.objects.bulk_create(current_user.stamp(new))
+            counts[project_id] = len(new)
+    if counts:
+        # the bulk inserts bypass the receivers
+        dashboardcache.invalidate(dashboardcache.WIDGET_STEPS)
+    return counts
@@ -2,16 +2,13 @@
 
 """Tags to create a calendar widget."""
 
-from calendar import HTMLCalendar, month_name
 # see: http://journal.uggedal.com/creating-a-flexible-monthly-calendar-in-django/
-import calendar
-import datetime
 import re
 
 from django import template
-from django.utils.formats import date_format
 from django.utils.safestring import mark_safe
-from django.utils.translation import ugettext as _
+
+from inhouse import calendars
 
 
 register = template.Library()
@@ -34,46 +31,6 @@ def do_calendar(parser, token):
     return CalendarNode(*m.groups())
 
 
-class Calendar(HTMLCalendar):
-    """A HTML calendar with small adjustments."""
-
-    def formatday(self, day, weekday):
-        """Return a day as a table cell."""
-        if day != 0:
-            date = datetime.date(self.year, self.month, day)
-            cssclass = self.cssclasses[weekday]
-            if datetime.date.today() == date:
-                cssclass += ' today'
-            return ('<td class="%s"><a href="#" title="%s">%d</a></td>'
-                    % (cssclass, date_format(date, 'SHORT_DATE_FORMAT'), day))
-        else:
-            return '<td class="noday">&nbsp;</td>' # day outside month
-
-    def formatmonthname(self, theyear, themonth, withyear=True):
-        v = []
-        """Return a month name as a table row."""
-        if withyear:
-            s = '%s %s' % (month_name[themonth], theyear)
-        else:
-            s = '%s' % month_name[themonth]
-        v.append('<tr><th colspan="7" class="month">%s' % s)
-        v.append('<div class="btn-group" style="float:right;">')
-        v.append(('<a class="btn btn-mini" title="%s" href=""'
-                  ' onclick="">'
-                  '<i class="icon-arrow-left"></i></a>') % _(u'Show previous month'))
-        v.append(('<a class="btn btn-mini" title="%s" href=""'
-                  ' onclick="">'
-                  '<i class="icon-arrow-right"></i></a>') % _(u'Show next month'))
-        v.append('</div>')
-        v.append('</th>')
-        v.append('</tr>')
-        return ''.join(v)
-
-    def formatmonth(self, year, month):
-        self.year, self.month = year, month
-        return super(Calendar, self).formatmonth(year, month)
-
-
 class CalendarNode(template.Node):
     """The node, that creates the calendar widget."""
 
@@ -81,10 +38,7 @@ class CalendarNode(template.Node):
         self.var_name = var_name
 
     def render(self, context):
-        today = datetime.date.today()
         request = template.Variable('request').resolve(context)
-        month = int(request.session['calendar_month'])
-        year = int(request.session['calendar_year'])
-        #context['selected_month'] = datetime.date(year, month, 1)
-        cal = Calendar()
-        return mark_safe(cal.formatmonth(year, month))
+        year, month = calendars.get_session_month(request.session)
+        entry = calendars.get_month(request.user.id, year, month)
+        return mark_safe(entry['html'])
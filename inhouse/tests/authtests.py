@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the authentication backend."""
+
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase
+
+from inhouse.auth.backends import CachedModelBackend
+from inhouse.tests import utils
+
+
+class TestCachedModelBackend(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+        self.user = utils.create_user()
+        self.group = Group.objects.create(name=u'Managers')
+        self.permission = Permission.objects.get(
+            content_type__app_label='inhouse', codename='change_booking')
+        self.group.permissions.add(self.permission)
+        self.user.groups.add(self.group)
+
+    def test_authenticate(self):
+        self.assertEqual(self.backend.authenticate('foo', 'bar'), self.user)
+        self.assertEqual(self.backend.authenticate('foo', 'baz'), None)
+
+    def test_get_user(self):
+        count, user = utils.count_queries(self.backend.get_user, self.user.id)
+        self.assertEqual((count, user), (1, self.user))
+        count, user = utils.count_queries(self.backend.get_user, self.user.id)
+        self.assertEqual((count, user), (0, self.user))
+        self.user.first_name = u'Foo'
+        self.user.save()
+        count, user = utils.count_queries(self.backend.get_user, self.user.id)
+        self.assertEqual((count, user.first_name), (1, u'Foo'))
+        self.assertEqual(self.backend.get_user(0), None)
+
+    def has_perm(self):
+        user = self.backend.get_user(self.user.id)
+        return utils.count_queries(self.backend.has_perm, user,
+                                   'inhouse.change_booking')
+
+    def test_permissions(self):
+        self.assertEqual(self.has_perm(), (2, True))
+        self.assertEqual(self.has_perm(), (0, True))
+        user = self.backend.get_user(self.user.id)
+        self.assertEqual(self.backend.get_group_permissions(user),
+                         set(['inhouse.change_booking']))
+
+    def test_group_change(self):
+        self.has_perm()
+        self.group.permissions.remove(self.permission)
+        self.assertEqual(self.has_perm(), (2, False))
+        self.user.user_permissions.add(self.permission)
+        self.assertEqual(self.has_perm()[1], True)
+
+    def test_superuser(self):
+        self.user.groups.clear()
+        self.assertFalse(self.has_perm()[1])
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertTrue(self.has_perm()[1])
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the billing engine."""
+
+import datetime
+import decimal
+
+from django.test import TestCase
+
+from inhouse import billing, invoicing, models
+from inhouse.tests import utils
+
+
+class TestRateTimeline(TestCase):
+
+    def test_get(self):
+        timeline = billing.RateTimeline([
+            (datetime.date(2012, 2, 1), datetime.date(2012, 2, 29), 2),
+            (datetime.date(2012, 1, 1), datetime.date(2012, 1, 31), 1),
+            (datetime.date(2012, 4, 1), datetime.date(4711, 12, 31), 3)])
+        self.assertEqual(timeline.get(datetime.date(2011, 12, 31)), None)
+        self.assertEqual(timeline.get(datetime.date(2012, 1, 1)), 1)
+        self.assertEqual(timeline.get(datetime.date(2012, 2, 29)), 2)
+        self.assertEqual(timeline.get(datetime.date(2012, 3, 1), 0), 0)
+        self.assertEqual(timeline.get(datetime.date(2013, 1, 1)), 3)
+
+    def test_overlapping_windows(self):
+        timeline = billing.RateTimeline([
+            (datetime.date(2012, 1, 1), datetime.date(2012, 12, 31), 1),
+            (datetime.date(2012, 6, 1), datetime.date(2012, 6, 30), 2)])
+        self.assertEqual(timeline.get(datetime.date(2012, 5, 31)), 1)
+        self.assertEqual(timeline.get(datetime.date(2012, 6, 15)), 2)
+        self.assertEqual(timeline.get(datetime.date(2012, 7, 1)), 1)
+
+
+class TestPriceBookings(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project(
+            coefficient_saturday=decimal.Decimal('1.25'))
+        self.step = utils.create_step(self.project,
+                                      coefficient=decimal.Decimal('2'))
+        models.ProjectRate.new(project=self.project,
+                               valid_from=datetime.date(2012, 1, 1),
+                               hourly_rate=decimal.Decimal('80'))
+        project_user = models.ProjectUser.new(project=self.project,
+                                              user=self.user)
+        models.ProjectUserRate.new(project_user=project_user,
+                                   valid_from=datetime.date(2012, 7, 1),
+                                   valid_until=datetime.date(2012, 7, 31),
+                                   hourly_rate=decimal.Decimal('100'))
+        # A friday, a saturday in July and a monday in August
+        for date in (datetime.date(2012, 7, 13), datetime.date(2012, 7, 14),
+                     datetime.date(2012, 8, 13)):
+            day = utils.create_day(self.user, date)
+            utils.create_booking(day, self.project, 90)
+            utils.create_booking(day, self.project, 45, step=self.step)
+        day = utils.create_day(self.user, datetime.date(2011, 12, 31))
+        self.unpriced = utils.create_booking(day, self.project, 60)
+
+    def test_matches_get_amount(self):
+        bookings = models.Booking.objects.all()
+        with self.assertNumQueries(4):
+            result = billing.price_bookings(bookings)
+        self.assertEqual(len(result.bookings), 6)
+        self.assertEqual(result.unpriced, [self.unpriced.id])
+        for price in result.bookings:
+            booking = models.Booking.objects.get(pk=price.booking_id)
+            self.assertEqual(price.amount, booking.get_amount())
+        self.assertEqual(self.unpriced.get_amount(), None)
+
+    def test_project_totals(self):
+        result = billing.price_bookings(models.Booking.objects.all())
+        total = result.projects[self.project.id]
+        self.assertEqual(total.hours, decimal.Decimal('6.75'))
+        # 100 * (1.5 + 0.75 * 2) * (1 + 1.25) + 80 * (1.5 + 0.75 * 2)
+        self.assertEqual(total.amount, decimal.Decimal('915.00'))
+        self.assertEqual(result.amount, total.amount)
+
+    def test_empty_query(self):
+        with self.assertNumQueries(1):
+            result = billing.price_bookings(
+                models.Booking.objects.filter(id=0))
+        self.assertEqual(result.bookings, [])
+
+
+class TestCreateInvoice(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        models.ProjectRate.new(project=self.project,
+                               valid_from=datetime.date(2012, 1, 1),
+                               hourly_rate=decimal.Decimal('80'))
+        day = utils.create_day(self.user, datetime.date(2012, 7, 2))
+        self.bookings = [utils.create_booking(day, self.project, 60)
+                         for _ in range(5)]
+        locked = utils.create_day(self.user, datetime.date(2012, 7, 3),
+                                  locked=True)
+        self.locked = utils.create_booking(locked, self.project, 60)
+        day = utils.create_day(self.user, datetime.date(2012, 8, 1))
+        self.outside = utils.create_booking(day, self.project, 60)
+
+    def test_create_invoice(self):
+        calls = []
+        invoice, result = invoicing.create_invoice(
+            self.project, datetime.date(2012, 7, 1),
+            datetime.date(2012, 7, 31), chunk_size=2,
+            progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual(calls, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(
+            set(invoice.booking_set.values_list('id', flat=True)),
+            set(x.id for x in self.bookings))
+        self.assertEqual(result.amount, decimal.Decimal('400.00'))
+        for booking in (self.locked, self.outside):
+            booking = models.Booking.objects.get(pk=booking.pk)
+            self.assertEqual(booking.invoice, None)
+
+    def test_locked_during_run(self):
+        def lock(done, total):
+            models.Day.objects.update(locked=True)
+        invoice, _ = invoicing.create_invoice(
+            self.project, datetime.date(2012, 7, 1),
+            datetime.date(2012, 7, 31), chunk_size=2, progress=lock)
+        self.assertEqual(invoice.booking_set.count(), 2)
+
+    def test_nothing_to_invoice(self):
+        invoicing.create_invoice(self.project, datetime.date(2012, 7, 1),
+                                 datetime.date(2012, 7, 31))
+        invoice, result = invoicing.create_invoice(
+            self.project, datetime.date(2012, 7, 1),
+            datetime.date(2012, 7, 31))
+        self.assertEqual(invoice, None)
+        self.assertEqual(result, None)
+        self.assertEqual(models.Invoice.objects.count(), 1)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the month calendars."""
+
+import datetime
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+
+from inhouse import calendars
+from inhouse.tests import utils
+from inhouse.utils import json_ext as json
+
+
+class TestCalendars(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.day = utils.create_day(self.user, datetime.date(2012, 7, 3))
+        utils.create_booking(self.day, self.project, 90)
+        utils.create_day(self.user, datetime.date(2012, 7, 4), locked=True)
+        self.today = datetime.date(2012, 7, 5)
+
+    def get_month(self):
+        return calendars.get_month(self.user.id, 2012, 7, 'en', self.today)
+
+    def test_markers(self):
+        entry = self.get_month()
+        self.assertEqual(sorted(entry['days']), [3, 4])
+        self.assertEqual(entry['days'][3]['minutes'], 90)
+        self.assertFalse(entry['days'][3]['locked'])
+        self.assertTrue(entry['days'][4]['locked'])
+        self.assertEqual(entry['today'], 5)
+        self.assertEqual(entry['weeks'][0][:2], [0, 0])
+        self.assertIn('booked', entry['html'])
+        self.assertIn('locked', entry['html'])
+        self.assertIn('today', entry['html'])
+
+    def test_today_other_month(self):
+        entry = calendars.get_month(self.user.id, 2012, 6, 'en', self.today)
+        self.assertEqual(entry['days'], {})
+        self.assertEqual(entry['today'], None)
+        self.assertNotIn('today', entry['html'])
+
+    def test_cached(self):
+        count, entry = utils.count_queries(self.get_month)
+        self.assertEqual(count, 1)
+        count, cached = utils.count_queries(self.get_month)
+        self.assertEqual(count, 0)
+        self.assertEqual(cached, entry)
+
+    def test_invalidated_by_bookings(self):
+        self.get_month()
+        booking = utils.create_booking(self.day, self.project, 30)
+        self.assertEqual(self.get_month()['days'][3]['minutes'], 120)
+        booking.delete()
+        self.assertEqual(self.get_month()['days'][3]['minutes'], 90)
+
+    def test_invalidated_by_days(self):
+        self.get_month()
+        self.day.locked = True
+        self.day.save()
+        self.assertTrue(self.get_month()['days'][3]['locked'])
+
+    def test_adjacent_months(self):
+        self.assertEqual(calendars.get_adjacent_months(2012, 1),
+                         ((2011, 12), (2012, 2)))
+        self.assertEqual(calendars.get_adjacent_months(2012, 12),
+                         ((2012, 11), (2013, 1)))
+        html = self.get_month()['html']
+        self.assertIn(calendars.get_url(2012, 6), html)
+        self.assertIn(calendars.get_url(2012, 8), html)
+
+
+class TestCalendarView(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.create_user()
+        day = utils.create_day(self.user, datetime.date(2012, 7, 3))
+        utils.create_booking(day, utils.create_project(), 90)
+        self.client = Client()
+        self.client.login(username='foo', password='bar')
+        self.url = reverse('inhouse:calendar_month',
+                           kwargs={'year': '2012', 'month': '07'})
+
+    def test_month(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual((data['year'], data['month']), (2012, 7))
+        self.assertEqual(data['days']['3']['minutes'], 90)
+        self.assertEqual(data['previous']['url'], calendars.get_url(2012, 6))
+        self.assertEqual(data['next']['url'], calendars.get_url(2012, 8))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.session['calendar_month'], 7)
+
+    def test_revalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.get(reverse('inhouse:calendar_month',
+                                kwargs={'year': '2012', 'month': '08'}))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # navigating back is remembered without a response body
+        self.assertEqual(self.client.session['calendar_month'], 7)
+        utils.create_day(self.user, datetime.date(2012, 7, 4))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_prefetch(self):
+        self.client.get(self.url)
+        for year, month in ((2012, 6), (2012, 8)):
+            count, _ = utils.count_queries(
+                calendars.get_month, self.user.id, year, month)
+            self.assertEqual(count, 0)
+
+    def test_invalid_month(self):
+        response = self.client.get('/calendar/2012/13.json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
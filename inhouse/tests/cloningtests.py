@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the project cloning."""
+
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from inhouse import cloning, models
+from inhouse.tests import utils
+
+
+class TestCloneProject(TestCase):
+
+    def setUp(self):
+        self.project = utils.create_project()
+        self.first = utils.create_step(self.project, u'First')
+        self.second = utils.create_step(self.project, u'Second',
+                                        status=models.STEP_STATUS_CLOSED)
+        self.user = utils.create_user()
+        self.member = models.ProjectUser.new(project=self.project,
+                                             user=self.user,
+                                             default_step=self.second)
+        models.ProjectUser.new(project=self.project,
+                               user=utils.create_user('other'))
+        models.ProjectRate.new(project=self.project,
+                               valid_from=datetime.date(2012, 1, 1),
+                               hourly_rate=80)
+        models.ProjectUserRate.new(project_user=self.member, hourly_rate=90)
+
+    def test_clone(self):
+        new = cloning.clone_project(self.project, name=u'New', rates=True)
+        new = models.Project.objects.get(pk=new.pk)
+        self.assertEqual(new.name, u'New')
+        self.assertEqual(new.master, new)
+        self.assertNotEqual(new.key, self.project.key)
+        steps = list(new.projectstep_set.order_by('position'))
+        self.assertEqual([(x.name, x.position, x.status) for x in steps],
+                         [(u'First', 1, models.STEP_STATUS_OPEN),
+                          (u'Second', 2, models.STEP_STATUS_OPEN)])
+        member = new.projectuser_set.get(user=self.user)
+        self.assertEqual(member.default_step, steps[1])
+        self.assertEqual(new.projectuser_set.count(), 2)
+        self.assertEqual(new.projectrate_set.get().hourly_rate, 80)
+        self.assertEqual(models.ProjectUserRate.objects.get(
+            project_user=member).hourly_rate, 90)
+
+    def test_without_children(self):
+        new = cloning.clone_project(self.project, steps=False,
+                                    members=False, trackers=False)
+        self.assertEqual(new.projectstep_set.count(), 0)
+        self.assertEqual(new.projectuser_set.count(), 0)
+        self.assertEqual(new.projectrate_set.count(), 0)
+
+    def test_default_step_without_steps(self):
+        new = cloning.clone_project(self.project, steps=False)
+        member = new.projectuser_set.get(user=self.user)
+        self.assertEqual(member.default_step, None)
+
+    def test_duplicate_name(self):
+        self.assertRaises(ValidationError, cloning.clone_project,
+                          self.project, name=self.project.name)
+        self.assertEqual(models.Project.objects.count(), 1)
+
+    def test_query_count(self):
+        small, _ = utils.count_queries(cloning.clone_project, self.project,
+                                       name=u'Small', rates=True)
+        for i in range(10):
+            step = utils.create_step(self.project, u'Step %d' % i)
+            member = models.ProjectUser.new(
+                project=self.project, user=utils.create_user('user%d' % i),
+                default_step=step)
+            models.ProjectUserRate.new(project_user=member, hourly_rate=i)
+        large, _ = utils.count_queries(cloning.clone_project, self.project,
+                                       name=u'Large', rates=True)
+        self.assertEqual(small, large)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the dashboard data."""
+
+import datetime
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import timezone
+
+from inhouse import dashboard, models
+from inhouse.tests import utils
+
+
+class TestStarredItems(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.create_user()
+        self.projects = [utils.create_project(u'Project %d' % i, u'PR%d' % i)
+                         for i in range(3)]
+        day = utils.create_day(self.user, datetime.date(2012, 7, 2))
+        self.booking = utils.create_booking(day, self.projects[0], 60)
+        self.customer = self.projects[0].customer
+
+    def _star(self, *objs):
+        for obj in objs:
+            obj.add_star(self.user)
+
+    def test_star_order(self):
+        self._star(self.projects[1], self.booking, self.customer,
+                   self.projects[0])
+        items = dashboard.get_starred_items(self.user)
+        self.assertEqual([x.object for x in items], [
+            self.projects[0], self.customer, self.booking, self.projects[1]])
+        self.assertEqual(items[0].content_type.model_class(), models.Project)
+
+    def test_query_count(self):
+        self._star(self.booking, self.customer, *self.projects)
+        dashboard.get_starred_items(self.user)
+        # one query for the stars and one per content type
+        with self.assertNumQueries(4):
+            items = dashboard.get_starred_items(self.user)
+        self.assertEqual(len(items), 5)
+
+    def test_limit(self):
+        self._star(*self.projects)
+        items = dashboard.get_starred_items(self.user, limit=2)
+        self.assertEqual([x.object for x in items],
+                         [self.projects[2], self.projects[1]])
+
+    def test_deleted_object(self):
+        self._star(self.booking, self.projects[1])
+        models.Booking.objects.filter(pk=self.booking.pk).delete()
+        items = dashboard.get_starred_items(self.user)
+        self.assertEqual([x.object for x in items], [self.projects[1]])
+
+    def test_index(self):
+        self._star(self.projects[1])
+        client = Client()
+        client.login(username='foo', password='bar')
+        response = client.get('/')
+        self.assertEqual([x.object for x in
+                          response.context['starred_items']],
+                         [self.projects[1]])
+
+
+class TestDashboard(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.create_user()
+        self.today = datetime.date(2012, 8, 1)
+        self.project = utils.create_project()
+        self.step = utils.create_step(self.project)
+        models.ProjectUser.new(project=self.project, user=self.user)
+        day = utils.create_day(self.user, datetime.date(2012, 7, 31))
+        self.booking = utils.create_booking(day, self.project, 90)
+        self.timer = models.Timer.new(
+            title=u'Timer', active=True, created_by=self.user.id,
+            start_time=timezone.now())
+        self.group = Group.objects.create(name=u'Staff')
+        self.user.groups.add(self.group)
+        self.news = self._news(u'News', datetime.date(2012, 7, 1))
+        self._news(u'Expired', datetime.date(2012, 6, 1),
+                   datetime.date(2012, 6, 30))
+        self.project.add_star(self.user)
+        self.booking.add_star(self.user)
+
+    def _news(self, title, valid_from, valid_until=None):
+        news = models.News.new(title=title, message=title,
+                               valid_from=valid_from, valid_until=valid_until)
+        models.NewsGroup.new(news=news, group=self.group)
+        return news
+
+    def get_dashboard(self):
+        return dashboard.get_dashboard(self.user, self.today)
+
+    def test_widgets(self):
+        data = self.get_dashboard()
+        self.assertEqual(len(data['week']['days']), 7)
+        self.assertEqual(data['week']['days'][0][0], datetime.date(2012, 7, 30))
+        self.assertEqual(data['week']['days'][1][1], 90)
+        self.assertEqual(data['week']['total'], 90)
+        self.assertEqual(data['running_timers'], [self.timer])
+        self.assertEqual([x.object for x in data['starred_items']],
+                         [self.booking, self.project])
+        self.assertEqual(data['open_steps'], [self.step])
+        self.assertEqual(data['news'], [self.news])
+
+    def test_query_budget(self):
+        # one query per widget, one per starred content type and one for
+        # the user's groups
+        with self.assertNumQueries(8):
+            self.get_dashboard()
+        with self.assertNumQueries(0):
+            self.get_dashboard()
+
+    def test_invalidation(self):
+        self.get_dashboard()
+        utils.create_booking(self.booking.day, self.project, 30)
+        self.timer.active = False
+        self.timer.save()
+        self.step.status = models.STEP_STATUS_CLOSED
+        self.step.save()
+        self.news.delete()
+        self.booking.remove_star(self.user)
+        data = self.get_dashboard()
+        self.assertEqual(data['week']['total'], 120)
+        self.assertEqual(data['running_timers'], [])
+        self.assertEqual(data['open_steps'], [])
+        self.assertEqual(data['news'], [])
+        self.assertEqual([x.object for x in data['starred_items']],
+                         [self.project])
+
+    def test_index(self):
+        client = Client()
+        client.login(username='foo', password='bar')
+        response = client.get('/')
+        self.assertEqual(response.context['running_timers'], [self.timer])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the booking export."""
+
+import datetime
+
+from django.contrib.auth.models import Permission
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+
+from inhouse import exports
+from inhouse.tests import utils
+from inhouse.utils import json_ext as json
+
+
+class TestExport(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.other = utils.create_project(u'Other', u'PR2')
+        step = utils.create_step(self.project)
+        day = utils.create_day(self.user, datetime.date(2012, 7, 2))
+        self.bookings = [
+            utils.create_booking(day, self.project, 60, step=step),
+            utils.create_booking(day, self.project, 30, title=u'Zwölf'),
+            utils.create_booking(day, self.other, 15)]
+
+    def test_iter_rows(self):
+        query = exports.get_bookings()
+        with self.assertNumQueries(3):
+            rows = list(exports.iter_rows(query, chunk_size=2))
+        self.assertEqual([row[0] for row in rows],
+                         [booking.id for booking in self.bookings])
+        self.assertEqual(rows[0][1:5], (datetime.date(2012, 7, 2), u'foo',
+                                        u'Project', u'Step'))
+        self.assertEqual(rows[1][4], None)
+
+    def test_get_bookings(self):
+        query = exports.get_bookings(project=self.project.id,
+                                     user=self.user.id, invoice=False)
+        self.assertEqual(query.count(), 2)
+        query = exports.get_bookings(
+            date_from=datetime.date(2012, 7, 3))
+        self.assertEqual(query.count(), 0)
+
+    def test_csv(self):
+        data = ''.join(exports.export(exports.get_bookings(), 'csv'))
+        lines = data.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('id,date,user,project'))
+        self.assertTrue(u'Zwölf'.encode('utf-8') in lines[2])
+
+    def test_json(self):
+        data = ''.join(exports.export(exports.get_bookings(), 'json'))
+        rows = json.loads(data)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['title'], u'Zwölf')
+        self.assertEqual(rows[2]['project'], u'Other')
+        self.assertEqual(json.loads(''.join(exports.iter_json([]))), [])
+
+    def test_view(self):
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='change_booking'))
+        client = Client()
+        client.login(username='foo', password='bar')
+        url = reverse('inhouse:export_bookings', args=('csv',))
+        response = client.get(url, {'project': self.other.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.content.splitlines()), 2)
+        response = client.get(url, {'invoice': 1, 'uninvoiced': 1})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for locking days."""
+
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from inhouse import bookingcache, locking, models
+from inhouse.tests import utils
+from inhouse.utils import delete_pending
+
+
+class TestBookingCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_months(self):
+        self.assertEqual(bookingcache.get_months(datetime.date(2012, 11, 5),
+                                                 datetime.date(2013, 2, 1)),
+                         [(2012, 11), (2012, 12), (2013, 1), (2013, 2)])
+
+    def test_invalidate(self):
+        version = bookingcache.get_version(1, 2012, 7)
+        other = bookingcache.get_version(2, 2012, 7)
+        self.assertEqual(bookingcache.get_version(1, 2012, 7), version)
+        bookingcache.invalidate([1], datetime.date(2012, 7, 3))
+        self.assertNotEqual(bookingcache.get_version(1, 2012, 7), version)
+        self.assertEqual(bookingcache.get_version(2, 2012, 7), other)
+        bookingcache.invalidate(None, datetime.date(2012, 7, 3))
+        self.assertNotEqual(bookingcache.get_version(2, 2012, 7), other)
+
+    def test_invalidate_after_commit(self):
+        bookingcache.invalidate([1], datetime.date(2012, 7, 3))
+        # a concurrent reader still sees the uncommitted state
+        version = bookingcache.get_version(1, 2012, 7)
+        delete_pending()
+        self.assertNotEqual(bookingcache.get_version(1, 2012, 7), version)
+
+
+class TestLockDays(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = utils.create_user('manager')
+        self.users = [utils.create_user('user%d' % i) for i in range(3)]
+        self.department = models.Department.new(name=u'Development')
+        for user in self.users[:2]:
+            models.DepartmentUser.new(department=self.department, user=user)
+        for user in self.users:
+            for day in (30, 31):
+                utils.create_day(user, datetime.date(2012, 7, day))
+            utils.create_day(user, datetime.date(2012, 8, 1))
+        self.first = datetime.date(2012, 7, 1)
+        self.last = datetime.date(2012, 7, 31)
+
+    def test_get_days(self):
+        self.assertEqual(locking.get_days(self.first, self.last).count(), 6)
+        self.assertEqual(locking.get_days(
+            self.first, self.last, users=[self.users[2]]).count(), 2)
+        self.assertEqual(locking.get_days(
+            self.first, self.last, department=self.department).count(), 4)
+
+    def test_lock(self):
+        version = bookingcache.get_version(self.users[0].id, 2012, 7)
+        other = bookingcache.get_version(self.users[2].id, 2012, 7)
+        query = locking.get_days(self.first, self.last,
+                                 department=self.department)
+        with self.assertNumQueries(3):
+            count = locking.set_locked(query, True, self.manager.id)
+        self.assertEqual(count, 4)
+        day = models.Day.objects.get(user=self.users[0],
+                                     date=datetime.date(2012, 7, 30))
+        self.assertTrue(day.locked)
+        self.assertEqual(day.locked_by, self.manager.id)
+        self.assertTrue(day.locked_at is not None)
+        self.assertEqual(models.Day.objects.filter(locked=True).count(), 4)
+        self.assertNotEqual(
+            bookingcache.get_version(self.users[0].id, 2012, 7), version)
+        self.assertEqual(
+            bookingcache.get_version(self.users[2].id, 2012, 7), other)
+        # Locked days are left alone
+        self.assertEqual(locking.set_locked(query, True), 0)
+
+    def test_unlock(self):
+        query = locking.get_days(self.first, self.last)
+        locking.set_locked(query, True, self.manager.id)
+        self.assertEqual(locking.set_locked(query, False), 6)
+        day = models.Day.objects.get(user=self.users[0],
+                                     date=datetime.date(2012, 7, 30))
+        self.assertEqual((day.locked, day.locked_by, day.locked_at),
+                         (False, None, None))
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the middleware classes."""
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.signals import pre_save
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from inhouse import calendars, models
+from inhouse.middleware import (AutoCurrentUserMiddleware,
+                                CalendarSessionMiddleware,
+                                UserLanguageMiddleware)
+from inhouse.tests import utils
+
+
+class TestAutoCurrentUserMiddleware(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = AutoCurrentUserMiddleware()
+        self.user = User.objects.create_user('foo', 'foo@example.com', 'bar')
+
+    def _request(self, user):
+        request = self.factory.get('/')
+        request.user = user
+        return request
+
+    def test_sets_created_and_modified_by(self):
+        request = self._request(self.user)
+        self.middleware.process_request(request)
+        try:
+            address = models.Address.new(name1=u'foo')
+        finally:
+            self.middleware.process_response(request, HttpResponse())
+        self.assertEqual(address.created_by, self.user.id)
+        self.assertEqual(address.modified_by, self.user.id)
+
+    def test_keeps_created_by(self):
+        other = User.objects.create_user('baz', 'baz@example.com', 'bar')
+        address = models.Address.new(name1=u'foo', created_by=other.id)
+        request = self._request(self.user)
+        self.middleware.process_request(request)
+        try:
+            address.save()
+        finally:
+            self.middleware.process_response(request, HttpResponse())
+        self.assertEqual(address.created_by, other.id)
+        self.assertEqual(address.modified_by, self.user.id)
+
+    def test_anonymous_user(self):
+        request = self._request(AnonymousUser())
+        self.middleware.process_request(request)
+        try:
+            address = models.Address.new(name1=u'foo')
+        finally:
+            self.middleware.process_response(request, HttpResponse())
+        self.assertEqual(address.created_by, None)
+
+    def test_outside_of_request(self):
+        request = self._request(self.user)
+        self.middleware.process_request(request)
+        self.middleware.process_exception(request, ValueError())
+        address = models.Address.new(name1=u'foo')
+        self.assertEqual(address.created_by, None)
+
+    def test_receivers_do_not_grow(self):
+        receivers = len(pre_save.receivers)
+        requests = [self._request(self.user) for _ in range(10)]
+        for request in requests:
+            self.middleware.process_request(request)
+        self.assertEqual(len(pre_save.receivers), receivers)
+        for request in requests:
+            self.middleware.process_response(request, HttpResponse())
+        self.assertEqual(len(pre_save.receivers), receivers)
+
+
+class TestCalendarSessionMiddleware(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CalendarSessionMiddleware()
+        self.user = User.objects.create_user('foo', 'foo@example.com', 'bar')
+
+    def _request(self, user, data=None, **extra):
+        request = self.factory.get('/', data or {}, **extra)
+        request.user = user
+        request.session = SessionStore()
+        return request
+
+    def test_no_parameters(self):
+        request = self._request(self.user)
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.accessed)
+
+    def test_anonymous_user(self):
+        request = self._request(AnonymousUser(), {'calendar_month': '3'})
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.accessed)
+
+    def test_ajax(self):
+        request = self._request(self.user, {'calendar_month': '3'},
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.accessed)
+        request = self._request(self.user, {'calendar_month': '3'},
+                                HTTP_ACCEPT='application/json')
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.accessed)
+
+    def test_select_month(self):
+        request = self._request(self.user, {'calendar_month': '3',
+                                            'calendar_year': '2012'})
+        self.middleware.process_request(request)
+        self.assertTrue(request.session.modified)
+        self.assertEqual(calendars.get_session_month(request.session),
+                         (2012, 3))
+        request.session.modified = False
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.modified)
+
+    def test_invalid_month(self):
+        request = self._request(self.user, {'calendar_month': '13'})
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.modified)
+        request = self._request(self.user, {'calendar_month': 'foo'})
+        self.middleware.process_request(request)
+        self.assertFalse(request.session.modified)
+
+
+class TestCleanupCalendarSessions(TestCase):
+
+    def _create_session(self, **data):
+        session = SessionStore()
+        session.update(data)
+        session.save()
+        return session.session_key
+
+    def test_cleanup(self):
+        orphaned = self._create_session(calendar_month=3, calendar_year=2012)
+        empty = self._create_session()
+        used = self._create_session(calendar_month=3, _auth_user_id=1)
+        call_command('cleanup_calendar_sessions', dry_run=True, verbosity=0)
+        self.assertEqual(Session.objects.count(), 3)
+        call_command('cleanup_calendar_sessions', verbosity=0)
+        keys = set(Session.objects.values_list('session_key', flat=True))
+        self.assertEqual(keys, set([used]))
+        self.assertNotIn(orphaned, keys)
+        self.assertNotIn(empty, keys)
+
+
+class TestUserLanguageMiddleware(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = UserLanguageMiddleware()
+        self.user = User.objects.create_user('foo', 'foo@example.com', 'bar')
+        self.session = SessionStore()
+
+    def _process(self):
+        request = self.factory.get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        request.session = self.session
+        self.session.modified = False
+        count, _ = utils.count_queries(self.middleware.process_request,
+                                       request)
+        return count
+
+    def test_without_profile(self):
+        self.assertEqual(self._process(), 1)
+        self.assertEqual(self._process(), 0)
+        self.assertFalse(self.session.modified)
+
+    def test_language(self):
+        profile = models.UserProfile.new(user=self.user)
+        profile.language = 'de'
+        profile.save()
+        self.assertEqual(self._process(), 1)
+        self.assertTrue(self.session.modified)
+        self.assertEqual(self.session['django_language'], 'de')
+        self.assertEqual(self._process(), 0)
+        self.assertFalse(self.session.modified)
+
+    def test_invalidated_on_save(self):
+        profile = models.UserProfile.new(user=self.user)
+        self._process()
+        self.assertEqual(self.session['django_language'], 'en')
+        profile.language = 'de'
+        profile.save()
+        self.assertEqual(self._process(), 1)
+        self.assertEqual(self.session['django_language'], 'de')
+
+    def test_profile_cache(self):
+        profile = models.UserProfile.new(user=self.user)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(models.UserProfile.get_for_user(user), profile)
+        count, cached = utils.count_queries(user.get_profile)
+        self.assertEqual(count, 0)
+        self.assertEqual(cached, profile)
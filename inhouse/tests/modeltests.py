@@ -3,12 +3,21 @@
 """Testcases for the models."""
 
 import datetime
+import decimal
 import time
 
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core import serializers
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError
 from django.test import TestCase
 from django.test.client import Client
 
-from inhouse import models
+from inhouse import models, rollups
+from inhouse.exceptions import InhouseBulkValidationError
+from inhouse.tests import utils
+from inhouse.utils import current_user
 
 
 class TestAddress(TestCase):
@@ -84,11 +93,44 @@ class TestBooking(TestCase):
 
     fixtures = ['test_data']
 
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.step = utils.create_step(self.project)
+        self.day = utils.create_day(self.user, datetime.date(2012, 7, 15))
+
     def test_is_open(self):
-        pass
+        booking = utils.create_booking(self.day, self.project, 60,
+                                       step=self.step)
+        self.assertEqual(booking.is_open, True)
+        self.day.locked = True
+        self.day.save()
+        booking = models.Booking.objects.get(pk=booking.pk)
+        self.assertEqual(booking.is_open, False)
 
     def test_get_closing_reason_tuple(self):
-        pass
+        booking = utils.create_booking(self.day, self.project, 60,
+                                       step=self.step)
+        self.assertEqual(booking.get_closing_reason_tuple(), ())
+        self.step.status = models.STEP_STATUS_CLOSED
+        self.step.save()
+        self.project.status = models.PROJECT_STATUS_CLOSED
+        self.project.save()
+        booking = models.Booking.objects.get(pk=booking.pk)
+        self.assertEqual(len(booking.get_closing_reason_tuple()), 2)
+
+    def test_with_closing_state(self):
+        for _ in range(5):
+            utils.create_booking(self.day, self.project, 60, step=self.step)
+        utils.create_booking(self.day, self.project, 60)
+        self.day.locked = True
+        self.day.save()
+        with self.assertNumQueries(1):
+            bookings = list(models.Booking.objects.with_closing_state())
+            self.assertEqual(len(bookings), 6)
+            for booking in bookings:
+                self.assertEqual(booking.is_open, False)
+                self.assertEqual(len(booking.get_closing_reason_tuple()), 1)
 
     def test_get_closing_reason_string(self):
         pass
@@ -97,6 +139,172 @@ class TestBooking(TestCase):
         pass
 
 
+class TestDefaultInfo(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        utils.create_day(self.user, datetime.date(2012, 7, 2))
+
+    def tearDown(self):
+        current_user.clear()
+
+    def _days(self, *days):
+        return [models.Day(user=self.user, date=datetime.date(2012, 7, day))
+                for day in days]
+
+    def test_bulk_insert(self):
+        current_user.set_user_id(self.user.id)
+        with self.assertNumQueries(2):
+            models.Day.bulk_insert(self._days(3, 4, 5))
+        days = models.Day.objects.filter(user=self.user).order_by('date')
+        self.assertEqual([x.date.day for x in days], [2, 3, 4, 5])
+        self.assertEqual(days[1].created_by, self.user.id)
+        self.assertEqual(days[1].modified_by, self.user.id)
+        self.assertTrue(days[1].created is not None)
+
+    def test_bulk_insert_batch_size(self):
+        with self.assertNumQueries(3):
+            models.Day.bulk_insert(self._days(3, 4, 5), batch_size=2)
+        self.assertEqual(models.Day.objects.count(), 4)
+
+    def test_validate_batch(self):
+        days = self._days(3, 2, 4, 3)
+        days[2].date = None
+        try:
+            models.Day.validate_batch(days)
+        except InhouseBulkValidationError as err:
+            self.assertEqual(sorted(err.errors), [1, 2, 3])
+            self.assertEqual(err.errors[2].keys(), ['date'])
+            self.assertEqual(err.errors[1][NON_FIELD_ERRORS],
+                             [days[1].unique_error_message(
+                                 models.Day, ('user', 'date'))])
+        else:
+            self.fail('InhouseBulkValidationError not raised')
+        self.assertRaises(ValidationError, models.Day.bulk_insert, days)
+        self.assertEqual(models.Day.objects.count(), 1)
+
+    def test_validate_batch_single_field(self):
+        project = utils.create_project(u'Project', u'PR1')
+        projects = [models.Project(name=name, key=key,
+                                   customer=project.customer,
+                                   type=project.type,
+                                   status=models.PROJECT_STATUS_OPEN)
+                    for name, key in ((u'Project', u'PR2'),
+                                      (u'Other', u'PR3'))]
+        try:
+            models.Project.validate_batch(projects)
+        except InhouseBulkValidationError as err:
+            self.assertEqual(err.errors.keys(), [0])
+            self.assertEqual(err.errors[0]['name'],
+                             [projects[0].unique_error_message(
+                                 models.Project, ('name',))])
+            self.assertFalse('key' in err.errors[0])
+        else:
+            self.fail('InhouseBulkValidationError not raised')
+
+
+class TestDefaultInfoSave(TestCase):
+
+    def setUp(self):
+        self.project = utils.create_project()
+
+    def _new_project(self, name=u'Other', key=u'PR2'):
+        return models.Project(name=name, key=key,
+                              customer=self.project.customer,
+                              type=self.project.type,
+                              status=models.PROJECT_STATUS_OPEN)
+
+    def _count_queries(self, func, *args, **kwds):
+        # Savepoints depend on the database backend, don't count them
+        queries, _ = utils.get_queries(func, *args, **kwds)
+        return len([sql for sql in queries if 'SAVEPOINT' not in sql])
+
+    def test_no_unique_queries(self):
+        count = self._count_queries(self._new_project().save)
+        checked = self._count_queries(
+            self._new_project(u'Third', u'PR3').save, validate_unique=True)
+        # The queries for the unique name and key are gone
+        self.assertEqual(count, checked - 2)
+
+    def test_unique_error_messages(self):
+        project = self._new_project(self.project.name, self.project.key)
+        try:
+            project.full_clean()
+        except ValidationError as err:
+            expected = err.message_dict
+        try:
+            project.save()
+        except ValidationError as err:
+            self.assertEqual(err.message_dict, expected)
+        else:
+            self.fail('ValidationError not raised')
+        self.assertEqual(models.Project.objects.count(), 1)
+
+    def test_unique_together(self):
+        step = utils.create_step(self.project)
+        duplicate = models.ProjectStep(project=self.project, name=step.name,
+                                       status=step.status, position=2)
+        try:
+            duplicate.save()
+        except ValidationError as err:
+            self.assertEqual(err.message_dict, {NON_FIELD_ERRORS: [
+                step.unique_error_message(models.ProjectStep,
+                                          ('name', 'project'))]})
+        else:
+            self.fail('ValidationError not raised')
+        # The transaction is still usable
+        step.name = u'Renamed'
+        step.save()
+
+
+class TestDayManager(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.first = datetime.date(2012, 7, 1)
+        self.last = datetime.date(2012, 7, 31)
+        utils.create_day(self.user, datetime.date(2012, 7, 10))
+
+    def test_get_or_create_range(self):
+        queries, days = utils.get_queries(
+            models.Day.objects.get_or_create_range, self.user, self.first,
+            self.last)
+        queries = [sql for sql in queries if 'SAVEPOINT' not in sql]
+        # Read existing days, insert the missing ones, read them back
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(sorted(days), [self.first + datetime.timedelta(i)
+                                        for i in range(31)])
+        self.assertEqual(days[self.first].date, self.first)
+        self.assertTrue(days[self.first].pk is not None)
+        self.assertEqual(models.Day.objects.count(), 31)
+        with self.assertNumQueries(1):
+            again = models.Day.objects.get_or_create_range(
+                self.user.id, self.first, self.last)
+        self.assertEqual(again, days)
+
+    def test_concurrent_insert(self):
+        manager = models.Day.objects
+        bulk_create = manager.bulk_create
+        calls = []
+
+        def concurrent_bulk_create(objs):
+            if not calls:
+                # Another transaction inserts one of the days first
+                utils.create_day(self.user, datetime.date(2012, 7, 2))
+            calls.append(len(objs))
+            return bulk_create(objs)
+
+        manager.bulk_create = concurrent_bulk_create
+        try:
+            days = manager.get_or_create_range(self.user, self.first,
+                                               datetime.date(2012, 7, 3))
+        finally:
+            del manager.bulk_create
+        self.assertEqual(calls, [3, 2])
+        self.assertEqual(len(days), 3)
+        self.assertEqual(models.Day.objects.count(), 4)
+
+
 class TestDay(TestCase):
 
     def test_slugify(self):
@@ -106,20 +314,180 @@ class TestDay(TestCase):
         day.date = datetime.date(2012, 7, 15)
         self.assertEqual(day.slugify(), u'2012/07/15')
 
+    def test_booking_sum(self):
+        user = utils.create_user()
+        project = utils.create_project()
+        day = utils.create_day(user, datetime.date(2012, 7, 15))
+        other = utils.create_day(user, datetime.date(2012, 7, 16))
+        booking = utils.create_booking(day, project, 90)
+        utils.create_booking(day, project, 30)
+        day = models.Day.objects.get(pk=day.pk)
+        self.assertEqual(day.get_booking_sum(), 120)
+        booking.duration = decimal.Decimal(60)
+        booking.save()
+        day = models.Day.objects.get(pk=day.pk)
+        self.assertEqual(day.get_booking_sum(), 90)
+        booking.day = other
+        booking.save()
+        day = models.Day.objects.get(pk=day.pk)
+        other = models.Day.objects.get(pk=other.pk)
+        self.assertEqual(day.get_booking_sum(), 30)
+        self.assertEqual(other.get_booking_sum(), 60)
+        booking.delete()
+        other = models.Day.objects.get(pk=other.pk)
+        self.assertEqual(other.get_booking_sum(), 0)
+
+    def test_load_fixture(self):
+        user = utils.create_user()
+        project = utils.create_project()
+        day = utils.create_day(user, datetime.date(2012, 7, 15))
+        utils.create_booking(day, project, 90)
+        data = serializers.serialize('json', list(models.Day.objects.all()) +
+                                     list(models.Booking.objects.all()))
+        models.Booking.objects.all().delete()
+        models.Day.objects.all().delete()
+        # like loaddata, the serialized booking sum must not grow
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        day = models.Day.objects.get(pk=day.pk)
+        self.assertEqual(day.get_booking_sum(), 90)
+
+    def test_rebuild_booking_sums(self):
+        user = utils.create_user()
+        project = utils.create_project()
+        day = utils.create_day(user, datetime.date(2012, 7, 15))
+        utils.create_booking(day, project, 90)
+        models.Day.objects.update(booking_sum=0)
+        models.Day.rebuild_booking_sums()
+        day = models.Day.objects.get(pk=day.pk)
+        self.assertEqual(day.get_booking_sum(), 90)
+
+
+class TestBookingRollup(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.step = utils.create_step(self.project)
+        # Sunday of week 28 and monday of week 29
+        self.sunday = utils.create_day(self.user, datetime.date(2012, 7, 15))
+        self.monday = utils.create_day(self.user, datetime.date(2012, 7, 16))
+
+    def _get_week(self, week, step=None):
+        query = models.BookingWeekRollup.objects.filter(
+            user=self.user, project=self.project, step=step, year=2012,
+            week=week)
+        rows = list(query.values_list('duration', flat=True))
+        self.assertEqual(len(rows), 1)
+        return rows[0]
+
+    def _get_month(self):
+        query = models.BookingMonthRollup.objects.get(
+            user=self.user, project=self.project, year=2012, month=7)
+        return query.duration
+
+    def test_updated_by_bookings(self):
+        booking = utils.create_booking(self.sunday, self.project, 60)
+        utils.create_booking(self.monday, self.project, 30, step=self.step)
+        self.assertEqual(self._get_week(28), 60)
+        self.assertEqual(self._get_week(29, self.step), 30)
+        self.assertEqual(self._get_month(), 90)
+        booking.day = self.monday
+        booking.step = self.step
+        booking.duration = decimal.Decimal(45)
+        booking.save()
+        self.assertEqual(self._get_week(28), 0)
+        self.assertEqual(self._get_week(29, self.step), 75)
+        self.assertEqual(self._get_month(), 75)
+        booking.delete()
+        self.assertEqual(self._get_week(29, self.step), 30)
+        self.assertEqual(self._get_month(), 30)
+        self.assertEqual(rollups.check(), [])
+
+    def test_delete_project(self):
+        utils.create_booking(self.sunday, self.project, 60)
+        utils.create_booking(self.monday, self.project, 30, step=self.step)
+        self.project.delete()
+        self.assertEqual(models.BookingWeekRollup.objects.count(), 0)
+        self.assertEqual(models.BookingMonthRollup.objects.count(), 0)
+        self.assertEqual(rollups.check(), [])
+
+    def test_load_fixture(self):
+        utils.create_booking(self.sunday, self.project, 60, step=self.step)
+        data = serializers.serialize('json', (
+            list(models.Booking.objects.all()) +
+            list(models.BookingWeekRollup.objects.all()) +
+            list(models.BookingMonthRollup.objects.all())))
+        models.Booking.objects.all().delete()
+        models.BookingWeekRollup.objects.all().delete()
+        models.BookingMonthRollup.objects.all().delete()
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        self.assertEqual(self._get_week(28, self.step), 60)
+        self.assertEqual(self._get_month(), 60)
+
+    def test_concurrent_insert_without_step(self):
+        models.BookingWeekRollup.add(self.user.id, self.project.id, None,
+                                     self.sunday.date, 60)
+        # a second insert of the same key must hit the unique index
+        duplicate = models.BookingWeekRollup(
+            user=self.user, project=self.project, year=2012, week=28)
+        self.assertRaises(IntegrityError, duplicate.save, force_insert=True)
+
+    def test_check_and_rebuild(self):
+        utils.create_booking(self.sunday, self.project, 60)
+        models.BookingMonthRollup.objects.update(duration=0)
+        differences = rollups.check()
+        self.assertEqual(len(differences), 1)
+        self.assertEqual(differences[0][0], models.BookingMonthRollup)
+        rollups.rebuild()
+        self.assertEqual(rollups.check(), [])
+        self.assertEqual(self._get_month(), 60)
+
 
 class TestStarredItemMixin(TestCase):
 
+    def setUp(self):
+        cache.clear()
+        self.user = utils.create_user()
+        self.projects = [utils.create_project(u'Project %d' % i, u'PR%d' % i)
+                         for i in range(3)]
+
     def test_get_starred(self):
-        pass
+        self.projects[1].add_star(self.user)
+        self.assertEqual(list(models.Project.get_starred(self.user)),
+                         [self.projects[1]])
 
     def test_is_starred(self):
-        pass
+        self.projects[0].add_star(self.user)
+        self.assertTrue(self.projects[0].is_starred(self.user))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.projects[0].is_starred(self.user))
+            self.assertFalse(self.projects[1].is_starred(self.user))
+        other = utils.create_user('other')
+        self.assertFalse(self.projects[0].is_starred(other))
 
     def test_add_star(self):
-        pass
+        self.assertFalse(self.projects[0].is_starred(self.user))
+        self.projects[0].add_star(self.user)
+        self.projects[0].add_star(self.user)
+        self.assertTrue(self.projects[0].is_starred(self.user))
+        self.assertEqual(models.StarredItem.objects.count(), 1)
 
     def test_remove_star(self):
-        pass
+        self.projects[0].add_star(self.user)
+        self.assertTrue(self.projects[0].is_starred(self.user))
+        self.projects[0].remove_star(self.user)
+        self.assertFalse(self.projects[0].is_starred(self.user))
+        self.assertEqual(models.StarredItem.objects.count(), 0)
+
+    def test_with_starred(self):
+        self.projects[0].add_star(self.user)
+        self.projects[2].add_star(utils.create_user('other'))
+        with self.assertNumQueries(1):
+            starred = [bool(x.starred) for x in
+                       models.Project.with_starred(self.user)]
+        self.assertEqual(starred, [True, False, False])
 
 
 class TestTimer(TestCase):
@@ -160,3 +528,67 @@ class TestTimer(TestCase):
         timer.stop()
         self.assertEqual(timer.active, False)
         self.assertEqual(timer.duration, 1)
+
+
+class TestNews(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.groups = [Group.objects.create(name=u'Group %d' % i)
+                       for i in range(2)]
+        self.users = [utils.create_user('user%d' % i) for i in range(3)]
+        for user in self.users[:2]:
+            user.groups.add(*self.groups)
+        self.users[2].groups.add(self.groups[1])
+        self.today = datetime.date(2012, 7, 10)
+
+    def _news(self, title, groups, valid_from=None, valid_until=None):
+        news = models.News.new(title=title, message=title,
+                               valid_from=valid_from, valid_until=valid_until)
+        for group, priority in groups:
+            models.NewsGroup.new(news=news, group=group, priority=priority)
+        return news
+
+    def get_news(self, user, today=None):
+        return models.News.get_for_user(user.id, today or self.today)
+
+    def test_order(self):
+        low = self._news(u'Low', [(self.groups[0], 1)],
+                         datetime.date(2012, 7, 9))
+        high = self._news(u'High', [(self.groups[0], 1), (self.groups[1], 3)],
+                          datetime.date(2012, 7, 1))
+        older = self._news(u'Older', [(self.groups[0], 1)],
+                           datetime.date(2012, 7, 1))
+        self.assertEqual(self.get_news(self.users[0]), [high, low, older])
+        self.assertEqual(self.get_news(self.users[0])[0].priority, 3)
+        self.assertEqual(self.get_news(self.users[2]), [high])
+
+    def test_validity(self):
+        expired = self._news(u'Expired', [(self.groups[0], 1)],
+                             datetime.date(2012, 7, 1),
+                             datetime.date(2012, 7, 11))
+        future = self._news(u'Future', [(self.groups[0], 1)],
+                            datetime.date(2012, 7, 12))
+        profile = models.UserProfile.new(user=self.users[0])
+        self.assertEqual(profile.get_news(self.today), [expired])
+        self.assertEqual(profile.get_news(datetime.date(2012, 7, 11)),
+                         [expired])
+        self.assertEqual(profile.get_news(datetime.date(2012, 7, 12)),
+                         [future])
+
+    def test_shared_by_group_set(self):
+        self._news(u'News', [(self.groups[0], 1)])
+        self.get_news(self.users[0])
+        # only the groups of the other user are read
+        with self.assertNumQueries(1):
+            self.get_news(self.users[1])
+        with self.assertNumQueries(0):
+            self.get_news(self.users[1])
+
+    def test_invalidation(self):
+        news = self._news(u'News', [(self.groups[0], 1)])
+        self.assertEqual(self.get_news(self.users[2]), [])
+        models.NewsGroup.new(news=news, group=self.groups[1])
+        self.assertEqual(self.get_news(self.users[2]), [news])
+        self.users[2].groups.clear()
+        self.assertEqual(self.get_news(self.users[2]), [])
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the assignment of project step templates."""
+
+from django.test import TestCase
+
+from inhouse import models, steptemplates
+from inhouse.tests import utils
+
+
+class TestAssignStepTemplates(TestCase):
+
+    def setUp(self):
+        self.projects = [utils.create_project(u'Project %d' % i, u'PR%d' % i)
+                         for i in range(3)]
+        utils.create_step(self.projects[0], u'Design')
+        utils.create_step(self.projects[0], u'Other')
+        self.templates = [models.ProjectStepTemplate.new(name=name)
+                          for name in (u'Design', u'Test', u'Deploy')]
+        self.template_ids = [x.id for x in self.templates]
+
+    def _get_steps(self, project):
+        return list(project.projectstep_set.order_by(
+            'position').values_list('name', 'position'))
+
+    def test_get_missing_steps(self):
+        rows = steptemplates.get_missing_steps(
+            [self.projects[0].id, self.projects[1].id], self.template_ids)
+        self.assertEqual([row[:2] for row in rows], [
+            (self.projects[0].id, u'Deploy'),
+            (self.projects[0].id, u'Test'),
+            (self.projects[1].id, u'Deploy'),
+            (self.projects[1].id, u'Design'),
+            (self.projects[1].id, u'Test')])
+        self.assertEqual(rows[0][3], 2)
+        self.assertEqual(rows[2][3], None)
+
+    def test_assign(self):
+        project_ids = [x.id for x in self.projects]
+        with self.assertNumQueries(2 + len(self.projects)):
+            counts = steptemplates.assign_step_templates(project_ids,
+                                                         self.template_ids)
+        self.assertEqual(counts, {project_ids[0]: 2, project_ids[1]: 3,
+                                  project_ids[2]: 3})
+        self.assertEqual(self._get_steps(self.projects[0]), [
+            (u'Design', 1), (u'Other', 2), (u'Deploy', 3), (u'Test', 4)])
+        self.assertEqual(self._get_steps(self.projects[1]), [
+            (u'Deploy', 1), (u'Design', 2), (u'Test', 3)])
+        # Nothing left to add
+        counts = steptemplates.assign_step_templates(project_ids,
+                                                     self.template_ids)
+        self.assertEqual(counts, {})
+
+    def test_duplicate_template_names(self):
+        models.ProjectStepTemplate.new(name=u'Test')
+        ids = models.ProjectStepTemplate.objects.values_list('id', flat=True)
+        counts = steptemplates.assign_step_templates([self.projects[1].id],
+                                                     ids)
+        self.assertEqual(counts, {self.projects[1].id: 3})
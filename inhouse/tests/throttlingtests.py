@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the login throttling."""
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import Client
+from django.test.utils import override_settings
+
+from inhouse.tests import utils
+from inhouse.throttling import LoginThrottle
+
+
+@override_settings(LOGIN_ATTEMPTS_PER_USERNAME=2,
+                   LOGIN_ATTEMPTS_PER_ADDRESS=3,
+                   LOGIN_ATTEMPTS_WINDOW=100)
+class TestLoginThrottle(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_username(self):
+        LoginThrottle('foo', '10.0.0.1', 1000).add_failure()
+        self.assertFalse(LoginThrottle('Foo', '10.0.0.2', 1000).is_blocked())
+        LoginThrottle('foo', '10.0.0.2', 1010).add_failure()
+        self.assertTrue(LoginThrottle('Foo', '10.0.0.3', 1020).is_blocked())
+        self.assertFalse(LoginThrottle('bar', '10.0.0.3', 1020).is_blocked())
+
+    def test_address(self):
+        for username in ('foo', 'bar', 'baz'):
+            LoginThrottle(username, '10.0.0.1', 1000).add_failure()
+        self.assertTrue(LoginThrottle('qux', '10.0.0.1', 1000).is_blocked())
+        self.assertFalse(LoginThrottle('qux', '10.0.0.2', 1000).is_blocked())
+
+    def test_sliding_window(self):
+        LoginThrottle('foo', '10.0.0.1', 1050).add_failure()
+        LoginThrottle('foo', '10.0.0.1', 1090).add_failure()
+        self.assertTrue(LoginThrottle('foo', '10.0.0.1', 1099).is_blocked())
+        # half of the previous window still counts
+        self.assertFalse(LoginThrottle('foo', '10.0.0.1', 1150).is_blocked())
+        LoginThrottle('foo', '10.0.0.1', 1150).add_failure()
+        self.assertTrue(LoginThrottle('foo', '10.0.0.1', 1150).is_blocked())
+
+    def test_reset(self):
+        for _ in range(3):
+            LoginThrottle('foo', '10.0.0.1', 1000).add_failure()
+        LoginThrottle('foo', '10.0.0.1', 1000).reset()
+        self.assertFalse(LoginThrottle('foo', '10.0.0.2', 1000).is_blocked())
+        self.assertTrue(LoginThrottle('bar', '10.0.0.1', 1000).is_blocked())
+
+
+@override_settings(LOGIN_ATTEMPTS_PER_USERNAME=2)
+class TestLoginView(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        utils.create_user()
+        self.client = Client()
+
+    def login(self, password):
+        return self.client.post('/accounts/login/', {'username': 'foo',
+                                                     'password': password})
+
+    def test_throttled(self):
+        self.assertEqual(self.login('baz').status_code, 200)
+        self.assertEqual(self.login('baz').status_code, 200)
+        response = self.login('bar')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response.context['throttled'])
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_success_resets(self):
+        self.assertEqual(self.login('baz').status_code, 200)
+        self.assertEqual(self.login('bar').status_code, 302)
+        self.client.logout()
+        self.assertEqual(self.login('baz').status_code, 200)
+        self.assertEqual(self.login('bar').status_code, 302)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for booking timers."""
+
+import datetime
+
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import timezone
+
+from inhouse import models, rollups, timers
+from inhouse.tests import utils
+
+
+class TestRoundDuration(TestCase):
+
+    def test_round_duration(self):
+        self.assertEqual(models.round_duration(0), 15)
+        self.assertEqual(models.round_duration(540), 15)
+        self.assertEqual(models.round_duration(3000), 45)
+        self.assertEqual(models.round_duration(4380), 75)
+
+    def test_full_hour(self):
+        timer = models.Timer(duration=3420)
+        self.assertEqual(timer.get_time_tuple(), (1, 0))
+
+
+class TestBookTimers(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.day = utils.create_day(self.user, datetime.date(2012, 7, 2))
+        utils.create_booking(self.day, self.project, 60)
+
+    def _timer(self, day, duration, user=None, **kwds):
+        start = timezone.make_aware(datetime.datetime(2012, 7, day, 10),
+                                    timezone.get_current_timezone())
+        return models.Timer.new(title=u'Timer', start_time=start,
+                                duration=duration,
+                                created_by=(user or self.user).id, **kwds)
+
+    def test_book_timers(self):
+        booked = [self._timer(2, 4380), self._timer(2, 540),
+                  self._timer(3, 3000)]
+        others = [self._timer(2, 600, active=True), self._timer(9, 600),
+                  self._timer(2, 600, user=utils.create_user('other'))]
+        bookings, skipped = timers.book_timers(
+            self.user, self.project, datetime.date(2012, 7, 1),
+            datetime.date(2012, 7, 5))
+        self.assertEqual(len(bookings), 3)
+        self.assertEqual(skipped, [])
+        query = models.Booking.objects.filter(day=self.day)
+        self.assertEqual(list(query.order_by('position').values_list(
+            'position', 'duration')), [(1, 60), (2, 75), (3, 15)])
+        day = models.Day.objects.get(user=self.user,
+                                     date=datetime.date(2012, 7, 3))
+        self.assertEqual(day.booking_sum, 45)
+        self.assertEqual(day.booking_set.get().position, 1)
+        self.assertEqual(models.Day.objects.get(pk=self.day.pk).booking_sum,
+                         150)
+        self.assertEqual(rollups.check(), [])
+        for timer in booked:
+            timer = models.Timer.objects.get(pk=timer.pk)
+            self.assertEqual((timer.active, timer.duration), (False, 0))
+        for timer in others:
+            self.assertEqual(models.Timer.objects.get(pk=timer.pk).duration,
+                             600)
+
+    def test_locked_day(self):
+        self.day.locked = True
+        self.day.save()
+        timer = self._timer(2, 600)
+        bookings, skipped = timers.book_timers(
+            self.user, self.project, datetime.date(2012, 7, 1),
+            datetime.date(2012, 7, 5))
+        self.assertEqual((bookings, skipped), ([], [timer]))
+        self.assertEqual(models.Timer.objects.get(pk=timer.pk).duration, 600)
+
+
+class TestBookTimersView(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user()
+        self.project = utils.create_project()
+        self.client = Client()
+        self.client.login(username='foo', password='bar')
+
+    def _post(self):
+        return self.client.post('/timers/book/', {
+            'project': self.project.id, 'date_from': '2012-07-01',
+            'date_until': '2012-07-05'})
+
+    def test_member(self):
+        models.ProjectUser.new(project=self.project, user=self.user)
+        self.assertEqual(self._post().status_code, 200)
+
+    def test_not_member(self):
+        other = utils.create_user('other')
+        models.ProjectUser.new(project=self.project, user=other)
+        response = self._post()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project', response.content)
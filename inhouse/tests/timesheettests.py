@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""Testcases for the timesheet generation."""
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from inhouse import timesheets
+from inhouse.tests import utils
+
+
+class TestWriteTimesheet(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.user = utils.create_user()
+        project = utils.create_project()
+        for date in (datetime.date(2012, 7, 2), datetime.date(2012, 7, 31),
+                     datetime.date(2012, 8, 1)):
+            day = utils.create_day(self.user, date)
+            utils.create_booking(day, project, 60)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_write_timesheet(self):
+        with self.assertNumQueries(1):
+            count = timesheets.write_timesheet(self.user, 2012, 7,
+                                               self.output_dir)
+        self.assertEqual(count, 2)
+        for fmt in timesheets.FORMATS:
+            path = timesheets.get_filename(self.output_dir, 'foo', 2012, 7,
+                                           fmt)
+            self.assert_(os.path.isfile(path))
+        path = timesheets.get_filename(self.output_dir, 'foo', 2012, 7, 'csv')
+        self.assertEqual(len(open(path).readlines()), 3)
+
+    def test_resume(self):
+        timesheets.write_timesheet(self.user, 2012, 7, self.output_dir,
+                                   formats=('csv',))
+        with self.assertNumQueries(1):
+            count = timesheets.write_timesheet(self.user, 2012, 7,
+                                               self.output_dir)
+        self.assertEqual(count, 2)
+        with self.assertNumQueries(0):
+            count = timesheets.write_timesheet(self.user, 2012, 7,
+                                               self.output_dir)
+        self.assertEqual(count, None)
+
+    def test_worker(self):
+        pid, user_id, count, _elapsed, error = timesheets.worker(
+            (self.user, 2012, 8, self.output_dir, ('csv',), False))
+        self.assertEqual(pid, os.getpid())
+        self.assertEqual(user_id, self.user.id)
+        self.assertEqual(count, 1)
+        self.assertEqual(error, None)
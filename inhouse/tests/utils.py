@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers to create test data."""
+
+import decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from inhouse import models
+
+
+def create_user(username='foo'):
+    """Creates a user with the password 'bar'."""
+    return User.objects.create_user(username, '%s@example.com' % username,
+                                    'bar')
+
+
+def create_project(name=u'Project', key=u'PR1', **kwds):
+    """Creates an open project with its customer and project type."""
+    customer = models.Customer.new(
+        name1=name, address=models.Address.new(name1=name))
+    project_type, _ = models.ProjectType.objects.get_or_create(
+        name=u'Default')
+    kwds.setdefault('status', models.PROJECT_STATUS_OPEN)
+    return models.Project.new(name=name, key=key, customer=customer,
+                              type=project_type, **kwds)
+
+
+def create_step(project, name=u'Step', **kwds):
+    """Creates an open project step at the next free position."""
+    kwds.setdefault('status', models.STEP_STATUS_OPEN)
+    step = models.ProjectStep(project=project, name=name, **kwds)
+    step.next_position()
+    step.save()
+    return step
+
+
+def create_day(user, date, **kwds):
+    """Creates the day of a user."""
+    return models.Day.new(user=user, date=date, **kwds)
+
+
+def create_booking(day, project, duration, **kwds):
+    """Creates a booking at the next free position of the day."""
+    kwds.setdefault('title', u'Booking')
+    kwds.setdefault('description', u'Booking')
+    booking = models.Booking(day=day, project=project,
+                             duration=decimal.Decimal(duration), **kwds)
+    booking.next_position()
+    booking.save()
+    return booking
+
+
+def get_queries(func, *args, **kwds):
+    """Calls a function and records the executed queries.
+
+    :returns: Tuple of the list of SQL statements and the function's
+      result
+    """
+    connection.use_debug_cursor = True
+    start = len(connection.queries)
+    try:
+        result = func(*args, **kwds)
+    finally:
+        connection.use_debug_cursor = False
+    return [query['sql'] for query in connection.queries[start:]], result
+
+
+def count_queries(func, *args, **kwds):
+    """Calls a function and counts the executed queries.
+
+    :returns: Tuple of the number of queries and the function's result
+    """
+    queries, result = get_queries(func, *args, **kwds)
+    return len(queries), result
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""Throttling of failed logins.
+
+Failed logins are counted per username and per client address in the
+cache. The counts approximate a sliding window: each window has its own
+counter, the counter of the previous window is weighted with the part
+of it, that still overlaps the sliding window. Counters are incremented
+atomically, so concurrent requests aren't lost.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+_KEY = 'inhouse.login_failures.%s.%s.%d'
+
+
+def _get_key(scope, value, window):
+    """Returns the cache key of a window's counter."""
+    value = hashlib.md5(value.encode('utf-8')).hexdigest()
+    return _KEY % (scope, value, window)
+
+
+class LoginThrottle(object):
+    """Failed logins of a username and client address.
+
+    :param username: The username sent by the client
+    :param address: The client's IP address
+    :param now: Current time in seconds, defaults to :func:`time.time`
+    """
+
+    def __init__(self, username, address, now=None):
+        self.period = settings.LOGIN_ATTEMPTS_WINDOW
+        self.now = time.time() if now is None else now
+        self.window = int(self.now // self.period)
+        self.scopes = [('username', username.strip().lower(),
+                        settings.LOGIN_ATTEMPTS_PER_USERNAME),
+                       ('address', address, settings.LOGIN_ATTEMPTS_PER_ADDRESS)]
+
+    def _get_counts(self):
+        """Returns the weighted failure count of each scope."""
+        keys = []
+        for scope, value, _ in self.scopes:
+            keys.append((_get_key(scope, value, self.window - 1),
+                         _get_key(scope, value, self.window)))
+        values = cache.get_many([key for pair in keys for key in pair])
+        weight = 1 - (self.now % self.period) / float(self.period)
+        return [values.get(previous, 0) * weight + values.get(current, 0)
+                for previous, current in keys]
+
+    def is_blocked(self):
+        """Returns whether further logins are rejected.
+
+        Uses only the cache, so it is cheap to call before the password
+        is checked.
+        """
+        return any(count >= limit for count, (_, _, limit) in zip(
+            self._get_counts(), self.scopes))
+
+    def add_failure(self):
+        """Counts a failed login."""
+        for scope, value, _ in self.scopes:
+            key = _get_key(scope, value, self.window)
+            # the counter must outlive the following window
+            cache.add(key, 0, self.period * 2)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # expired between add and incr
+                cache.add(key, 1, self.period * 2)
+
+    def reset(self):
+        """Forgets the failures of the username after a successful login.
+
+        The failures of the client address are kept.
+        """
+        scope, value, _ = self.scopes[0]
+        cache.delete_many([_get_key(scope, value, self.window - 1),
+                           _get_key(scope, value, self.window)])
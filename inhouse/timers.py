@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""Conversion of stopped timers into bookings.
+
+All stopped timers of a user within a period are booked at once. The
+durations are rounded like :meth:`Timer.get_time_tuple`, missing days
+are created, the bookings are inserted with precomputed positions and
+the timers are reset, all in one transaction.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from inhouse import models
+from inhouse.utils import current_user
+
+
+def _get_datetime(date):
+    """Returns the start of a day in the current time zone."""
+    value = datetime.datetime.combine(date, datetime.time.min)
+    if settings.USE_TZ:
+        value = timezone.make_aware(value, timezone.get_current_timezone())
+    return value
+
+
+def _get_date(value):
+    """Returns the date of a timer's start in the current time zone."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def get_stopped_timers(user, date_from, date_until):
+    """Returns the stopped timers with a duration, that a user started
+    within a period.
+
+    :param user: A :class:`User` instance
+    :param date_from: First day of the period
+    :param date_until: Last day of the period
+    :returns: Query of :class:`Timer`
+    """
+    return models.Timer.objects.filter(
+        created_by=user.id, active=False, duration__gt=0,
+        start_time__gte=_get_datetime(date_from),
+        start_time__lt=_get_datetime(date_until + datetime.timedelta(1)))
+
+
+def book_timers(user, project, date_from, date_until, step=None):
+    """Books all stopped timers of a user and period on a project.
+
+    Timers on locked days are left untouched.
+
+    :param user: A :class:`User` instance
+    :param project: A :class:`Project` instance
+    :param date_from: First day of the period
+    :param date_until: Last day of the period
+    :param step: Optional :class:`ProjectStep` of the project
+    :returns: Tuple of the list of new :class:`Booking` instances and
+      the list of skipped :class:`Timer` instances
+    """
+    with transaction.commit_on_success():
+        timers = list(get_stopped_timers(user, date_from, date_until)
+                      .select_for_update().order_by('start_time', 'id'))
+        if not timers:
+            return [], []
+        days = models.Day.objects.get_or_create_dates(
+            user, set(_get_date(timer.start_time) for timer in timers))
+        positions = dict(
+            models.Booking.objects.filter(
+                day__in=[day.id for day in days.itervalues()])
+            .values_list('day').annotate(Max('position')).order_by())
+        bookings = []
+        booked = []
+        skipped = []
+        for timer in timers:
+            day = days[_get_date(timer.start_time)]
+            if day.locked:
+                skipped.append(timer)
+                continue
+            positions[day.id] = positions.get(day.id, 0) + 1
+            bookings.append(models.Booking(
+                day=day, project=project, step=step,
+                position=positions[day.id], title=timer.title,
+                description=timer.title,
+                duration=models.round_duration(timer.duration)))
+            booked.append(timer.id)
+        models.Booking.bulk_insert(bookings)
+        values = {'active': False, 'duration': 0, 'modified': timezone.now()}
+        if current_user.is_set():
+            values['modified_by'] = current_user.get_user_id()
+        models.Timer.objects.filter(id__in=booked).update(**values)
+    return bookings, skipped
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Monthly timesheets per user.
+
+A timesheet lists all bookings of a user in one month. It is written
+as CSV and/or HTML file into an output directory. Files are written
+to a temporary name first and renamed when complete, so an existing
+file always is a finished timesheet and an interrupted run can be
+resumed by skipping existing files.
+"""
+
+import calendar
+import csv
+import datetime
+import decimal
+import os
+import time
+
+from django.template.loader import render_to_string
+
+from inhouse import models
+
+FORMATS = ('csv', 'html')
+
+COLUMNS = ('day__date', 'from_time', 'to_time', 'duration', 'project__name',
+           'step__name', 'title')
+
+
+def get_period(year, month):
+    """Returns first and last day of a month."""
+    last = calendar.monthrange(year, month)[1]
+    return datetime.date(year, month, 1), datetime.date(year, month, last)
+
+
+def get_rows(user_id, year, month):
+    """Returns the bookings of a user's month with one query.
+
+    :returns: List of tuples with the values of :data:`COLUMNS`
+    """
+    first, last = get_period(year, month)
+    query = models.Booking.objects.filter(
+        day__user=user_id, day__date__gte=first, day__date__lte=last)
+    query = query.order_by('day__date', 'position')
+    return list(query.values_list(*COLUMNS))
+
+
+def get_filename(output_dir, username, year, month, fmt):
+    """Returns the path of a timesheet file."""
+    return os.path.join(output_dir, '%04d-%02d-%s.%s'
+                        % (year, month, username, fmt))
+
+
+def render_csv(fileobj, rows):
+    """Writes the rows as CSV."""
+    writer = csv.writer(fileobj)
+    writer.writerow(['date', 'from', 'to', 'duration', 'project', 'step',
+                     'title'])
+    for row in rows:
+        writer.writerow([u'' if x is None else unicode(x).encode('utf-8')
+                         for x in row])
+
+
+def render_html(fileobj, user, year, month, rows):
+    """Writes the rows as HTML page."""
+    total = sum((row[3] for row in rows), decimal.Decimal(0))
+    fileobj.write(render_to_string('inhouse/timesheet.html', {
+        'user': user, 'month': datetime.date(year, month, 1),
+        'bookings': [dict(zip(COLUMNS, row)) for row in rows],
+        'total': total}).encode('utf-8'))
+
+
+def write_timesheet(user, year, month, output_dir, formats=FORMATS,
+                    force=False):
+    """Writes the timesheet files of a user's month.
+
+    :param user: A :class:`User` instance
+    :param formats: File formats to write
+    :param force: Overwrite existing files
+    :returns: Number of bookings or ``None`` if all files existed
+    """
+    paths = dict((fmt, get_filename(output_dir, user.username, year, month,
+                                    fmt)) for fmt in formats)
+    if not force:
+        paths = dict((fmt, path) for fmt, path in paths.iteritems()
+                     if not os.path.exists(path))
+        if not paths:
+            return None
+    rows = get_rows(user.id, year, month)
+    for fmt, path in paths.iteritems():
+        tmp_path = '%s.tmp' % path
+        with open(tmp_path, 'wb') as fileobj:
+            if fmt == 'csv':
+                render_csv(fileobj, rows)
+            else:
+                render_html(fileobj, user, year, month, rows)
+        os.rename(tmp_path, path)
+    return len(rows)
+
+
+def worker(args):
+    """Writes the timesheet of one user in a worker process.
+
+    :param args: Tuple of :class:`User`, year, month, output directory,
+      formats and force flag
+    :returns: Tuple of process id, user id, number of bookings (``None``
+      if skipped), elapsed seconds and an error message or ``None``
+    """
+    user, year, month, output_dir, formats, force = args
+    start = time.time()
+    try:
+        count = write_timesheet(user, year, month, output_dir, formats,
+                                force)
+        error = None
+    except Exception as err:  # pylint: disable=W0703
+        # Report the failure and continue with the next user.
+        count, error = None, u'%s: %s' % (err.__class__.__name__, err)
+    return os.getpid(), user.id, count, time.time() - start, error
@@ -12,6 +12,9 @@ urlpatterns = patterns(
     url(r'accounts/login/$', 'login',
             {'template_name': 'inhouse/login.html',}, name='login'),
     url(r'^profile/$', 'profile_details', name='profile'),
+    url(r'^timers/book/$', 'book_timers', name='book_timers'),
+    url(r'^calendar/(?P<year>[1-9]\d{3})/(?P<month>0?[1-9]|1[0-2])\.json$',
+        'calendar_month', name='calendar_month'),
     url(r'^manager/', include('inhouse.views.manager_urls')),
 )
 
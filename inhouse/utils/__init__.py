@@ -1 +1,90 @@
 # -*- coding: utf-8 -*-
+
+"""Common utilities."""
+
+import contextlib
+import itertools
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+_version_counter = itertools.count()
+
+# Cache keys to delete again, when the current transaction has ended
+_pending = threading.local()
+
+
+def chunked(seq, size):
+    """Splits a sequence into lists of at most size elements.
+
+    :param seq: An iterable
+    :param size: Maximum length of each chunk
+    :returns: Generator of lists
+    """
+    chunk = []
+    for item in seq:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@contextlib.contextmanager
+def commit_on_success_unless_managed():
+    """Like ``transaction.commit_on_success``, but joins a transaction,
+    that is already managed by the caller.
+
+    ``commit_on_success`` commits when its block ends, even if it is
+    nested in another transaction block. Code, that is called within
+    bigger transactions, uses this function so that the caller's
+    transaction stays atomic.
+    """
+    if transaction.is_managed():
+        yield
+    else:
+        try:
+            with transaction.commit_on_success():
+                yield
+        finally:
+            delete_pending()
+
+
+def delete_after_commit(keys):
+    """Deletes cache keys now and again after the transaction has ended.
+
+    While the transaction is open, other processes still read the old
+    rows and may cache them under the keys again. Within a managed
+    transaction the keys are therefore remembered and deleted again by
+    :func:`delete_pending`, which is called when the outermost
+    :func:`commit_on_success_unless_managed` block or the request ends.
+
+    :param keys: List of cache keys
+    """
+    cache.delete_many(keys)
+    if transaction.is_managed():
+        if not hasattr(_pending, 'keys'):
+            _pending.keys = set()
+        _pending.keys.update(keys)
+
+
+def delete_pending():
+    """Deletes the keys remembered by :func:`delete_after_commit`."""
+    keys = getattr(_pending, 'keys', None)
+    if keys:
+        _pending.keys = set()
+        cache.delete_many(list(keys))
+
+
+def new_version():
+    """Returns a string, that differs from all previous results.
+
+    Used as version of cached data, that is invalidated by replacing
+    its version.
+    """
+    return '%x.%x.%x' % (int(time.time() * 1000000), os.getpid(),
+                         next(_version_counter))
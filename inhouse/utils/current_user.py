@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""Request scoped storage of the current user.
+
+The id of the logged in user is stored per thread by
+:class:`inhouse.middleware.AutoCurrentUserMiddleware`, so that code
+without access to the request (e.g. signal receivers) can read it.
+"""
+
+import threading
+
+_local = threading.local()
+
+# Marker for "no request is active in this thread".
+_UNSET = object()
+
+
+def set_user_id(user_id):
+    """Sets the id of the current user for this thread.
+
+    :param user_id: A user id or ``None`` for anonymous requests
+    """
+    _local.user_id = user_id
+
+
+def get_user_id(default=None):
+    """Returns the id of the current user.
+
+    :param default: Returned if no user has been set for this thread
+    :returns: User id, ``None`` or default
+    """
+    user_id = getattr(_local, 'user_id', _UNSET)
+    if user_id is _UNSET:
+        return default
+    return user_id
+
+
+def is_set():
+    """Checks, whether a current user has been set for this thread.
+
+    :returns: ``True`` or ``False``
+    """
+    return getattr(_local, 'user_id', _UNSET) is not _UNSET
+
+
+def clear():
+    """Removes the current user from this thread."""
+    try:
+        del _local.user_id
+    except AttributeError:
+        pass
+
+
+def stamp(objs):
+    """Sets the creating and modifying user of new model instances.
+
+    Bulk inserts don't send the ``pre_save`` signal, that sets these
+    fields during a request. Does nothing outside of a request.
+
+    :param objs: List of :class:`inhouse.models.DefaultInfo` instances
+    :returns: The list of instances
+    """
+    if is_set():
+        user_id = get_user_id()
+        for obj in objs:
+            obj.created_by = obj.modified_by = user_id
+    return objs
@@ -2,45 +2,136 @@
 
 """View functions."""
 
-import time
+import functools
 
 from django.contrib import messages
+from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import login as django_login
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import (condition, require_POST,
+                                          require_safe)
 
-from inhouse import forms, models
-from inhouse.exceptions import InhouseModelError
-from inhouse.views.utils import render
+from inhouse import (calendars, dashboard, forms, models, throttling,
+                     timers)
+from inhouse.views.utils import render, response_json
 
 
 @login_required
 def index(request):
     """The user's dashboard."""
-    return render(request, 'inhouse/dashboard.html')
+    return render(request, 'inhouse/dashboard.html',
+                  dashboard.get_dashboard(request.user))
+
+
+@login_required
+@require_POST
+def book_timers(request):
+    """Books the user's stopped timers of a period on a project."""
+    form = forms.TimerBookingForm(request.user, request.POST)
+    if not form.is_valid():
+        response = response_json(request, {'errors': dict(
+            (field, list(errors)) for field, errors in form.errors.items())})
+        response.status_code = 400
+        return response
+    if not models.ProjectUser.objects.filter(
+            project=form.cleaned_data['project'], user=request.user).exists():
+        response = response_json(request, {'errors': {'project': [
+            unicode(_(u'You are not a member of this project.'))]}})
+        response.status_code = 403
+        return response
+    bookings, skipped = timers.book_timers(request.user, **form.cleaned_data)
+    messages.success(request, _(u'%d timers have been booked.')
+                     % len(bookings))
+    return response_json(request, {'booked': len(bookings),
+                                   'skipped': [x.id for x in skipped]})
+
+
+def _calendar_etag(request, year, month):
+    """Returns the entity tag of the requested month."""
+    return calendars.get_etag(request.user.id, int(year), int(month))
+
+
+def _calendar_last_modified(request, year, month):
+    """Returns the time the requested month was rendered."""
+    return calendars.get_month(request.user.id, int(year),
+                               int(month))['modified']
+
+
+def _remember_calendar_month(view):
+    """Stores the requested month in the session before the view's
+    conditional checks, so not modified responses store it as well."""
+    @functools.wraps(view)
+    def wrapper(request, year, month):
+        calendars.set_session_month(request.session, int(year), int(month))
+        return view(request, year, month)
+    return wrapper
+
+
+@login_required
+@require_safe
+@_remember_calendar_month
+@cache_control(private=True, must_revalidate=True, max_age=0)
+@condition(etag_func=_calendar_etag,
+           last_modified_func=_calendar_last_modified)
+def calendar_month(request, year, month):
+    """Returns a month of the user's calendar as JSON.
+
+    The month is remembered as the calendar's month in the session and
+    the adjacent months are rendered into the cache, so navigating on
+    is fast.
+    """
+    year, month = int(year), int(month)
+    entry = calendars.get_month(request.user.id, year, month)
+    (prev_year, prev_month), (next_year, next_month) = \
+        calendars.get_adjacent_months(year, month)
+    data = dict(entry)
+    data.update({
+        'previous': {'year': prev_year, 'month': prev_month,
+                     'url': calendars.get_url(prev_year, prev_month)},
+        'next': {'year': next_year, 'month': next_month,
+                 'url': calendars.get_url(next_year, next_month)},
+        })
+    response = response_json(request, data)
+    calendars.prefetch_adjacent_months(request.user.id, year, month)
+    return response
 
 
 def login(request, *args, **kwargs):
-    attempts_key = 'login_attempts'
-    attempts = request.session.get(attempts_key, (0, None))
-    if request.method == 'POST':
-        attempts = (attempts[0]+1, time.time())
-        request.session[attempts_key] = attempts
+    """Logs a user in unless there were too many failed logins.
+
+    Throttled logins are rejected before the password is checked (see
+    :mod:`inhouse.throttling`).
+    """
     kwargs['authentication_form'] = forms.LoginForm
+    if request.method != 'POST':
+        return django_login(request, *args, **kwargs)
+    throttle = throttling.LoginThrottle(request.POST.get('username', ''),
+                                        request.META.get('REMOTE_ADDR', ''))
+    if throttle.is_blocked():
+        # rendered without django_login, that would write the session
+        form = forms.ThrottledLoginForm(data=request.POST)
+        form.is_valid()
+        response = render(request, kwargs['template_name'], {
+            'form': form,
+            'throttled': True,
+            REDIRECT_FIELD_NAME: request.REQUEST.get(REDIRECT_FIELD_NAME, ''),
+            })
+        response.status_code = 429
+        return response
     response = django_login(request, *args, **kwargs)
     if response.status_code == 302:
-        try:
-            del request.session[attempts_key]
-        except KeyError:
-            pass
+        throttle.reset()
+    else:
+        throttle.add_failure()
     return response
 
 @login_required
 def profile_details(request):
-    try:
+    profile = models.UserProfile.get_for_user(request.user)
+    if profile is None:
         profile = models.UserProfile.new(user=request.user)
-    except InhouseModelError:
-        profile = request.user.get_profile()
     address = profile.address
     commdata = profile.communication
     address_form = forms.UserProfileAddressForm(instance=address)
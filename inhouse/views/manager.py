@@ -8,16 +8,37 @@
 
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
+from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect
+from django.http import (HttpResponse, HttpResponseBadRequest,
+                         HttpResponseRedirect)
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 
-from inhouse import models
-from inhouse.forms import ProjectCopyForm, ProjectDefaultStepForm
+from inhouse import cloning, exports, models, steptemplates
+from inhouse.forms import (BookingExportForm, ProjectCopyForm,
+                           ProjectDefaultStepForm)
 from inhouse.views.utils import render
 
 
+@permission_required('inhouse.change_booking')
+def export_bookings(request, fmt):
+    """Streams the bookings matching the GET parameters as CSV or JSON.
+
+    :param fmt: One of :data:`inhouse.exports.FORMATS`
+    """
+    form = BookingExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(),
+                                      content_type='text/plain')
+    query = exports.get_bookings(**form.get_filters())
+    response = HttpResponse(exports.export(query, fmt),
+                            content_type=exports.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = ('attachment; filename=bookings.%s'
+                                       % fmt)
+    return response
+
+
 @permission_required('inhouse.add_project')
 def copy_project(request, project_id):
     """Creates a copy of a project and optionally of it's child objects.
@@ -27,55 +48,30 @@ def copy_project(request, project_id):
     project = get_object_or_404(models.Project, pk=project_id)
     form = ProjectCopyForm(initial={'name': u'%s \'%s\'' % (_(u'Copy of'),
                                                             project.name)})
-    steps = project.projectstep_set.all()
-    members = project.projectuser_set.all()
-    trackers = project.projecttracker_set.all()
     if request.method == 'POST':
         if '_cancel' in request.POST:
             return HttpResponseRedirect(reverse('admin:inhouse_project_change',
                                                 args=(project.id,)))
-        with_steps = bool(request.POST.get('steps'))
-        with_members = bool(request.POST.get('members'))
-        with_trackers = bool(request.POST.get('tracker'))
-        name = request.POST.get('name')
-        p = models.Project.copy(project)
-        p.name = name
-        p.save()
-        p.master = p
-        p.save()
-        if with_steps:
-            # Copy the project steps
-            for step in steps:
-                new = models.ProjectStep.copy(step)
-                new.project = p
-                new.next_position()
-                new.save()
-        if with_members:
-            # Copy all project members
-            for project_user in members:
-                new = models.ProjectUser()
-                new.project = p
-                new.user = project_user.user
-                if project_user.default_step:
-                    # Retrieve the user's default step, if possible
-                    query = models.ProjectStep.objects.filter(
-                        project=p, name=project_user.default_step.name)
-                    if query.count() == 1:
-                        new.default_step = query[0]
-                    else:
-                        new.default_step = None
-                new.save()
-        if with_trackers:
-            # Copy assigned issue trackers
-            for project_tracker in trackers:
-                new = models.ProjectTracker()
-                new.project = p
-                new.tracker = project_tracker.tracker
-                new.save()
-        messages.success(request, _(u'The project has been'
-                                    u' successfully copied.'))
-        return HttpResponseRedirect(reverse(
-            'admin:inhouse_project_changelist'))
+        form = ProjectCopyForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                cloning.clone_project(project, name=data['name'],
+                                      steps=data['steps'],
+                                      members=data['members'],
+                                      trackers=data['tracker'],
+                                      rates=data['rates'])
+            except ValidationError as err:
+                for message in err.messages:
+                    messages.error(request, message)
+            else:
+                messages.success(request, _(u'The project has been'
+                                            u' successfully copied.'))
+                return HttpResponseRedirect(reverse(
+                    'admin:inhouse_project_changelist'))
+    steps = project.projectstep_set.order_by('position', 'id')
+    members = project.projectuser_set.select_related('user')
+    trackers = project.projecttracker_set.select_related('tracker')
     return render(request,
                   'admin/inhouse/project/copy_project.html', {
             'form': form, 'project': project, 'steps': steps,
@@ -100,16 +96,7 @@ def default_steps(request, project_id):
         if len(ids) == 0:
             messages.warning(request, _(u'No steps have been selected.'))
         else:
-            tpls = models.ProjectStepTemplate.objects.filter(id__in=ids)
-            for tpl in tpls:
-                query = models.ProjectStep.objects.filter(project=project,
-                                                          name=tpl.name)
-                if query.count() != 0:
-                    continue
-                new = models.ProjectStep.copy(tpl)
-                new.project = project
-                new.next_position()
-                new.save()
+            steptemplates.assign_step_templates([project.id], ids)
             messages.success(request, _(u'The project steps have been'
                                         u' successfully added.'))
             return HttpResponseRedirect(reverse(
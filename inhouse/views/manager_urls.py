@@ -10,4 +10,6 @@ urlpatterns = patterns(
     'inhouse.views.manager',
     url(r'^(\d+)/copy_project', 'copy_project', name='copy_project'),
     url(r'^(\d+)/default_steps', 'default_steps', name='default_steps'),
+    url(r'^bookings/export\.(csv|json)$', 'export_bookings',
+        name='export_bookings'),
     )
@@ -26,6 +26,19 @@ DATABASES = {
     }
 }
 
+# A cache shared by all processes is required: cached users,
+# permissions, profiles, calendars, dashboard widgets and the login
+# throttling are invalidated through signals in the process, that
+# changes the data. A per-process cache (the default LocMemCache) would
+# serve stale data in the other workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+        'KEY_PREFIX': 'inhouse',
+    }
+}
+
 # Local time zone for this installation. Choices can be found here:
 # http://en.wikipedia.org/wiki/List_of_tz_zones_by_name
 # although not all choices may be available on all operating systems.
@@ -157,6 +170,10 @@ INSTALLED_APPS = (
 
 AUTH_PROFILE_MODULE = 'inhouse.UserProfile'
 
+AUTHENTICATION_BACKENDS = (
+    'inhouse.auth.backends.CachedModelBackend',
+)
+
 LOGIN_REDIRECT_URL = '/'
 
 # A sample logging configuration. The only tangible logging
@@ -232,3 +249,9 @@ if DEBUG:
 DEFAULT_COEFFICIENT_SATURDAY = decimal.Decimal('1.25')
 DEFAULT_COEFFICIENT_SUNDAY = decimal.Decimal('1.5')
 DEFAULT_COEFFICIENT_PROJECT_STEP = decimal.Decimal('1.0')
+
+# Login throttling: failed logins per username and per client address
+# within a sliding window of seconds
+LOGIN_ATTEMPTS_PER_USERNAME = 10
+LOGIN_ATTEMPTS_PER_ADDRESS = 50
+LOGIN_ATTEMPTS_WINDOW = 15 * 60
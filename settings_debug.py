@@ -26,6 +26,16 @@ DATABASES = {
     }
 }
 
+# The development server and the tests run in a single process, so a
+# local memory cache suffices. Production needs a cache shared by all
+# processes, see settings.py.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inhouse',
+    }
+}
+
 # Local time zone for this installation. Choices can be found here:
 # http://en.wikipedia.org/wiki/List_of_tz_zones_by_name
 # although not all choices may be available on all operating systems.
@@ -156,6 +166,10 @@ INSTALLED_APPS = (
 
 AUTH_PROFILE_MODULE = 'inhouse.UserProfile'
 
+AUTHENTICATION_BACKENDS = (
+    'inhouse.auth.backends.CachedModelBackend',
+)
+
 LOGIN_REDIRECT_URL = '/'
 
 # A sample logging configuration. The only tangible logging
@@ -231,3 +245,9 @@ if DEBUG:
 DEFAULT_COEFFICIENT_SATURDAY = decimal.Decimal('1.25')
 DEFAULT_COEFFICIENT_SUNDAY = decimal.Decimal('1.5')
 DEFAULT_COEFFICIENT_PROJECT_STEP = decimal.Decimal('1.0')
+
+# Login throttling: failed logins per username and per client address
+# within a sliding window of seconds
+LOGIN_ATTEMPTS_PER_USERNAME = 10
+LOGIN_ATTEMPTS_PER_ADDRESS = 50
+LOGIN_ATTEMPTS_WINDOW = 15 * 60
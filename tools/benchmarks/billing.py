@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark for pricing bookings.
+
+Compares Booking.get_amount() per booking with
+inhouse.billing.price_bookings() on a freshly created test database.
+
+Usage::
+
+ $ python tools/benchmarks/billing.py [--bookings=5000] [--projects=10]
+"""
+
+import datetime
+import decimal
+import random
+import sys
+
+import common
+
+
+def create_data(num_projects, num_bookings):
+    from django.contrib.auth.models import User
+    from inhouse import models
+    from inhouse.tests import utils
+    users = [utils.create_user('user%d' % i) for i in range(10)]
+    start = datetime.date(2012, 1, 1)
+    days = []
+    for user in users:
+        days.extend(models.Day(user=user, date=start + datetime.timedelta(i))
+                    for i in range(365))
+    models.Day.objects.bulk_create(days)
+    days = list(models.Day.objects.all())
+    projects = []
+    for i in range(num_projects):
+        project = utils.create_project(u'Project %d' % i, u'PR%d' % i)
+        for month in range(1, 13):
+            models.ProjectRate.new(
+                project=project, valid_from=datetime.date(2012, month, 1),
+                valid_until=(datetime.date(2012, month + 1, 1)
+                             if month < 12 else datetime.date(2013, 1, 1))
+                - datetime.timedelta(1),
+                hourly_rate=decimal.Decimal(60 + month))
+        for user in User.objects.all()[:3]:
+            project_user = models.ProjectUser.new(project=project, user=user)
+            models.ProjectUserRate.new(project_user=project_user,
+                                       hourly_rate=decimal.Decimal(100))
+        projects.append((project, utils.create_step(project)))
+    bookings = []
+    for i in range(num_bookings):
+        project, step = random.choice(projects)
+        bookings.append(models.Booking(
+            title=u'Booking', description=u'Booking', position=i,
+            day=random.choice(days), project=project,
+            step=random.choice((step, None)),
+            duration=decimal.Decimal(random.choice((15, 30, 45, 90)))))
+    models.Booking.objects.bulk_create(bookings)
+
+
+def bench_per_object():
+    from inhouse import models
+    return sum(booking.get_amount() or 0
+               for booking in models.Booking.objects.all())
+
+
+def bench_engine():
+    from inhouse import billing, models
+    return billing.price_bookings(models.Booking.objects.all()).amount
+
+
+def main():
+    parser = common.get_option_parser()
+    parser.add_option('--bookings', type='int', default=5000)
+    parser.add_option('--projects', type='int', default=10)
+    options, _ = parser.parse_args()
+    common.setup(options.settings)
+    destroy_test_db = common.create_test_db()
+    try:
+        create_data(options.projects, options.bookings)
+        per_object = common.measure(bench_per_object, repeat=1)
+        engine = common.measure(bench_engine)
+        assert bench_per_object() == bench_engine()
+        sys.stdout.write('%d bookings, %d projects\n'
+                         % (options.bookings, options.projects))
+        sys.stdout.write('per object: %8.3fs\n' % per_object)
+        sys.stdout.write('engine:     %8.3fs\n' % engine)
+    finally:
+        destroy_test_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers shared by the benchmark scripts."""
+
+import optparse
+import os
+import sys
+import timeit
+
+PROJECT_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+
+
+def get_option_parser():
+    """Returns an option parser with the common options."""
+    parser = optparse.OptionParser()
+    parser.add_option('--settings', default='settings_debug',
+                      help='Django settings module')
+    return parser
+
+
+def setup(settings_module):
+    """Makes the project and its settings importable."""
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+
+def create_test_db():
+    """Creates an empty test database like the test runner does.
+
+    :returns: Callable, that destroys the database again
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    return lambda: connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(func, number=1, repeat=3):
+    """Returns the best time of a function call in seconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark for the pre_save cost under concurrent requests.
+
+Compares the former per-request closure of AutoCurrentUserMiddleware
+with the single pre_save receiver. For each level of concurrency the
+given number of requests is kept open while the time of a pre_save
+dispatch is measured.
+
+Usage::
+
+ $ python tools/benchmarks/current_user.py [--settings=settings_debug]
+"""
+
+import sys
+import threading
+
+import common
+
+CONCURRENCY = (1, 8, 32, 128)
+ROUNDS = 20000
+
+
+def _legacy_connect(user_id):
+    """Connects a closure like the former middleware did per request."""
+    from django.db.models.signals import pre_save
+
+    def pre_save_cb(*args, **kwds):
+        instance = kwds['instance']
+        if hasattr(instance, 'created_by') and not instance.created_by:
+            instance.created_by = user_id
+        if hasattr(instance, 'modified_by'):
+            instance.modified_by = user_id
+    pre_save.connect(pre_save_cb, weak=False, dispatch_uid=id(pre_save_cb))
+    return id(pre_save_cb)
+
+
+def _measure(rounds):
+    from django.db.models.signals import pre_save
+    from inhouse import models
+    instance = models.Day()
+    return common.measure(
+        lambda: pre_save.send(sender=models.Day, instance=instance),
+        number=rounds)
+
+
+def bench_legacy(concurrency, rounds):
+    from django.db.models.signals import pre_save
+    uids = [_legacy_connect(1) for _ in range(concurrency)]
+    try:
+        return _measure(rounds)
+    finally:
+        for uid in uids:
+            pre_save.disconnect(dispatch_uid=uid)
+
+
+def _open_request(user_id, opened, finished):
+    """Keeps a request of a user open until finished is set."""
+    from inhouse.utils import current_user
+    current_user.set_user_id(user_id)
+    try:
+        opened.release()
+        finished.wait()
+    finally:
+        current_user.clear()
+
+
+def bench_current(concurrency, rounds):
+    # Each open request only stores the user in its own thread, so
+    # the other requests don't add anything to the signal dispatch.
+    from inhouse.utils import current_user
+    opened = threading.Semaphore(0)
+    finished = threading.Event()
+    threads = [threading.Thread(target=_open_request,
+                                args=(user_id, opened, finished))
+               for user_id in range(2, concurrency + 1)]
+    for thread in threads:
+        thread.start()
+    current_user.set_user_id(1)
+    try:
+        for _ in threads:
+            opened.acquire()
+        return _measure(rounds)
+    finally:
+        current_user.clear()
+        finished.set()
+        for thread in threads:
+            thread.join()
+
+
+def main():
+    parser = common.get_option_parser()
+    parser.add_option('--rounds', type='int', default=ROUNDS)
+    options, _ = parser.parse_args()
+    common.setup(options.settings)
+    import inhouse.middleware  # connects the pre_save receiver
+    sys.stdout.write('%-12s %14s %14s\n' % ('concurrency', 'legacy (us)',
+                                             'current (us)'))
+    for concurrency in CONCURRENCY:
+        legacy = bench_legacy(concurrency, options.rounds)
+        current = bench_current(concurrency, options.rounds)
+        sys.stdout.write('%-12d %14.2f %14.2f\n' % (
+            concurrency, legacy * 1e6, current * 1e6))
+
+
+if __name__ == '__main__':
+    main()